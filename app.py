@@ -1,9 +1,10 @@
 import os
 import re
 import json
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session
+from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session, Response, stream_with_context, Request
 from urllib.parse import urlencode
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
 import PyPDF2
 import pandas as pd
 from datetime import datetime
@@ -11,7 +12,7 @@ import tempfile
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
 from reportlab.lib import colors
-from functools import wraps
+from functools import wraps, lru_cache
 from flask_babel import Babel, gettext as _, lazy_gettext as _l
 from version import VERSION, VERSION_NAME, COMPANY_NAME_ZH, COMPANY_NAME_EN, SYSTEM_NAME_ZH, SYSTEM_NAME_EN, SYSTEM_NAME_FR
 from translations import get_text
@@ -19,12 +20,59 @@ from typing import Dict, List, Tuple, Any
 from io import BytesIO
 import xlsxwriter
 import hashlib
+import heapq
+import math
+import abc
+import importlib.util
+import string
 import uuid
+import threading
+import signal
+import multiprocessing
+from multiprocessing.connection import wait as wait_connections
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter, OrderedDict, namedtuple, deque
+try:
+    import resource
+except ImportError:  # Windows没有 resource 模块，沙箱不限制内存
+    resource = None
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+# 报价单PDF解析缓存：内存中最多保留的文件数，以及可选的磁盘缓存目录（为空时不启用）
+app.config['QUOTATION_CACHE_SIZE'] = int(os.environ.get('QUOTATION_CACHE_SIZE', 32))
+app.config['QUOTATION_CACHE_DIR'] = os.environ.get('QUOTATION_CACHE_DIR', '')
+# 内存中解析缓存的大小上限（按PDF文本估算），超出时淘汰最久未使用的条目
+app.config['QUOTATION_CACHE_MAX_MB'] = float(os.environ.get('QUOTATION_CACHE_MAX_MB', 64))
+# 只解析含表头、门板颜色或合计金额的页面，跳过封面、图纸和条款页
+app.config['QUOTATION_SKIP_NON_TABLE_PAGES'] = os.environ.get('QUOTATION_SKIP_NON_TABLE_PAGES', '1').lower() in ('1', 'true', 'yes')
+# 大PDF并行提取：页数达到阈值时按页范围分给多个进程，低于阈值时仍在当前进程串行提取
+app.config['PDF_PARALLEL_MIN_PAGES'] = int(os.environ.get('PDF_PARALLEL_MIN_PAGES', 40))
+app.config['PDF_PARALLEL_WORKERS'] = int(os.environ.get('PDF_PARALLEL_WORKERS', min(4, os.cpu_count() or 1)))
+# PDF文本提取后端（pypdf2、pypdf、pymupdf、pdfminer），报价单可单独指定，为空时使用默认后端
+app.config['PDF_EXTRACTION_BACKEND'] = os.environ.get('PDF_EXTRACTION_BACKEND', 'pypdf2').lower()
+app.config['PDF_EXTRACTION_BACKEND_QUOTATION'] = os.environ.get('PDF_EXTRACTION_BACKEND_QUOTATION', '').lower()
+# 上传的PDF在子进程（沙箱）中提取和解析：超过运行时间（秒）或新增内存（MB）上限时结束子进程并返回错误
+app.config['PDF_SANDBOX_ENABLED'] = os.environ.get('PDF_SANDBOX_ENABLED', '1').lower() in ('1', 'true', 'yes')
+app.config['PDF_SANDBOX_TIMEOUT'] = float(os.environ.get('PDF_SANDBOX_TIMEOUT', 60))
+app.config['PDF_SANDBOX_MEMORY_MB'] = int(os.environ.get('PDF_SANDBOX_MEMORY_MB', 1024))
+# 批量上传报价单时单次请求最多接受的文件数
+app.config['QUOTATION_BATCH_MAX_FILES'] = int(os.environ.get('QUOTATION_BATCH_MAX_FILES', 50))
+# 生成SKU（含映射）的缓存条目数
+app.config['SKU_CACHE_SIZE'] = int(os.environ.get('SKU_CACHE_SIZE', 4096))
+# 上传文件大小上限（单个文件，MB），接收过程中超过即拒绝
+app.config['QUOTATION_UPLOAD_MAX_MB'] = float(os.environ.get('QUOTATION_UPLOAD_MAX_MB', 16))
+app.config['EXCEL_UPLOAD_MAX_MB'] = float(os.environ.get('EXCEL_UPLOAD_MAX_MB', 16))
+# 上传文件存储：按内容哈希分目录保存，超过保留时间或磁盘配额时清理
+app.config['UPLOAD_STORE_DIR'] = os.path.join(app.config['UPLOAD_FOLDER'], 'store')
+app.config['UPLOAD_STORE_TTL_HOURS'] = float(os.environ.get('UPLOAD_STORE_TTL_HOURS', 72))
+app.config['UPLOAD_STORE_QUOTA_MB'] = float(os.environ.get('UPLOAD_STORE_QUOTA_MB', 1024))
+app.config['UPLOAD_STORE_REAP_INTERVAL'] = int(os.environ.get('UPLOAD_STORE_REAP_INTERVAL', 600))
 
 # 配置Jinja2定界符，避免与JavaScript模板语法冲突
 def configure_jinja2_delimiters():
@@ -250,7 +298,9 @@ os.makedirs('data', exist_ok=True)
 # 全局变量存储数据
 standard_prices = {}
 occw_prices = {}  # OCCW价格表
+occw_prices_version = 0  # OCCW价格表每次加载或修改后加1，价格表的索引按版本重建
 sku_mappings = {}  # SKU映射关系：{原SKU: 用户选择的SKU}
+sku_mapping_version = 0  # SKU映射每次加载或修改后加1，用于使SKU生成缓存失效
 system_settings = {}  # 系统设置
 users = {}  # 用户数据：{username: {password_hash, email, created_at}}
 quotations = {}  # 用户报价单数据：{username: [{quotation_id, title, data, created_at, updated_at}]}
@@ -275,6 +325,11 @@ def save_standard_prices():
     except Exception as e:
         print(f"保存标准价格表失败: {e}")
 
+def bump_occw_prices_version():
+    """OCCW价格表变化后调用，价格表的索引在下次查询时按新版本重建"""
+    global occw_prices_version
+    occw_prices_version += 1
+
 def load_occw_prices():
     """加载OCCW价格表"""
     global occw_prices
@@ -286,9 +341,12 @@ def load_occw_prices():
     except Exception as e:
         print(f"加载OCCW价格表失败: {e}")
         occw_prices = {}
+    # 先替换价格表再增加版本号，按新版本号构建的索引一定使用新的价格表
+    bump_occw_prices_version()
 
 def save_occw_prices():
-    """保存OCCW价格表"""
+    """保存OCCW价格表（修改价格表后都会调用，同时使价格表的索引失效）"""
+    bump_occw_prices_version()
     try:
         with open('data/occw_prices.json', 'w', encoding='utf-8') as f:
             json.dump(occw_prices, f, ensure_ascii=False, indent=2)
@@ -297,9 +355,15 @@ def save_occw_prices():
         print(f"保存OCCW价格表失败: {e}")
         return False
 
+def bump_sku_mapping_version():
+    """SKU映射变化后调用，使已缓存的SKU生成结果失效"""
+    global sku_mapping_version
+    sku_mapping_version += 1
+
 def load_sku_mappings():
     """加载SKU映射关系"""
     global sku_mappings
+    bump_sku_mapping_version()
     try:
         if os.path.exists('data/sku_mappings.json'):
             with open('data/sku_mappings.json', 'r', encoding='utf-8') as f:
@@ -310,7 +374,8 @@ def load_sku_mappings():
         sku_mappings = {}
 
 def save_sku_mappings():
-    """保存SKU映射关系"""
+    """保存SKU映射关系（修改映射后都会调用，同时使SKU生成缓存失效）"""
+    bump_sku_mapping_version()
     try:
         with open('data/sku_mappings.json', 'w', encoding='utf-8') as f:
             json.dump(sku_mappings, f, ensure_ascii=False, indent=2)
@@ -319,6 +384,24 @@ def save_sku_mappings():
         print(f"保存SKU映射关系失败: {e}")
         return False
 
+def load_sku_rules():
+    """加载SKU生成规则（data/sku_rules.json 的 pdf_parsing_rules）并编译，成功后整体替换当前规则集
+    
+    文件缺失或规则无效时保留当前规则集（启动时为内置默认规则），返回 (是否成功, 错误信息)。
+    """
+    global sku_rule_set
+    try:
+        with open('data/sku_rules.json', 'r', encoding='utf-8') as f:
+            rules = json.load(f)['pdf_parsing_rules']['rules']
+        sku_rule_set = SkuRuleSet(rules, version=sku_rule_set.version + 1, source='data/sku_rules.json')
+        return True, None
+    except SkuRuleError as e:
+        print(f"加载SKU生成规则失败，继续使用当前规则: {e.key} {e.params}")
+        return False, e.translated()
+    except Exception as e:
+        print(f"加载SKU生成规则失败，继续使用当前规则: {e}")
+        return False, str(e)
+
 def load_system_settings():
     """加载系统设置"""
     global system_settings
@@ -434,173 +517,856 @@ def login_required(f):
 
 
 
-def extract_pdf_content(pdf_path, add_page_markers=True, force_line_split=True):
-    """提取PDF文件内容，支持强制将页脚和表头分行"""
+# PDF页脚和表头的强制分行规则
+# 页脚: Print date: ... Page ... /
+PDF_FOOTER_PATTERN = re.compile(r'(Print date: ?\d+ ?\d{4}-\d{2}-\d{2} Page ?\d+ ?/)')
+# 表头: Description Manuf. code # Qty User code
+PDF_TABLE_HEADER_PATTERN = re.compile(r'(Description Manuf\. code # Qty User code)')
+
+
+class PdfExtraction:
+    """PDF文本提取结果 - 每页只读取一次，保留逐页文本，可同时生成原始文本和带页面分隔符的文本"""
+
+    def __init__(self, pages=None, error=None):
+        self.pages = list(pages or [])
+        self.error = error
+
+    @property
+    def page_count(self):
+        return len(self.pages)
+
+    def to_text(self, add_page_markers=True, force_line_split=True):
+        """按指定格式拼接逐页文本，与逐次调用 extract_pdf_content 的输出完全一致"""
+        parts = []
+        for page_num, page_text in enumerate(self.pages):
+            if add_page_markers:
+                parts.append(f"\n=== PAGE {page_num + 1} ===\n")
+            parts.append(page_text)
+            if add_page_markers:
+                parts.append("\n")
+        text = ''.join(parts)
+        if force_line_split:
+            # 强制将页脚和表头分行
+            text = PDF_FOOTER_PATTERN.sub(r'\n\1\n', text)
+            text = PDF_TABLE_HEADER_PATTERN.sub(r'\n\1\n', text)
+        return text
+
+    @property
+    def raw_text(self):
+        """原始PDF文本（不添加页面分隔符）"""
+        return self.to_text(add_page_markers=False)
+
+    @property
+    def marked_text(self):
+        """用于解析的PDF文本（添加页面分隔符）"""
+        return self.to_text(add_page_markers=True)
+
+
+def render_marked_page(page_num, page_text, force_line_split=True):
+    """生成单页带页面分隔符的解析文本（page_num 从0开始），逐页拼接与 PdfExtraction.marked_text 一致"""
+    text = f"\n=== PAGE {page_num + 1} ===\n{page_text}\n"
+    if force_line_split:
+        text = PDF_FOOTER_PATTERN.sub(r'\n\1\n', text)
+        text = PDF_TABLE_HEADER_PATTERN.sub(r'\n\1\n', text)
+    return text
+
+
+class PdfTextBackend(abc.ABC):
+    """PDF文本提取后端接口
+    
+    open() 打开PDF文件对象并返回后端自己的文档对象，page_count() 和 page_text() 按页码（从0开始）读取，
+    默认实现适用于 PdfReader 一类的文档对象。后端依赖的模块（module）没有安装时不可用。
+    """
+    name = None
+    module = None
+
+    def is_available(self):
+        return importlib.util.find_spec(self.module) is not None
+
+    @abc.abstractmethod
+    def open(self, file):
+        """打开PDF文件对象，返回后端的文档对象"""
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def page_text(self, document, page_num):
+        return document.pages[page_num].extract_text()
+
+
+class PyPDF2Backend(PdfTextBackend):
+    """PyPDF2（默认）"""
+    name = 'pypdf2'
+    module = 'PyPDF2'
+
+    def open(self, file):
+        return PyPDF2.PdfReader(file)
+
+
+class PypdfBackend(PdfTextBackend):
+    """pypdf（PyPDF2的后续版本）"""
+    name = 'pypdf'
+    module = 'pypdf'
+
+    def open(self, file):
+        return importlib.import_module('pypdf').PdfReader(file)
+
+
+class PyMuPDFBackend(PdfTextBackend):
+    """PyMuPDF"""
+    name = 'pymupdf'
+    module = 'fitz'
+
+    def open(self, file):
+        return importlib.import_module('fitz').open(stream=file.read(), filetype='pdf')
+
+    def page_count(self, document):
+        return document.page_count
+
+    def page_text(self, document, page_num):
+        return document[page_num].get_text()
+
+
+class PdfminerDocument:
+    """pdfminer.six 打开的文档：extract_pages 从头到尾只排版一遍，已排版页面的文本缓存在 pages 中"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pages = []
+        self._layouts = None
+
+    def page_text(self, page_num):
+        if self._layouts is None:
+            self._layouts = importlib.import_module('pdfminer.high_level').extract_pages(BytesIO(self.data))
+        text_container = importlib.import_module('pdfminer.layout').LTTextContainer
+        while len(self.pages) <= page_num:
+            layout = next(self._layouts)
+            self.pages.append(''.join(element.get_text() for element in layout
+                                      if isinstance(element, text_container)))
+        return self.pages[page_num]
+
+
+class PdfminerBackend(PdfTextBackend):
+    """pdfminer.six - 按顺序排版所有页面，读取靠后的页面时前面的页面也要排版"""
+    name = 'pdfminer'
+    module = 'pdfminer'
+
+    def open(self, file):
+        return PdfminerDocument(file.read())
+
+    def page_count(self, document):
+        pdfpage = importlib.import_module('pdfminer.pdfpage')
+        return sum(1 for _page in pdfpage.PDFPage.get_pages(BytesIO(document.data)))
+
+    def page_text(self, document, page_num):
+        return document.page_text(page_num)
+
+
+PDF_EXTRACTION_BACKENDS = {backend.name: backend for backend in (
+    PyPDF2Backend(), PypdfBackend(), PyMuPDFBackend(), PdfminerBackend()
+)}
+DEFAULT_PDF_BACKEND = 'pypdf2'
+
+
+def available_pdf_backends():
+    """已安装依赖、可以使用的提取后端名称"""
+    return [name for name, backend in PDF_EXTRACTION_BACKENDS.items() if backend.is_available()]
+
+
+def pdf_backend_name(doc_type='quotation'):
+    """按文档类型取配置的提取后端名称（没有单独配置时使用 PDF_EXTRACTION_BACKEND）"""
+    return app.config.get(f'PDF_EXTRACTION_BACKEND_{doc_type.upper()}') or app.config['PDF_EXTRACTION_BACKEND']
+
+
+def get_pdf_backend(name=None):
+    """获取提取后端，name为None时使用报价单配置的后端"""
+    return PDF_EXTRACTION_BACKENDS[name or pdf_backend_name()]
+
+
+def check_pdf_backend_config():
+    """配置的后端不存在或依赖没有安装时改用默认后端"""
+    for key in ('PDF_EXTRACTION_BACKEND', 'PDF_EXTRACTION_BACKEND_QUOTATION'):
+        name = app.config.get(key)
+        if not name:
+            continue
+        backend = PDF_EXTRACTION_BACKENDS.get(name)
+        if backend is None or not backend.is_available():
+            print(f"PDF提取后端 {name} 不可用（{key}），改用 {DEFAULT_PDF_BACKEND}")
+            app.config[key] = DEFAULT_PDF_BACKEND
+
+
+check_pdf_backend_config()
+
+
+def iter_pdf_pages(pdf_path, backend_name=None):
+    """逐页提取PDF文本的生成器，每提取完一页立即返回，用于流式解析"""
+    backend = get_pdf_backend(backend_name)
+    with open(pdf_path, 'rb') as file:
+        document = backend.open(file)
+        for page_num in range(backend.page_count(document)):
+            yield backend.page_text(document, page_num)
+
+
+# PDF并行提取使用的进程池（首次使用时创建，各请求共享）
+_pdf_process_pool = None
+_pdf_process_pool_lock = threading.Lock()
+
+
+def get_pdf_process_pool():
+    """获取共享的PDF提取进程池，进程数由 PDF_PARALLEL_WORKERS 限制"""
+    global _pdf_process_pool
+    with _pdf_process_pool_lock:
+        if _pdf_process_pool is None:
+            _pdf_process_pool = ProcessPoolExecutor(max_workers=app.config['PDF_PARALLEL_WORKERS'])
+        return _pdf_process_pool
+
+
+def reset_pdf_process_pool():
+    """丢弃已损坏的进程池（如子进程被系统杀死），下次使用时重新创建"""
+    global _pdf_process_pool
+    with _pdf_process_pool_lock:
+        if _pdf_process_pool is not None:
+            _pdf_process_pool.shutdown(wait=False, cancel_futures=True)
+            _pdf_process_pool = None
+
+
+def split_page_ranges(page_count, chunks):
+    """把页码 [0, page_count) 切分成最多 chunks 个连续范围"""
+    chunks = max(1, min(chunks, page_count))
+    size, extra = divmod(page_count, chunks)
+    ranges = []
+    start = 0
+    for index in range(chunks):
+        end = start + size + (1 if index < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def extract_pdf_page_range(pdf_path, start, end, backend_name=None):
+    """独立打开PDF并提取 [start, end) 页的文本（在进程池的子进程中运行）"""
+    backend = get_pdf_backend(backend_name)
+    with open(pdf_path, 'rb') as file:
+        document = backend.open(file)
+        return [backend.page_text(document, page_num) for page_num in range(start, end)]
+
+
+def extract_pdf_pages(pdf_path, parallel=None, backend_name=None):
+    """逐页提取PDF文本，每页只提取一次，返回PdfExtraction
+    
+    backend_name 为None时使用配置的提取后端（默认PyPDF2）。
+    parallel 为None时，页数达到 PDF_PARALLEL_MIN_PAGES 才使用进程池并行提取；
+    各子进程独立打开PDF，结果按页码顺序重新拼接，与串行提取完全一致。
+    """
     try:
+        backend_name = backend_name or pdf_backend_name()
+        backend = get_pdf_backend(backend_name)
+        workers = app.config['PDF_PARALLEL_WORKERS']
         with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if add_page_markers:
-                    text += f"\n=== PAGE {page_num + 1} ===\n"
-                text += page_text
-                if add_page_markers:
-                    text += "\n"
-            if force_line_split:
-                # 强制将页脚和表头分行
-                # 页脚: Print date: ... Page ... /
-                text = re.sub(r'(Print date: ?\d+ ?\d{4}-\d{2}-\d{2} Page ?\d+ ?/)', r'\n\1\n', text)
-                # 表头: Description Manuf. code # Qty User code
-                text = re.sub(r'(Description Manuf\. code # Qty User code)', r'\n\1\n', text)
-            return text
+            document = backend.open(file)
+            page_count = backend.page_count(document)
+            if parallel is None:
+                parallel = workers > 1 and page_count >= app.config['PDF_PARALLEL_MIN_PAGES']
+            if not parallel or page_count < 2:
+                return PdfExtraction([backend.page_text(document, page_num) for page_num in range(page_count)])
+        
+        try:
+            pool = get_pdf_process_pool()
+            futures = [pool.submit(extract_pdf_page_range, pdf_path, start, end, backend_name)
+                       for start, end in split_page_ranges(page_count, workers)]
+            pages = []
+            for future in futures:
+                pages.extend(future.result())
+            return PdfExtraction(pages)
+        except BrokenProcessPool as e:
+            # 进程池不可用时退回串行提取
+            print(f"PDF并行提取失败，改为串行提取: {e}")
+            reset_pdf_process_pool()
+            return PdfExtraction(extract_pdf_page_range(pdf_path, 0, page_count, backend_name))
+    except MemoryError:
+        # 在沙箱子进程中由父进程记录为内存超限
+        raise
     except Exception as e:
         print(f"提取PDF内容失败: {e}")
-        return ""
+        return PdfExtraction(error=str(e))
 
-def parse_quotation_pdf(pdf_content):
-    """解析报价单PDF内容 - 严格区分Manuf. code是否以数字开头，准确提取数量和用户编码，并比对PDF合计金额"""
-    products = []
-    current_door_color = None
-    pdf_total = None
-    compare_result = None
-    compare_message = ''
-    
-    lines = pdf_content.split('\n')
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        if not line:
-            i += 1
-            continue
-        
-        # 识别PDF合计金额
-        if 'OPWM_1 Net Total' in line:
-            all_amounts = re.findall(r'([\$￥]?[0-9,]+\.\d{2})', line)
-            if all_amounts:
-                pdf_total = float(all_amounts[-1].replace('$','').replace('￥','').replace(',',''))
-        
-        # 查找door color
-        if 'door color' in line.lower():
-            door_match = re.search(r'door\s+color\s+\d+\s+([A-Z]+)', line)
-            if door_match:
-                current_door_color = door_match.group(1)
-        
-        # 检测多行产品格式（如 WF330 FOR）
-        if (len(line) < 30 and 
-            re.search(r'[A-Z]+\d+\s+FOR|WF330\s+FOR', line) and 
-            not re.search(r'\d+\.\d{2}', line)):
-            
-            # 尝试合并接下来的行形成完整的产品信息
-            multiline_result = parse_multiline_product_sequence(lines, i, current_door_color)
-            if multiline_result:
-                products.append(multiline_result['product'])
-                i = multiline_result['next_index']
-                continue
-        
-        # 查找单行产品
-        if re.match(r'^[A-Z0-9]', line) and re.search(r'\d+\.\d{2}', line):
-            if (line.startswith('Style') or line.startswith('Door') or 
-                line.startswith('Cabinet') or line.startswith('Cabinets') or 
-                line.startswith('Print') or line.startswith('Volume')):
+
+def extract_pdf_content(pdf_path, add_page_markers=True, force_line_split=True):
+    """提取PDF文件内容，支持强制将页脚和表头分行"""
+    return extract_pdf_pages(pdf_path).to_text(add_page_markers, force_line_split)
+
+
+# 报价单解析中间结果的格式版本，解析逻辑变化时递增，使缓存中的旧结果失效
+QUOTATION_TOKEN_VERSION = 5
+
+
+# 报价单行类型
+LINE_BLANK = 'blank'
+LINE_TEXT = 'text'
+LINE_PAGE_MARKER = 'page_marker'
+LINE_PAGE_FOOTER = 'page_footer'
+LINE_TABLE_HEADER = 'table_header'
+LINE_DOOR_COLOR = 'door_color'
+LINE_TOTAL = 'total'
+LINE_CONTINUATION = 'continuation'  # 多行产品的起始行（如 WF330 FOR）
+LINE_PRODUCT = 'product'
+
+# 报价单行分类使用的预编译正则
+PRICE_PATTERN = re.compile(r'\d+\.\d{2}')
+PRICE_TOKEN_PATTERN = re.compile(r'^\d+,?\d*\.\d{2}$')
+NET_TOTAL_AMOUNT_PATTERN = re.compile(r'([\$￥]?[0-9,]+\.\d{2})')
+DOOR_COLOR_MARK_PATTERN = re.compile(r'door color', re.IGNORECASE)
+DOOR_COLOR_PATTERN = re.compile(r'door\s+color\s+\d+\s+([A-Z]+)')
+CONTINUATION_PATTERN = re.compile(r'[A-Z]+\d+\s+FOR|WF330\s+FOR')
+QTY_USER_CODE_PATTERN = re.compile(r'^(\d+)(.*)$')
+USER_CODE_PATTERN = re.compile(r'^[A-Z0-9-]+$')
+PAGE_MARKER_PATTERN = re.compile(r'^=== PAGE (\d+) ===$')
+PRODUCT_FIRST_CHARS = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789')
+# 以这些前缀开头的含价格行是表头或页脚，不是产品行
+NON_PRODUCT_PREFIXES = ('Style', 'Door', 'Cabinet', 'Cabinets', 'Print', 'Volume')
+
+QuotationLine = namedtuple('QuotationLine', ['kind', 'text', 'has_price', 'parts', 'price_index', 'total', 'door_color'])
+BLANK_QUOTATION_LINE = QuotationLine(LINE_BLANK, '', False, None, -1, None, None)
+
+
+def classify_quotation_line(raw_line):
+    """对报价单的一行文本分类（一次完成所有判断），返回 QuotationLine
+    
+    合计金额和门板颜色作为附加字段返回，与行类型无关，与原有逐条判断的优先级保持一致。
+    """
+    line = raw_line.strip()
+    if not line:
+        return BLANK_QUOTATION_LINE
+    
+    # 识别PDF合计金额
+    total = None
+    if 'OPWM_1 Net Total' in line:
+        all_amounts = NET_TOTAL_AMOUNT_PATTERN.findall(line)
+        if all_amounts:
+            total = float(all_amounts[-1].replace('$','').replace('￥','').replace(',',''))
+    
+    # 查找door color
+    door_color = None
+    if DOOR_COLOR_MARK_PATTERN.search(line):
+        door_match = DOOR_COLOR_PATTERN.search(line)
+        if door_match:
+            door_color = door_match.group(1)
+    
+    has_price = PRICE_PATTERN.search(line) is not None
+    if not has_price:
+        # 多行产品格式（如 WF330 FOR）
+        if len(line) < 30 and CONTINUATION_PATTERN.search(line):
+            return QuotationLine(LINE_CONTINUATION, line, False, None, -1, total, door_color)
+    elif line[0] in PRODUCT_FIRST_CHARS and not line.startswith(NON_PRODUCT_PREFIXES):
+        # 单行产品：至少5列，且第一个价格列不在第一列
+        parts = line.split()
+        if len(parts) >= 5:
+            for index, part in enumerate(parts):
+                if '.' in part and PRICE_TOKEN_PATTERN.match(part):
+                    if index > 0:
+                        return QuotationLine(LINE_PRODUCT, line, True, parts, index, total, door_color)
+                    break
+    
+    if total is not None:
+        kind = LINE_TOTAL
+    elif door_color is not None:
+        kind = LINE_DOOR_COLOR
+    elif line.startswith('Print date'):
+        kind = LINE_PAGE_FOOTER
+    elif line.startswith('Description Manuf. code'):
+        kind = LINE_TABLE_HEADER
+    elif line.startswith('=== PAGE') and PAGE_MARKER_PATTERN.match(line):
+        kind = LINE_PAGE_MARKER
+    else:
+        kind = LINE_TEXT
+    return QuotationLine(kind, line, has_price, None, -1, total, door_color)
+
+
+def parse_single_product_line(tagged_line, current_door_color):
+    """由已分类的单行产品生成解析中间结果 - 严格区分Manuf. code是否以数字开头，准确提取数量和用户编码"""
+    parts = tagged_line.parts
+    price_index = tagged_line.price_index
+    manuf_code = parts[0]
+    seq_num = parts[1]
+    description = ' '.join(parts[2:price_index])
+    price = parts[price_index]
+    last_col = parts[price_index + 1] if price_index + 1 < len(parts) else '1'
+    # 处理*号
+    if seq_num.startswith('*'):
+        description = '* ' + description
+        seq_num = seq_num[1:]
+    # 根据Manuf. code是否以数字开头来解析数量和user code
+    if manuf_code[0].isdigit():
+        # 情况1: Manuf. code以数字开头（如3DB30）
+        user_code_final = manuf_code
+        if last_col.endswith(user_code_final):
+            qty_part = last_col[:-len(user_code_final)]
+            if qty_part and qty_part.isdigit():
+                qty = qty_part
+            else:
+                qty = '1'
+        else:
+            qty = '1'
+    else:
+        # 情况2: Manuf. code不以数字开头（如B30）
+        qty_match = QTY_USER_CODE_PATTERN.match(last_col)
+        if qty_match:
+            qty = qty_match.group(1)
+            remaining_part = qty_match.group(2)
+            if remaining_part and USER_CODE_PATTERN.match(remaining_part):
+                user_code_final = remaining_part
+            else:
+                user_code_final = manuf_code
+        else:
+            qty = '1'
+            user_code_final = manuf_code
+    return {
+        'type': 'single',  # 单行产品：价格为行总价
+        'seq_num': seq_num,
+        'manuf_code': manuf_code,
+        'qty': qty,
+        'door_color': current_door_color,
+        'user_code': user_code_final,
+        'description': description,
+        'price': price
+    }
+
+
+class QuotationTokenizer:
+    """报价单增量解析器 - 先对每行分类，再把产品行交给对应的解析函数
+    
+    可以按页分批喂入文本，门板颜色和PDF合计金额等状态跨页保留；
+    多行产品需要向后看3行，后续行尚未到达时暂停，等下一批文本或最终调用时再解析。
+    每个产品记录来源位置 source（起止页码和页内行号，行号从0开始、不计空行），
+    门板颜色行和合计金额行的位置也一并记录，用于局部重新解析。
+    """
+
+    # 多行产品最多合并的行数（与 parse_multiline_product_sequence 一致）
+    LOOKAHEAD_LINES = 3
+
+    def __init__(self, door_color=None):
+        self.tagged_lines = []
+        self.line_pages = []
+        self.line_numbers = []
+        self.position = 0
+        self.current_door_color = door_color
+        self.pdf_total = None
+        self.items = []
+        self.door_color_marks = []  # [页码, 行号, 门板颜色]
+        self.total_marks = []  # [页码, 行号, 合计金额]
+        self._page = None
+        self._page_line = 0
+
+    def feed_lines(self, lines):
+        """追加待解析的文本行，同时记录每行所在的页码和页内行号"""
+        for line in lines:
+            tagged = classify_quotation_line(line)
+            if tagged.kind == LINE_PAGE_MARKER:
+                self._page = int(PAGE_MARKER_PATTERN.match(tagged.text).group(1))
+                self._page_line = 0
+                line_number = -1
+            elif tagged.kind == LINE_BLANK:
+                line_number = -1
+            else:
+                line_number = self._page_line
+                self._page_line += 1
+            self.tagged_lines.append(tagged)
+            self.line_pages.append(self._page)
+            self.line_numbers.append(line_number)
+
+    def source(self, start_index, end_index):
+        """产品的来源位置（end_index 为产品最后一行的索引）"""
+        return {
+            'page': self.line_pages[start_index],
+            'line': self.line_numbers[start_index],
+            'end_page': self.line_pages[end_index],
+            'end_line': self.line_numbers[end_index]
+        }
+
+    def run(self, final=False):
+        """解析已追加的行，返回本次新解析出的产品中间结果"""
+        tagged_lines = self.tagged_lines
+        new_items = []
+        i = self.position
+        while i < len(tagged_lines):
+            tagged = tagged_lines[i]
+            kind = tagged.kind
+            if kind == LINE_BLANK:
                 i += 1
                 continue
-            parts = line.split()
-            if len(parts) >= 5:
-                manuf_code = parts[0]
-                seq_num = parts[1]
-                price_index = -1
-                for j, part in enumerate(parts):
-                    if re.match(r'^\d+,?\d*\.\d{2}$', part):
-                        price_index = j
-                        break
-                if price_index > 0:
-                    description = ' '.join(parts[2:price_index])
-                    price = parts[price_index]
-                    last_col = parts[price_index + 1] if price_index + 1 < len(parts) else '1'
-                    # 处理*号
-                    if seq_num.startswith('*'):
-                        description = '* ' + description
-                        seq_num = seq_num[1:]
-                    # 根据Manuf. code是否以数字开头来解析数量和user code
-                    if re.match(r'^\d', manuf_code):
-                        # 情况1: Manuf. code以数字开头（如3DB30）
-                        user_code_final = manuf_code
-                        if last_col.endswith(user_code_final):
-                            qty_part = last_col[:-len(user_code_final)]
-                            if qty_part and qty_part.isdigit():
-                                qty = qty_part
-                            else:
-                                qty = '1'
-                        else:
-                            qty = '1'
-                    else:
-                        # 情况2: Manuf. code不以数字开头（如B30）
-                        qty_match = re.match(r'^(\d+)(.*)$', last_col)
-                        if qty_match:
-                            qty = qty_match.group(1)
-                            remaining_part = qty_match.group(2)
-                            if remaining_part and re.match(r'^[A-Z0-9-]+$', remaining_part):
-                                user_code_final = remaining_part
-                            else:
-                                user_code_final = manuf_code
-                        else:
-                            qty = '1'
-                            user_code_final = manuf_code
-                    # 生成SKU（包含映射处理）
-                    sku = generate_final_sku(user_code_final, description, current_door_color)
-                    # 获取标准价格并计算单价
-                    try:
-                        total_price_float = float(price.replace(',', ''))
-                        qty_int = int(qty) if qty.isdigit() and int(qty) > 0 else 1
-                        unit_price_calculated = total_price_float / qty_int
-                        # 优先使用标准价格表中的单价，如果没有则使用计算出的单价
-                        standard_price = standard_prices.get(sku, unit_price_calculated)
-                    except ValueError:
-                        standard_price = standard_prices.get(sku, 0.0)
-                    product = {
-                        'seq_num': seq_num,
-                        'manuf_code': manuf_code,
-                        'sku': sku,
-                        'qty': qty,
-                        'door_color': current_door_color or 'N/A',
-                        'unit_price': standard_price,
-                        'user_code': user_code_final,
-                        'description': description
-                    }
-                    products.append(product)
-        
-        i += 1
-    # 计算解析产品的总价
-    # 现在unit_price是真正的单价，所以需要乘以数量
-    calc_total = 0
+            if kind == LINE_CONTINUATION and not final and i + self.LOOKAHEAD_LINES > len(tagged_lines):
+                # 多行产品的后续行还没到达
+                break
+            if tagged.total is not None:
+                self.pdf_total = tagged.total
+                self.total_marks.append([self.line_pages[i], self.line_numbers[i], tagged.total])
+            if tagged.door_color is not None:
+                self.current_door_color = tagged.door_color
+                self.door_color_marks.append([self.line_pages[i], self.line_numbers[i], tagged.door_color])
+            
+            if kind == LINE_PRODUCT:
+                item = parse_single_product_line(tagged, self.current_door_color)
+                item['source'] = self.source(i, i)
+                new_items.append(item)
+            elif kind == LINE_CONTINUATION:
+                # 尝试合并接下来的行形成完整的产品信息
+                multiline_result = parse_multiline_product_sequence(tagged_lines, i, self.current_door_color)
+                if multiline_result:
+                    item = multiline_result['item']
+                    item['source'] = self.source(i, multiline_result['next_index'] - 1)
+                    new_items.append(item)
+                    i = multiline_result['next_index']
+                    continue
+            i += 1
+        self.position = i
+        self.items.extend(new_items)
+        return new_items
+
+    def result(self):
+        """解析中间结果 {'version', 'items', 'pdf_total', 'line_count', 'door_color_marks', 'total_marks'}"""
+        return {
+            'version': QUOTATION_TOKEN_VERSION,
+            'items': self.items,
+            'pdf_total': self.pdf_total,
+            'line_count': len(self.tagged_lines),
+            'door_color_marks': self.door_color_marks,
+            'total_marks': self.total_marks
+        }
+
+
+def tokenize_quotation_pdf(pdf_content):
+    """解析报价单PDF内容，得到与SKU映射无关的中间结果
+    
+    返回 {'version', 'items', 'pdf_total', 'line_count', ...}，items 中只保存PDF里的原始字段和来源位置，
+    SKU和单价由 resolve_quotation_tokens 生成，SKU映射变化后只需重新执行该步骤。
+    """
+    tokenizer = QuotationTokenizer()
+    tokenizer.feed_lines(pdf_content.split('\n'))
+    tokenizer.run(final=True)
+    return tokenizer.result()
+
+
+def is_quotation_table_page(page_text):
+    """快速判断一页是否可能包含产品行：含产品表头、门板颜色行或 Net Total 合计行"""
+    return ('Description Manuf. code # Qty User code' in page_text
+            or 'OPWM_1 Net Total' in page_text
+            or DOOR_COLOR_MARK_PATTERN.search(page_text) is not None)
+
+
+def has_quotation_product_lines(page_text):
+    """快速判断一页是否可能含产品行：含价格或多行产品的起始行（续表页不一定重复表头）"""
+    return PRICE_PATTERN.search(page_text) is not None or CONTINUATION_PATTERN.search(page_text) is not None
+
+
+class QuotationPageSelector:
+    """逐页判断是否需要解析，select_quotation_pages 和流式上传共用
+    
+    保留表格页和可能含产品行的页面，并保留其后紧接的一页，
+    使跨页的多行产品与解析全部页面时合并的行相同；只跳过前后都没有产品行的封面、图纸和条款页。
+    第一张表格页之前的页面先暂存，一页表格页都没有时（版式不同的PDF）解析全部页面。
+    """
+
+    def __init__(self, skip_non_table_pages):
+        self.skip_non_table_pages = skip_non_table_pages
+        self.pending = []  # 第一张表格页之前的 (页索引, 文本, 是否可能含产品行)
+        self.seen_table_page = False
+        self.keep_next = False
+
+    def _decide(self, index, page_text, product_page):
+        selected = product_page or self.keep_next
+        self.keep_next = product_page
+        return index, page_text, selected
+
+    def feed(self, index, page_text):
+        """追加一页，返回已能确定的 [(页索引, 文本, 是否解析)]，按页码顺序"""
+        if not self.skip_non_table_pages:
+            return [(index, page_text, True)]
+        table_page = is_quotation_table_page(page_text)
+        product_page = table_page or has_quotation_product_lines(page_text)
+        if not self.seen_table_page:
+            if not table_page:
+                self.pending.append((index, page_text, product_page))
+                return []
+            self.seen_table_page = True
+            decided = [self._decide(*pending) for pending in self.pending]
+            self.pending = []
+        else:
+            decided = []
+        decided.append(self._decide(index, page_text, product_page))
+        return decided
+
+    def finish(self):
+        """所有页面追加完毕，返回仍暂存的页面（此时没有表格页，全部解析）"""
+        decided = [(index, page_text, True) for index, page_text, _product_page in self.pending]
+        self.pending = []
+        return decided
+
+
+def select_quotation_pages(pages, skip_non_table_pages=None):
+    """预扫描逐页文本，返回 (需要解析的页索引, 跳过的页码)，页码从1开始，规则见 QuotationPageSelector"""
+    if skip_non_table_pages is None:
+        skip_non_table_pages = app.config['QUOTATION_SKIP_NON_TABLE_PAGES']
+    selector = QuotationPageSelector(skip_non_table_pages)
+    decided = []
+    for index, page_text in enumerate(pages):
+        decided.extend(selector.feed(index, page_text))
+    decided.extend(selector.finish())
+    return ([index for index, _page_text, selected in decided if selected],
+            [index + 1 for index, _page_text, selected in decided if not selected])
+
+
+def tokenize_quotation_pages(pages, skip_non_table_pages=None, timer=None):
+    """由逐页文本生成解析中间结果，只解析预扫描选出的页面，跳过的页码记录在 skipped_pages 中"""
+    if skip_non_table_pages is None:
+        skip_non_table_pages = app.config['QUOTATION_SKIP_NON_TABLE_PAGES']
+    timer = timer or PipelineTimer()
+    with timer.stage('scan'):
+        page_indexes, skipped_pages = select_quotation_pages(pages, skip_non_table_pages)
+    with timer.stage('mark'):
+        marked_text = ''.join(render_marked_page(index, pages[index]) for index in page_indexes)
+    with timer.stage('parse'):
+        tokens = tokenize_quotation_pdf(marked_text)
+    tokens['skipped_pages'] = skipped_pages
+    tokens['page_filter'] = skip_non_table_pages
+    return tokens
+
+
+def is_current_quotation_tokens(tokens):
+    """缓存的解析中间结果是否仍可使用（解析版本和跳页设置都与当前一致）"""
+    return (tokens.get('version') == QUOTATION_TOKEN_VERSION
+            and tokens.get('page_filter') == app.config['QUOTATION_SKIP_NON_TABLE_PAGES'])
+
+
+def quotation_page_lines(page_index, page_text):
+    """一页中参与解析的非空行（与 QuotationTokenizer 记录的页内行号一一对应）"""
+    return [line for line in render_marked_page(page_index, page_text).split('\n')[2:] if line.strip()]
+
+
+def retokenize_quotation_lines(pages, tokens, page_num, start_line, end_line, new_lines):
+    """把第 page_num 页第 start_line 到 end_line 行（含）替换为 new_lines 后局部重新解析
+    
+    只重新解析受影响的页面：从编辑位置所在页（或跨页多行产品的起始页）开始，
+    到编辑位置之后的下一个门板颜色行所在页为止，门板颜色从此前最后一个门板颜色行继承；
+    其余页面的解析结果直接沿用。编辑导致需要解析的页面发生变化时重新解析全部页面。
+    返回 (新的逐页文本, 新的解析中间结果, 重新解析的页码)。
+    """
+    page_filter = tokens.get('page_filter', app.config['QUOTATION_SKIP_NON_TABLE_PAGES'])
+    page_index = page_num - 1
+    lines = quotation_page_lines(page_index, pages[page_index])
+    new_pages = list(pages)
+    new_pages[page_index] = '\n'.join(lines[:start_line] + list(new_lines) + lines[end_line + 1:])
+    
+    old_indexes, _skipped = select_quotation_pages(pages, page_filter)
+    selected_indexes, skipped_pages = select_quotation_pages(new_pages, page_filter)
+    if selected_indexes != old_indexes:
+        new_tokens = tokenize_quotation_pages(new_pages, page_filter)
+        return new_pages, new_tokens, [index + 1 for index in selected_indexes]
+    if page_index not in selected_indexes:
+        # 编辑的是跳过的页面，解析结果不变
+        return new_pages, tokens, []
+    
+    items = tokens['items']
+    selected_pages = [index + 1 for index in selected_indexes]
+    # 起始页：跨页多行产品从前一页开始时一并重新解析
+    first_page = page_num
+    for item in reversed(items):
+        if item['source']['page'] < first_page <= item['source']['end_page']:
+            first_page = item['source']['page']
+    # 结束页：编辑位置之后的下一个门板颜色行所在页，编辑可能改变了此前产品的门板颜色
+    last_page = selected_pages[-1]
+    for mark_page, mark_line, _color in tokens['door_color_marks']:
+        if (mark_page, mark_line) > (page_num, end_line):
+            last_page = mark_page
+            break
+    door_color = None
+    for mark_page, _line, color in tokens['door_color_marks']:
+        if mark_page >= first_page:
+            break
+        door_color = color
+    
+    tokenizer = QuotationTokenizer(door_color)
+    position = selected_pages.index(first_page)
+    while position < len(selected_pages):
+        current_page = selected_pages[position]
+        tokenizer.feed_lines(render_marked_page(current_page - 1, new_pages[current_page - 1]).split('\n')[:-1])
+        tokenizer.run()
+        position += 1
+        if current_page < last_page:
+            continue
+        # 多行产品跨到下一页时继续解析下一页
+        pending = tokenizer.position < len(tokenizer.tagged_lines) or any(
+            first_page <= item['source']['page'] <= current_page < item['source']['end_page'] for item in items)
+        if not pending:
+            break
+    last_page = selected_pages[position - 1]
+    tokenizer.run(final=position == len(selected_pages))
+    
+    def outside(marks_or_items, get_page):
+        before = [entry for entry in marks_or_items if get_page(entry) < first_page]
+        after = [entry for entry in marks_or_items if get_page(entry) > last_page]
+        return before, after
+    
+    items_before, items_after = outside(items, lambda item: item['source']['page'])
+    colors_before, colors_after = outside(tokens['door_color_marks'], lambda mark: mark[0])
+    totals_before, totals_after = outside(tokens['total_marks'], lambda mark: mark[0])
+    total_marks = totals_before + tokenizer.total_marks + totals_after
+    old_text = render_marked_page(page_index, pages[page_index])
+    new_text = render_marked_page(page_index, new_pages[page_index])
+    new_tokens = {
+        'version': QUOTATION_TOKEN_VERSION,
+        'items': items_before + tokenizer.items + items_after,
+        'pdf_total': total_marks[-1][2] if total_marks else None,
+        'line_count': tokens['line_count'] + new_text.count('\n') - old_text.count('\n'),
+        'door_color_marks': colors_before + tokenizer.door_color_marks + colors_after,
+        'total_marks': total_marks,
+        'skipped_pages': skipped_pages,
+        'page_filter': page_filter
+    }
+    return new_pages, new_tokens, [page for page in selected_pages if first_page <= page <= last_page]
+
+
+def resolve_quotation_item(item):
+    """根据解析中间结果生成产品信息（SKU生成、SKU映射和标准价格在此步骤处理）"""
+    # 生成SKU（包含映射处理）
+    sku = generate_final_sku(item['user_code'], item['description'], item['door_color'])
+    price = item['price']
+    if item['type'] == 'multiline':
+        # 多行产品：使用PDF中的价格作为unit_price
+        try:
+            unit_price = float(price.replace(',', ''))
+        except ValueError:
+            unit_price = 0.0
+    else:
+        # 获取标准价格并计算单价
+        qty = item['qty']
+        try:
+            total_price_float = float(price.replace(',', ''))
+            qty_int = int(qty) if qty.isdigit() and int(qty) > 0 else 1
+            unit_price_calculated = total_price_float / qty_int
+            # 优先使用标准价格表中的单价，如果没有则使用计算出的单价
+            unit_price = standard_prices.get(sku, unit_price_calculated)
+        except ValueError:
+            unit_price = standard_prices.get(sku, 0.0)
+    return {
+        'seq_num': item['seq_num'],
+        'manuf_code': item['manuf_code'],
+        'sku': sku,
+        'qty': item['qty'],
+        'door_color': item['door_color'] or 'N/A',
+        'unit_price': unit_price,
+        'user_code': item['user_code'],
+        'description': item['description']
+    }
+
+
+def calculate_products_total(products):
+    """计算产品总价（unit_price为单价，需要乘以数量）"""
+    total = 0
     for p in products:
         try:
             qty = int(p['qty']) if str(p['qty']).isdigit() else 0
             unit_price = float(p['unit_price']) if p['unit_price'] is not None else 0
-            calc_total += qty * unit_price
-        except Exception:
+            total += qty * unit_price
+        except (ValueError, TypeError):
             continue
+    return total
+
+
+def compare_quotation_total(products, pdf_total):
+    """比对解析产品总价与PDF合计金额，返回 (compare_result, compare_message)"""
+    calc_total = calculate_products_total(products)
     if pdf_total is not None:
         if abs(calc_total - pdf_total) < 0.01:
-            compare_result = True
-            compare_message = f"✅ {_('parsing_total_matches_pdf')}: {calc_total:.2f}"
-        else:
-            compare_result = False
-            compare_message = f"❌ {_('parsing_total_mismatch_pdf').format(calc_total=calc_total, pdf_total=pdf_total)}"
-    else:
-        compare_result = None
-        compare_message = _("⚠️ 未识别到PDF合计金额，无法比对！")
-    def extract_seq_num(seq_str):
-        try:
-            return int(seq_str.replace('*', ''))
-        except ValueError:
-            return 0
-    products.sort(key=lambda x: extract_seq_num(x['seq_num']))
+            return True, f"✅ {_('parsing_total_matches_pdf')}: {calc_total:.2f}"
+        return False, f"❌ {_('parsing_total_mismatch_pdf').format(calc_total=calc_total, pdf_total=pdf_total)}"
+    return None, _("⚠️ 未识别到PDF合计金额，无法比对！")
+
+
+def quotation_seq_sort_key(product):
+    """按序号排序产品"""
+    try:
+        return int(product['seq_num'].replace('*', ''))
+    except ValueError:
+        return 0
+
+
+def quotation_item_provenance(item):
+    """产品的来源信息：起止页码、页内行号和当时生效的门板颜色"""
+    provenance = dict(item.get('source') or {})
+    provenance['door_color'] = item['door_color']
+    return provenance
+
+
+def resolve_quotation_document(tokens):
+    """由解析中间结果生成产品列表及与之一一对应的来源信息，并比对PDF合计金额
+    
+    返回 (products, provenance, compare_result, compare_message)。
+    """
+    resolved = [(resolve_quotation_item(item), quotation_item_provenance(item)) for item in tokens['items']]
+    compare_result, compare_message = compare_quotation_total([product for product, source in resolved], tokens['pdf_total'])
+    resolved.sort(key=lambda pair: quotation_seq_sort_key(pair[0]))
+    return ([product for product, source in resolved], [source for product, source in resolved],
+            compare_result, compare_message)
+
+
+def resolve_quotation_tokens(tokens):
+    """由解析中间结果生成产品列表，并比对PDF合计金额"""
+    products, provenance, compare_result, compare_message = resolve_quotation_document(tokens)
     return products, compare_result, compare_message
 
 
+def occw_price_info(sku):
+    """按SKU映射查找OCCW价格，返回 (映射后的SKU, 单价, 产品信息)，兼容新旧价格数据格式"""
+    mapped_sku = sku_mappings.get(sku, sku)
+    price_data = occw_prices.get(mapped_sku, 0.0)
+    if isinstance(price_data, dict):
+        # 新格式：完整产品信息
+        return mapped_sku, price_data.get('unit_price', 0.0), {
+            'product_name': price_data.get('product_name', ''),
+            'door_variant': price_data.get('door_variant', ''),
+            'box_variant': price_data.get('box_variant', ''),
+            'category': price_data.get('category', ''),
+            'updated_at': price_data.get('updated_at', '')
+        }
+    # 旧格式：只有价格
+    return mapped_sku, price_data, {}
+
+
+def enrich_quotation_products(products):
+    """为解析出的产品一次性补充OCCW价格，替代页面逐行调用 /get_occw_price
+    
+    返回 (pricing, unmatched)：pricing 与 products 一一对应，包含映射后的SKU、OCCW单价、
+    分类和 not_found（单价不大于0，需要用户选择SKU）；unmatched 按SKU汇总未匹配的行。
+    """
+    lookups = {}
+    pricing = []
+    unmatched = OrderedDict()
+    for product in products:
+        sku = product['sku']
+        lookup = lookups.get(sku)
+        if lookup is None:
+            lookup = lookups[sku] = occw_price_info(sku)
+        mapped_sku, price, product_info = lookup
+        not_found = not price > 0
+        pricing.append({
+            'mapped_sku': mapped_sku if mapped_sku != sku else None,
+            'occw_price': price,
+            'category': product_info.get('category', ''),
+            'not_found': not_found
+        })
+        if not_found:
+            summary = unmatched.setdefault(sku, {'sku': sku, 'qty': 0, 'lines': 0, 'seq_nums': []})
+            summary['qty'] += int(product['qty']) if str(product['qty']).isdigit() else 0
+            summary['lines'] += 1
+            summary['seq_nums'].append(product['seq_num'])
+    return pricing, list(unmatched.values())
+
+
+def parse_quotation_pdf(pdf_content):
+    """解析报价单PDF内容 - 严格区分Manuf. code是否以数字开头，准确提取数量和用户编码，并比对PDF合计金额"""
+    return resolve_quotation_tokens(tokenize_quotation_pdf(pdf_content))
+
+
 class OCCWPriceTransformer:
     """OCCW价格表转换器 - 完全重写版本"""
     
@@ -866,27 +1632,27 @@ class OCCWPriceTransformer:
         }
 
 
-def parse_multiline_product_sequence(lines, start_index, current_door_color):
-    """解析多行产品序列，返回合并后的产品信息"""
+def parse_multiline_product_sequence(tagged_lines, start_index, current_door_color):
+    """解析多行产品序列（tagged_lines 为 classify_quotation_line 的结果），返回合并后的产品信息"""
     
     # 收集候选行
     candidate_lines = []
     i = start_index
     
     # 最多向前看3行
-    while i < len(lines) and i < start_index + 3:
-        line = lines[i].strip()
-        if line:
-            candidate_lines.append(line)
+    while i < len(tagged_lines) and i < start_index + 3:
+        tagged = tagged_lines[i]
+        if tagged.text:
+            candidate_lines.append(tagged.text)
             
             # 如果这一行包含价格，可能是完整的产品信息
-            if re.search(r'\d+\.\d{2}', line):
+            if tagged.has_price:
                 merged_text = ' '.join(candidate_lines)
                 parsed = parse_multiline_product_correctly(merged_text, current_door_color)
                 
                 if parsed:
                     return {
-                        'product': parsed,
+                        'item': parsed,
                         'next_index': i + 1
                     }
         i += 1
@@ -894,7 +1660,7 @@ def parse_multiline_product_sequence(lines, start_index, current_door_color):
     return None
 
 def parse_multiline_product_correctly(merged_text, current_door_color):
-    """正确解析多行产品格式"""
+    """正确解析多行产品格式，返回解析中间结果（SKU由 resolve_quotation_item 生成）"""
     
     parts = merged_text.split()
     if len(parts) < 6:
@@ -985,24 +1751,15 @@ def parse_multiline_product_correctly(merged_text, current_door_color):
     if not description:
         description = 'Base Accessory'  # 默认描述
     
-    # 生成SKU（包含映射处理）
-    sku = generate_final_sku(user_code, description, current_door_color)
-    
-    # 获取价格（使用PDF中的价格作为unit_price）
-    try:
-        unit_price = float(price.replace(',', ''))
-    except ValueError:
-        unit_price = 0.0
-    
     return {
+        'type': 'multiline',  # 多行产品：价格为单价
         'seq_num': seq_num,
         'manuf_code': manuf_code,
-        'sku': sku,
         'qty': qty,
-        'door_color': current_door_color or 'N/A',
-        'unit_price': unit_price,
+        'door_color': current_door_color,
         'user_code': user_code,
-        'description': description
+        'description': description,
+        'price': price
     }
 
 def parse_single_product(user_code, seq_num, description, price, qty_user, current_door_color, products):
@@ -1210,42 +1967,115 @@ def parse_product_segment(segment, current_door_color, products):
         products.append(product)
     
 
+# PDF解析SKU生成规则的默认值（data/sku_rules.json 缺失或无效时使用），按顺序匹配
+DEFAULT_PDF_SKU_RULES = [
+    {'id': 'cabinet_rule', 'keywords': ['CABINET', 'BOX'], 'format': 'PLY-{processed_user_code}-BOX'},
+    {'id': 'door_rule', 'keywords': ['DOOR'], 'format': '{door_color}-{processed_user_code}-DOOR'},
+    {'id': 'hardware_rule', 'keywords': ['HARDWARE', 'HW'], 'format': 'HW-{user_code}'},
+    {'id': 'molding_rule', 'keywords': ['MOLDING'], 'format': '{door_color}-{user_code}'},
+    {'id': 'toe_kick_rule', 'keywords': ['TOE KICK'], 'format': '{door_color}-{user_code}'},
+    {'id': 'filler_rule', 'keywords': ['FILLER'], 'format': '{door_color}-{user_code}'},
+    {'id': 'end_panel_rule', 'keywords': ['ENDING PANEL', 'END PANEL'], 'format': '{door_color}-{user_code}'},
+    {'id': 'assembly_rule', 'keywords': ['ASSM', 'ASSEMBLY'], 'format': '{processed_user_code}-PLY-{door_color}'},
+    {'id': 'default_rule', 'pattern': '*', 'format': '找不到产品'},
+]
+# format 中可以使用的字段
+SKU_RULE_FIELDS = ('user_code', 'processed_user_code', 'door_color')
+
+CompiledSkuRule = namedtuple('CompiledSkuRule', ['id', 'format', 'needs_processed_code'])
+
+
+class SkuRuleError(ValueError):
+    """SKU生成规则无效，key 为翻译键，params 为错误信息中的字段"""
+
+    def __init__(self, key, **params):
+        super().__init__(key, params)
+        self.key = key
+        self.params = params
+
+    def translated(self):
+        return _(self.key).format(**self.params)
+
+
+class SkuRuleSet:
+    """编译后的SKU生成规则
+    
+    每条规则的关键字在编译时转为大写元组，按规则顺序检查，第一条命中的规则生效（与原来的 if/elif 顺序一致）；
+    没有关键字（pattern 为 *）的规则作为默认规则。format 在编译时校验字段并预先绑定。
+    规则集创建后不再修改，重新加载时整体替换。
+    """
+
+    def __init__(self, rules, version=0, source='default'):
+        self.version = version
+        self.source = source
+        self.rules = []
+        self.default_rule = CompiledSkuRule('default_rule', '找不到产品'.format, False)
+        self._keyword_rules = []
+        for rule in rules:
+            if not rule.get('enabled', True):
+                continue
+            compiled = self._compile_rule(rule)
+            keywords = self._rule_keywords(rule)
+            self.rules.append(compiled)
+            if not keywords:
+                # 第一条默认规则之后的规则永远不会被使用
+                self.default_rule = compiled
+                break
+            self._keyword_rules.append((keywords, compiled))
+
+    @staticmethod
+    def _rule_keywords(rule):
+        """规则的关键字（大写元组），keywords 必须是字符串列表，否则字符串会被逐字符当作关键字"""
+        rule_id = rule.get('id', '')
+        keywords = rule.get('keywords')
+        if keywords is None:
+            pattern = rule.get('pattern', '*')
+            if not isinstance(pattern, str):
+                raise SkuRuleError('sku_rule_pattern_invalid', rule_id=rule_id)
+            keywords = [] if pattern == '*' else [pattern]
+        elif not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            raise SkuRuleError('sku_rule_keywords_invalid', rule_id=rule_id)
+        return tuple(keyword.upper() for keyword in keywords if keyword)
+
+    @staticmethod
+    def _compile_rule(rule):
+        """校验 format 中的字段，并转换为按位置传参的格式串（比关键字参数格式化更快）"""
+        rule_id = rule.get('id', '')
+        template = rule.get('format')
+        if not isinstance(template, str):
+            raise SkuRuleError('sku_rule_missing_format', rule_id=rule_id)
+        pieces = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            pieces.append(literal.replace('{', '{{').replace('}', '}}'))
+            if field is not None:
+                if field not in SKU_RULE_FIELDS:
+                    raise SkuRuleError('sku_rule_unknown_field', rule_id=rule_id, field=f"{{{field}}}")
+                pieces.append('{' + str(SKU_RULE_FIELDS.index(field)) + (f"!{conversion}" if conversion else '') +
+                              (f":{spec}" if spec else '') + '}')
+        return CompiledSkuRule(rule_id, ''.join(pieces).format, '{processed_user_code' in template)
+
+    def match(self, description):
+        """返回 description 命中的规则（不区分大小写的子串匹配）"""
+        description_upper = description.upper()
+        for keywords, rule in self._keyword_rules:
+            for keyword in keywords:
+                if keyword in description_upper:
+                    return rule
+        return self.default_rule
+
+    def generate(self, user_code, description, door_color):
+        rule = self.match(description)
+        # 处理用户代码，移除L和R后缀
+        processed_user_code = user_code.replace('-L', '').replace('-R', '') if rule.needs_processed_code else user_code
+        return rule.format(user_code, processed_user_code, door_color or 'N/A')
+
+
+sku_rule_set = SkuRuleSet(DEFAULT_PDF_SKU_RULES)
+
+
 def generate_sku(user_code, description, door_color):
-    """根据产品描述生成SKU"""
-    description_upper = description.upper()
-    door_color = door_color or 'N/A'
-    
-    # 处理用户代码，移除L和R后缀
-    processed_user_code = user_code.replace('-L', '').replace('-R', '')
-    
-    # 根据产品类型生成SKU
-    if 'CABINET' in description_upper or 'BOX' in description_upper:
-        # 柜身类产品
-        return f"PLY-{processed_user_code}-BOX"
-    elif 'DOOR' in description_upper:
-        # 门板类产品
-        return f"{door_color}-{processed_user_code}-DOOR"
-    elif 'HARDWARE' in description_upper or 'HW' in description_upper:
-        # 五金件
-        return f"HW-{user_code}"
-    elif 'MOLDING' in description_upper:
-        # 装饰条
-        return f"{door_color}-{user_code}"
-    elif 'TOE KICK' in description_upper:
-        # 踢脚线
-        return f"{door_color}-{user_code}"
-    elif 'FILLER' in description_upper:
-        # 填充板
-        return f"{door_color}-{user_code}"
-    elif 'ENDING PANEL' in description_upper or 'END PANEL' in description_upper:
-        # 端板
-        return f"{door_color}-{user_code}"
-    elif 'ASSM' in description_upper or 'ASSEMBLY' in description_upper:
-        # 组合件
-        return f"{processed_user_code}-PLY-{door_color}"
-    else:
-        # 其他产品，使用默认格式
-        return f"找不到产品"
+    """根据产品描述生成SKU（规则见 data/sku_rules.json 的 pdf_parsing_rules）"""
+    return sku_rule_set.generate(user_code, description, door_color)
 
 
 def generate_possible_skus(category, product, box_variant, door_variant):
@@ -1258,9 +2088,6 @@ def generate_possible_skus(category, product, box_variant, door_variant):
     if not base_sku:
         return possible_skus
     
-    # 添加调试日志
-    print(f"DEBUG: generate_possible_skus - category: '{category}', product: '{product}', box_variant: '{box_variant}', door_variant: '{door_variant}'")
-    
     # 根据产品类别生成不同的SKU格式
     if category == 'Assm.组合件':
         # 组合件格式：{产品代码}-{柜身变体}-{门板颜色}
@@ -1322,9 +2149,6 @@ def generate_possible_skus(category, product, box_variant, door_variant):
         else:
             possible_skus.append(base_sku)
     
-    # 添加调试日志
-    print(f"DEBUG: generated possible_skus: {possible_skus}")
-    
     return possible_skus
 
 
@@ -1334,7 +2158,17 @@ def apply_sku_mapping(original_sku):
     return sku_mappings.get(original_sku, original_sku)
 
 def generate_final_sku(user_code, description, door_color):
-    """生成最终的SKU（包含映射处理）"""
+    """生成最终的SKU（包含映射处理）
+    
+    同一项目中相同的 (user_code, description, door_color) 大量重复，结果按输入缓存；
+    缓存键包含SKU映射和SKU规则的版本号，映射或规则变化后旧结果不再命中。
+    """
+    return _generate_final_sku_cached(user_code, description, door_color,
+                                      sku_mapping_version, sku_rule_set.version)
+
+
+@lru_cache(maxsize=app.config['SKU_CACHE_SIZE'])
+def _generate_final_sku_cached(user_code, description, door_color, mapping_version, rules_version):
     # 先生成原始SKU
     original_sku = generate_sku(user_code, description, door_color)
     
@@ -1344,6 +2178,919 @@ def generate_final_sku(user_code, description, door_color):
     return final_sku
 
 
+def sku_cache_stats():
+    """SKU生成缓存的命中统计"""
+    info = _generate_final_sku_cached.cache_info()
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+        'mapping_version': sku_mapping_version,
+        'rules_version': sku_rule_set.version
+    }
+
+
+class PipelineTimer:
+    """报价单上传处理的分阶段计时 - 记录各阶段耗时及页数、行数、产品数"""
+
+    def __init__(self):
+        self.stages = OrderedDict()
+        self.counts = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """统计一个阶段的耗时，同名阶段多次执行时累加"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start)
+
+    def set_counts(self, **counts):
+        self.counts.update(counts)
+
+    def merge(self, stages):
+        """累加在其他进程中统计的阶段耗时（秒）"""
+        for name, seconds in stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def as_dict(self):
+        """计时结果（毫秒），用于响应中的调试信息"""
+        return {
+            'stages_ms': {name: round(seconds * 1000, 3) for name, seconds in self.stages.items()},
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            **self.counts
+        }
+
+    def server_timing_header(self):
+        """生成 Server-Timing 响应头"""
+        return ', '.join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items())
+
+
+class PipelineStats:
+    """报价单上传处理各阶段耗时的滚动统计（每个阶段保留最近 window 次），供管理员查询"""
+
+    # 直方图区间上限（毫秒）
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self, window=500):
+        self.window = window
+        self.requests = 0
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, timer):
+        """记录一次请求的各阶段耗时"""
+        with self._lock:
+            self.requests += 1
+            for name, seconds in timer.stages.items():
+                if name not in self._samples:
+                    self._samples[name] = deque(maxlen=self.window)
+                self._samples[name].append(seconds * 1000)
+
+    def snapshot(self):
+        """各阶段的次数、平均值、分位数和直方图"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            requests = self.requests
+        stages = {}
+        for name, values in samples.items():
+            count = len(values)
+            histogram = []
+            index = 0
+            for upper in self.BUCKETS_MS:
+                bucket_count = 0
+                while index < count and values[index] <= upper:
+                    bucket_count += 1
+                    index += 1
+                histogram.append({'le_ms': upper, 'count': bucket_count})
+            histogram.append({'le_ms': None, 'count': count - index})
+            stages[name] = {
+                'count': count,
+                'mean_ms': round(sum(values) / count, 3),
+                'p50_ms': round(values[int(count * 0.5)], 3),
+                'p90_ms': round(values[min(count - 1, int(count * 0.9))], 3),
+                'p99_ms': round(values[min(count - 1, int(count * 0.99))], 3),
+                'max_ms': round(values[-1], 3),
+                'histogram': histogram
+            }
+        return {'requests': requests, 'window': self.window, 'stages': stages}
+
+
+quotation_pipeline_stats = PipelineStats()
+
+
+def is_debug_request():
+    """请求是否要求在响应中附带调试信息（?debug=1 或表单字段 debug=1）"""
+    value = request.args.get('debug') or request.form.get('debug') or ''
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class QuotationPdfCache:
+    """报价单PDF解析缓存 - 以上传文件内容的SHA-256为键
+    
+    缓存逐页文本和 tokenize_quotation_pdf 的中间结果，重复上传同一文件时无需再运行PyPDF2。
+    内存中按LRU淘汰（条目数和估算的占用字节数都有上限），配置磁盘目录后同时写入磁盘，进程重启后仍可命中。
+    """
+
+    def __init__(self, max_entries=32, disk_dir=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, content_hash):
+        return os.path.join(self.disk_dir, f"{content_hash}.json")
+
+    @staticmethod
+    def is_valid_entry(entry):
+        """磁盘上的条目结构是否完整：pages 为字符串列表，tokens 为字典"""
+        return (isinstance(entry, dict) and isinstance(entry.get('pages'), list)
+                and all(isinstance(page, str) for page in entry['pages'])
+                and isinstance(entry.get('tokens'), dict))
+
+    @staticmethod
+    def entry_size(entry):
+        """估算条目占用的内存：逐页文本的字符数，解析中间结果按同等大小估算"""
+        return 2 * sum(len(page) for page in entry['pages'])
+
+    def _remember(self, content_hash, entry):
+        """写入内存层并按LRU淘汰（调用方需持有锁），至少保留最新的一个条目"""
+        self.total_bytes -= self._sizes.get(content_hash, 0)
+        self._entries[content_hash] = entry
+        self._entries.move_to_end(content_hash)
+        self._sizes[content_hash] = self.entry_size(entry)
+        self.total_bytes += self._sizes[content_hash]
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or
+                                          (self.max_bytes and self.total_bytes > self.max_bytes)):
+            evicted_hash, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(evicted_hash)
+
+    def get(self, content_hash):
+        """获取缓存条目 {'pages': [...], 'tokens': {...}}，未命中返回None"""
+        with self._lock:
+            entry = self._entries.get(content_hash)
+            if entry is not None:
+                self._entries.move_to_end(content_hash)
+                self.hits += 1
+                return entry
+        if self.disk_dir and os.path.exists(self._disk_path(content_hash)):
+            try:
+                with open(self._disk_path(content_hash), 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if not self.is_valid_entry(entry):
+                    raise ValueError(f"缓存条目格式错误: {content_hash}")
+                with self._lock:
+                    self._remember(content_hash, entry)
+                    self.disk_hits += 1
+                return entry
+            except Exception as e:
+                print(f"读取PDF解析缓存失败: {e}")
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, content_hash, pages, tokens):
+        """保存逐页文本和解析中间结果"""
+        entry = {'pages': list(pages), 'tokens': tokens}
+        with self._lock:
+            self._remember(content_hash, entry)
+        if self.disk_dir:
+            try:
+                # 先写临时文件再替换，避免并发读取到不完整的文件
+                temp_path = f"{self._disk_path(content_hash)}.{uuid.uuid4().hex}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(temp_path, self._disk_path(content_hash))
+            except Exception as e:
+                print(f"写入PDF解析缓存失败: {e}")
+        return entry
+
+    def stats(self):
+        """缓存命中统计"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'disk_enabled': bool(self.disk_dir)
+            }
+
+
+quotation_pdf_cache = QuotationPdfCache(
+    max_entries=app.config['QUOTATION_CACHE_SIZE'],
+    disk_dir=app.config['QUOTATION_CACHE_DIR'],
+    max_bytes=int(app.config['QUOTATION_CACHE_MAX_MB'] * 1024 * 1024)
+)
+
+
+class UploadStore:
+    """上传文件存储 - 按内容SHA-256保存，相同内容只存一份
+    
+    文件保存在 <root>/<哈希前两位>/<哈希><扩展名>，每次上传生成一个 document_id 引用该文件，
+    索引保存在 <root>/index.json。引用超过保留时间（按最后访问时间）后失效，
+    没有引用的文件被删除；总大小超过配额时按最后访问时间从旧到新删除文件及其引用。
+    """
+
+    def __init__(self, root, ttl_seconds, quota_bytes, reap_interval=600):
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.quota_bytes = quota_bytes
+        self.reap_interval = reap_interval
+        self.index_path = os.path.join(root, 'index.json')
+        self._lock = threading.Lock()
+        self._last_reap = 0
+        os.makedirs(root, exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                index.setdefault('objects', {})
+                index.setdefault('documents', {})
+                return index
+            except Exception as e:
+                print(f"读取上传文件索引失败: {e}")
+        return {'objects': {}, 'documents': {}}
+
+    def _save_index(self):
+        """保存索引（调用方需持有锁），先写临时文件再替换"""
+        temp_path = f"{self.index_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(temp_path, self.index_path)
+
+    def object_path(self, content_hash, ext=''):
+        return os.path.join(self.root, content_hash[:2], f"{content_hash}{ext}")
+
+    def put(self, content, filename):
+        """保存文件内容，返回 {'document_id', 'content_hash', 'path', 'filename', ...}"""
+        def write(path):
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+        return self._put(hashlib.sha256(content).hexdigest(), len(content), filename, write)
+
+    def put_spool(self, spool, filename):
+        """保存接收时已写入磁盘的上传文件（UploadSpool），直接移入存储而不读入内存"""
+        return self._put(spool.content_hash, spool.size, filename, spool.move_to)
+
+    @property
+    def spool_dir(self):
+        """接收中的上传文件所在目录，与存储在同一文件系统以便直接移入"""
+        return os.path.join(self.root, 'tmp')
+
+    def _put(self, content_hash, size, filename, write):
+        ext = os.path.splitext(filename)[1].lower()
+        now = time.time()
+        with self._lock:
+            obj = self._index['objects'].get(content_hash)
+            if obj is None or not os.path.exists(self.object_path(content_hash, obj['ext'])):
+                obj = {'ext': ext, 'size': size, 'created': now, 'last_access': now, 'refs': []}
+                path = self.object_path(content_hash, ext)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                write(path)
+                self._index['objects'][content_hash] = obj
+            document_id = uuid.uuid4().hex
+            obj['refs'].append(document_id)
+            obj['last_access'] = now
+            document = {'content_hash': content_hash, 'filename': filename, 'created': now, 'last_access': now}
+            self._index['documents'][document_id] = document
+            self._save_index()
+        self.maybe_reap()
+        return self._describe(document_id, document, obj)
+
+    def put_file(self, source_path, filename):
+        """保存已生成的文件（如导出报表）并删除原文件"""
+        with open(source_path, 'rb') as f:
+            content = f.read()
+        record = self.put(content, filename)
+        os.remove(source_path)
+        return record
+
+    def _describe(self, document_id, document, obj):
+        return {
+            'document_id': document_id,
+            'content_hash': document['content_hash'],
+            'filename': document['filename'],
+            'path': self.object_path(document['content_hash'], obj['ext']),
+            'size': obj['size']
+        }
+
+    def get(self, document_id):
+        """按 document_id 获取文件信息并更新最后访问时间，不存在或已清理时返回None"""
+        with self._lock:
+            document = self._index['documents'].get(document_id or '')
+            if document is None:
+                return None
+            obj = self._index['objects'].get(document['content_hash'])
+            if obj is None or not os.path.exists(self.object_path(document['content_hash'], obj['ext'])):
+                return None
+            now = time.time()
+            document['last_access'] = now
+            obj['last_access'] = now
+            return self._describe(document_id, document, obj)
+
+    def release(self, document_id):
+        """释放引用，文件没有其他引用时在下次清理时删除"""
+        with self._lock:
+            if self._drop_document(document_id):
+                self._save_index()
+
+    def _drop_document(self, document_id):
+        """删除引用（调用方需持有锁）"""
+        document = self._index['documents'].pop(document_id, None)
+        if document is None:
+            return False
+        obj = self._index['objects'].get(document['content_hash'])
+        if obj is not None and document_id in obj['refs']:
+            obj['refs'].remove(document_id)
+        return True
+
+    def _drop_object(self, content_hash):
+        """删除文件及其所有引用（调用方需持有锁）"""
+        obj = self._index['objects'].pop(content_hash)
+        for document_id in obj['refs']:
+            self._index['documents'].pop(document_id, None)
+        path = self.object_path(content_hash, obj['ext'])
+        try:
+            os.remove(path)
+            if not os.listdir(os.path.dirname(path)):
+                os.rmdir(os.path.dirname(path))
+        except FileNotFoundError:
+            pass
+        return obj['size']
+
+    def maybe_reap(self):
+        """距上次清理超过 reap_interval 秒时执行清理"""
+        if time.time() - self._last_reap >= self.reap_interval:
+            self.reap()
+
+    def reap(self, now=None):
+        """清理过期引用、无引用文件，并把总大小控制在配额以内，返回清理统计"""
+        now = now or time.time()
+        removed_documents = removed_objects = freed_bytes = 0
+        with self._lock:
+            self._last_reap = now
+            for document_id, document in list(self._index['documents'].items()):
+                if now - document['last_access'] > self.ttl_seconds:
+                    self._drop_document(document_id)
+                    removed_documents += 1
+            for content_hash, obj in list(self._index['objects'].items()):
+                if not obj['refs']:
+                    freed_bytes += self._drop_object(content_hash)
+                    removed_objects += 1
+            total_bytes = sum(obj['size'] for obj in self._index['objects'].values())
+            if total_bytes > self.quota_bytes:
+                for content_hash, obj in sorted(self._index['objects'].items(), key=lambda pair: pair[1]['last_access']):
+                    if total_bytes <= self.quota_bytes:
+                        break
+                    removed_documents += len(obj['refs'])
+                    size = self._drop_object(content_hash)
+                    total_bytes -= size
+                    freed_bytes += size
+                    removed_objects += 1
+            self._save_index()
+        # 进程异常退出时遗留的接收中文件
+        if os.path.isdir(self.spool_dir):
+            for name in os.listdir(self.spool_dir):
+                path = os.path.join(self.spool_dir, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                except OSError:
+                    pass
+        if removed_objects or removed_documents:
+            print(f"清理上传文件: 删除 {removed_objects} 个文件、{removed_documents} 个引用，释放 {freed_bytes} 字节")
+        return {'removed_documents': removed_documents, 'removed_objects': removed_objects, 'freed_bytes': freed_bytes}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'documents': len(self._index['documents']),
+                'objects': len(self._index['objects']),
+                'total_bytes': sum(obj['size'] for obj in self._index['objects'].values()),
+                'quota_bytes': self.quota_bytes,
+                'ttl_seconds': self.ttl_seconds
+            }
+
+
+upload_store = UploadStore(
+    app.config['UPLOAD_STORE_DIR'],
+    ttl_seconds=app.config['UPLOAD_STORE_TTL_HOURS'] * 3600,
+    quota_bytes=app.config['UPLOAD_STORE_QUOTA_MB'] * 1024 * 1024,
+    reap_interval=app.config['UPLOAD_STORE_REAP_INTERVAL']
+)
+
+
+# 文件头（magic bytes），按扩展名检查上传内容
+UPLOAD_MAGIC = {
+    '.pdf': b'%PDF-',
+    '.xlsx': b'PK\x03\x04',
+    '.xls': b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',
+}
+# 各上传接口：(允许的扩展名, 单个文件大小上限配置项, 扩展名不符时的提示, 单个文件出错时是否整个请求失败)
+# 批量接口逐个文件返回错误，不因一个文件失败整个请求
+UPLOAD_ENDPOINT_RULES = {
+    'upload_quotation': (('.pdf',), 'QUOTATION_UPLOAD_MAX_MB', 'upload_pdf_file', True),
+    'upload_quotation_stream': (('.pdf',), 'QUOTATION_UPLOAD_MAX_MB', 'upload_pdf_file', True),
+    'upload_quotations_batch': (('.pdf',), 'QUOTATION_UPLOAD_MAX_MB', 'upload_pdf_file', False),
+    'export_occw_excel_from_pdf': (('.pdf',), 'QUOTATION_UPLOAD_MAX_MB', 'upload_pdf_file', True),
+    'upload_prices': (('.xlsx', '.csv'), 'EXCEL_UPLOAD_MAX_MB', 'upload_excel_csv', True),
+    'upload_occw_prices': (('.xlsx', '.xls'), 'EXCEL_UPLOAD_MAX_MB', 'invalid_file_format', True),
+    'upload_sales_data': (('.xlsx', '.xls'), 'EXCEL_UPLOAD_MAX_MB', 'invalid_file_format', True),
+}
+
+
+class UploadRejected(HTTPException):
+    """上传文件在接收过程中被拒绝（类型不符或超过大小上限）"""
+    code = 400
+
+    def __init__(self, message, code=400):
+        super().__init__(message)
+        self.code = code
+
+
+class UploadSpool:
+    """上传文件边接收边写入磁盘，同时检查文件头、计算SHA-256并限制大小
+    
+    第一块数据到达时即检查文件头，超过大小上限时立即停止，不合格的文件不会完整写入磁盘，
+    也不会进入PDF/Excel解析。strict 为 False 时不抛出异常，只记录 error 并丢弃后续数据，
+    由接口逐个文件返回错误。文件移入上传文件存储前关闭（请求结束时）会被删除。
+    """
+
+    def __init__(self, directory, filename, allowed_exts, max_bytes, type_error, strict=True):
+        self.filename = filename or ''
+        self.max_bytes = max_bytes
+        self.strict = strict
+        self.size = 0
+        self.error = None
+        self._hash = hashlib.sha256()
+        self._head = b''
+        ext = os.path.splitext(self.filename)[1].lower()
+        self._magic = UPLOAD_MAGIC.get(ext)
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{uuid.uuid4().hex}.upload")
+        self._file = open(self.path, 'w+b')
+        if allowed_exts is not None and ext not in allowed_exts:
+            self._reject(_(type_error))
+
+    def _reject(self, message, code=400):
+        self.error = message
+        self.discard()
+        if self.strict:
+            raise UploadRejected(message, code)
+
+    def write(self, data):
+        if self.error is not None:
+            return len(data)
+        self.size += len(data)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            self._reject(_('upload_file_too_large').format(
+                filename=self.filename, max_mb=f"{self.max_bytes / (1024 * 1024):g}"), 413)
+            return len(data)
+        if self._magic is not None and len(self._head) < len(self._magic):
+            self._head += data[:len(self._magic) - len(self._head)]
+            if len(self._head) == len(self._magic):
+                self._check_magic()
+                if self.error is not None:
+                    return len(data)
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def _check_magic(self):
+        if self._head != self._magic:
+            self._reject(_('upload_content_mismatch').format(filename=self.filename))
+
+    def seek(self, offset, whence=0):
+        # 接收完成后表单解析会回到文件开头，此时检查比文件头还短的文件
+        if self.error is None and self._magic is not None and len(self._head) < len(self._magic):
+            self._check_magic()
+        if self.error is not None:
+            return 0
+        return self._file.seek(offset, whence)
+
+    def __getattr__(self, name):
+        if name == '_file':
+            raise AttributeError(name)
+        return getattr(self._file, name)
+
+    @property
+    def content_hash(self):
+        return self._hash.hexdigest()
+
+    def move_to(self, path):
+        """移入上传文件存储（之后不再删除）"""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = None
+
+    def discard(self):
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+    def close(self):
+        self.discard()
+
+
+class UploadRequest(Request):
+    """按接口限制上传：请求大小超过上限时在读取请求体之前返回413，文件边接收边检查"""
+
+    @property
+    def max_content_length(self):
+        rule = UPLOAD_ENDPOINT_RULES.get(self.endpoint)
+        if rule is None:
+            return app.config['MAX_CONTENT_LENGTH']
+        file_limit = int(app.config[rule[1]] * 1024 * 1024)
+        file_count = app.config['QUOTATION_BATCH_MAX_FILES'] if not rule[3] else 1
+        # 另加1MB给表单中的其他字段
+        return file_limit * file_count + 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        rule = UPLOAD_ENDPOINT_RULES.get(self.endpoint)
+        if rule is None:
+            return UploadSpool(upload_store.spool_dir, filename, None, None, None)
+        allowed_exts, limit_key, type_error, strict = rule
+        return UploadSpool(upload_store.spool_dir, filename, allowed_exts,
+                           int(app.config[limit_key] * 1024 * 1024), type_error, strict)
+
+
+app.request_class = UploadRequest
+
+
+@app.before_request
+def receive_uploads():
+    """上传接口在进入视图之前接收并检查文件，被拒绝的上传不会进入视图中的解析和异常处理"""
+    if request.method == 'POST' and request.endpoint in UPLOAD_ENDPOINT_RULES:
+        request.files
+
+
+@app.errorhandler(UploadRejected)
+@app.errorhandler(RequestEntityTooLarge)
+def handle_rejected_upload(e):
+    """上传被拒绝时与各上传接口一样返回JSON错误"""
+    if isinstance(e, RequestEntityTooLarge):
+        limit = request.max_content_length / (1024 * 1024)
+        return jsonify({'success': False, 'error': _('upload_request_too_large').format(max_mb=f"{limit:g}")}), 413
+    return jsonify({'success': False, 'error': e.description}), e.code
+
+
+def store_upload(file, filename):
+    """保存上传文件到上传文件存储，返回存储记录；文件已在接收时写入磁盘的直接移入"""
+    if isinstance(file.stream, UploadSpool) and file.stream.error is None:
+        return upload_store.put_spool(file.stream, filename)
+    return upload_store.put(file.read(), filename)
+
+
+def quotation_cache_key(content_hash, backend_name=None):
+    """解析缓存的键：默认提取后端直接使用文件内容哈希，其他后端的提取结果可能不同，键中附加后端名称"""
+    backend_name = backend_name or pdf_backend_name()
+    return content_hash if backend_name == DEFAULT_PDF_BACKEND else f"{content_hash}.{backend_name}"
+
+
+def load_cached_quotation(cache_key, timer=None):
+    """从解析缓存读取报价单，返回 (PdfExtraction, tokens)，未命中时返回None
+    
+    缓存中的解析结果版本过旧（或跳页设置不同）时根据缓存的逐页文本重新解析并写回缓存。
+    """
+    timer = timer or PipelineTimer()
+    with timer.stage('cache'):
+        entry = quotation_pdf_cache.get(cache_key)
+    if entry is None:
+        return None
+    extraction = PdfExtraction(entry['pages'])
+    tokens = entry['tokens']
+    if not is_current_quotation_tokens(tokens):
+        tokens = tokenize_quotation_pages(extraction.pages, timer=timer)
+        quotation_pdf_cache.put(cache_key, extraction.pages, tokens)
+    return extraction, tokens
+
+
+def load_quotation_document(filepath, content_hash, timer=None):
+    """提取并解析报价单PDF，优先使用缓存，返回 (PdfExtraction, tokens, 是否命中缓存)
+    
+    缓存命中时跳过PDF提取；缓存中的解析结果版本过旧时只根据缓存的逐页文本重新解析。
+    传入 PipelineTimer 时记录 cache、extract、scan、mark（生成带页面分隔符的解析文本）、parse 各阶段耗时。
+    """
+    timer = timer or PipelineTimer()
+    backend_name = pdf_backend_name()
+    cache_key = quotation_cache_key(content_hash, backend_name)
+    cached = load_cached_quotation(cache_key, timer)
+    if cached is not None:
+        extraction, tokens = cached
+        return extraction, tokens, True
+    
+    if pdf_sandbox_enabled():
+        # 在受限的子进程中提取和解析，sandbox 阶段为启动子进程和传输结果的开销
+        start = time.perf_counter()
+        pages, tokens, error, stages = run_pdf_sandboxes({content_hash: filepath}, backend_name=backend_name)[content_hash]
+        timer.merge(stages)
+        timer.merge({'sandbox': time.perf_counter() - start - sum(stages.values())})
+        extraction = PdfExtraction(pages, error)
+    else:
+        with timer.stage('extract'):
+            extraction = extract_pdf_pages(filepath, backend_name=backend_name)
+        tokens = tokenize_quotation_pages(extraction.pages, timer=timer)
+    # 提取失败的结果不缓存，下次上传时重试
+    if extraction.error is None:
+        quotation_pdf_cache.put(cache_key, extraction.pages, tokens)
+    return extraction, tokens, False
+
+
+# document_id：上传文件存储生成的 uuid4 hex，或 /reparse_quotation_lines 生成的 SHA-256 hex
+DOCUMENT_ID_PATTERN = re.compile(r'[0-9a-f]{32,64}')
+
+
+def is_valid_document_id(document_id):
+    """document_id 只能是十六进制字符串，同时用作缓存文件名，不能包含路径"""
+    return isinstance(document_id, str) and DOCUMENT_ID_PATTERN.fullmatch(document_id) is not None
+
+
+def load_stored_quotation(document_id):
+    """按 document_id 获取报价单的提取结果和解析中间结果，返回 (PdfExtraction, tokens)，不存在或格式不对时返回None
+    
+    上传的文件从上传文件存储中读取（优先使用解析缓存）；
+    /reparse_quotation_lines 修正后的文档只保存在解析缓存中。
+    """
+    if not is_valid_document_id(document_id):
+        return None
+    record = upload_store.get(document_id)
+    if record is not None:
+        extraction, tokens, cached = load_quotation_document(record['path'], record['content_hash'])
+        return extraction, tokens
+    entry = quotation_pdf_cache.get(document_id)
+    if entry is None:
+        return None
+    extraction = PdfExtraction(entry['pages'])
+    tokens = entry['tokens']
+    if not is_current_quotation_tokens(tokens):
+        tokens = tokenize_quotation_pages(extraction.pages)
+        quotation_pdf_cache.put(document_id, extraction.pages, tokens)
+    return extraction, tokens
+
+
+def extract_and_tokenize_pdf(pdf_path, skip_non_table_pages=None, backend_name=None):
+    """提取并解析报价单PDF，返回 (逐页文本, 解析中间结果, 错误信息)（在进程池的子进程中运行）
+    
+    解析中间结果与SKU映射无关，SKU由父进程根据最新映射生成。
+    """
+    extraction = extract_pdf_pages(pdf_path, parallel=False, backend_name=backend_name)
+    return extraction.pages, tokenize_quotation_pages(extraction.pages, skip_non_table_pages), extraction.error
+
+
+class PdfSandboxError(Exception):
+    """沙箱中的PDF提取或解析超出限制，limit 为 timeout（超时）、memory（内存超限）或 crash（子进程异常退出）
+    
+    params 为错误信息中的字段，接口通过 translated() 按 pdf_sandbox_<limit> 翻译。
+    """
+
+    def __init__(self, limit, **params):
+        super().__init__(', '.join([limit] + [f"{name}={value}" for name, value in params.items()]))
+        self.limit = limit
+        self.params = params
+
+    def translated(self):
+        return _(f'pdf_sandbox_{self.limit}').format(**self.params)
+
+
+def pdf_read_error(error):
+    """PDF读取失败时返回 (错误信息, 状态码)：超出沙箱限制是上传文件的问题，返回422，其他错误返回500"""
+    if isinstance(error, PdfSandboxError):
+        return f'{_("read_pdf_failed")}: {error.translated()}', 422
+    return f'{_("read_pdf_failed")}: {error}', 500
+
+
+class PdfSandboxStats:
+    """沙箱运行次数和各类限制触发次数，保留最近的失败记录，供管理员查询"""
+
+    def __init__(self, recent=20):
+        self.runs = 0
+        self.tripped = {'timeout': 0, 'memory': 0, 'crash': 0}
+        self.recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+
+    def record_run(self):
+        with self._lock:
+            self.runs += 1
+
+    def record_failure(self, pdf_path, error):
+        print(f"PDF沙箱失败（{error.limit}）: {os.path.basename(pdf_path)}: {error}")
+        with self._lock:
+            self.tripped[error.limit] += 1
+            self.recent.append({
+                'time': datetime.now().isoformat(timespec='seconds'),
+                'file': os.path.basename(pdf_path),
+                'limit': error.limit,
+                'error': str(error)
+            })
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'enabled': pdf_sandbox_enabled(),
+                'timeout_seconds': app.config['PDF_SANDBOX_TIMEOUT'],
+                'memory_mb': app.config['PDF_SANDBOX_MEMORY_MB'],
+                'runs': self.runs,
+                'tripped': dict(self.tripped),
+                'recent': list(self.recent)
+            }
+
+
+pdf_sandbox_stats = PdfSandboxStats()
+
+
+def pdf_sandbox_enabled():
+    """沙箱依赖 fork，Windows上不可用"""
+    return app.config['PDF_SANDBOX_ENABLED'] and hasattr(os, 'fork')
+
+
+def limit_address_space(extra_bytes):
+    """在当前地址空间的基础上最多再使用 extra_bytes（子进程继承了父进程已加载的模块，不能设绝对上限）"""
+    if resource is None or not extra_bytes:
+        return
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        current = 0
+    limit = current + extra_bytes
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _pdf_sandbox_main(conn, pdf_path, skip_non_table_pages, backend_name, memory_bytes, stream):
+    """沙箱子进程：限制内存后提取并解析PDF，结果通过管道返回；stream 为True时逐页返回文本"""
+    global _pdf_process_pool, _pdf_process_pool_lock
+    # 父进程的进程池在子进程中不可用，大PDF需要并行提取时重新创建；
+    # fork 时锁可能正被父进程的其他线程持有，直接换成新锁，不能在子进程中获取旧锁
+    _pdf_process_pool = None
+    _pdf_process_pool_lock = threading.Lock()
+    # 单独的进程组，超时时连同并行提取的子进程一起结束
+    os.setpgrp()
+    limit_address_space(memory_bytes)
+    try:
+        if stream:
+            for page_text in iter_pdf_pages(pdf_path, backend_name):
+                conn.send(('page', page_text))
+            conn.send(('done', None))
+        else:
+            timer = PipelineTimer()
+            with timer.stage('extract'):
+                extraction = extract_pdf_pages(pdf_path, backend_name=backend_name)
+            tokens = tokenize_quotation_pages(extraction.pages, skip_non_table_pages, timer)
+            conn.send(('done', (extraction.pages, tokens, extraction.error, dict(timer.stages))))
+    except MemoryError:
+        conn.send(('memory', None))
+    except Exception as e:
+        conn.send(('error', str(e)))
+    finally:
+        reset_pdf_process_pool()
+        conn.close()
+
+
+class PdfSandbox:
+    """在子进程中提取并解析一个PDF，父进程按截止时间等待结果，超限时结束子进程"""
+
+    def __init__(self, pdf_path, skip_non_table_pages=None, backend_name=None, stream=False):
+        self.pdf_path = pdf_path
+        self.timeout = app.config['PDF_SANDBOX_TIMEOUT']
+        memory_bytes = app.config['PDF_SANDBOX_MEMORY_MB'] * 1024 * 1024
+        context = multiprocessing.get_context('fork')
+        self.conn, child_conn = context.Pipe(duplex=False)
+        self.process = context.Process(target=_pdf_sandbox_main, args=(
+            child_conn, pdf_path, skip_non_table_pages, backend_name, memory_bytes, stream))
+        self.process.start()
+        child_conn.close()
+        self.deadline = time.monotonic() + self.timeout
+        pdf_sandbox_stats.record_run()
+
+    def stop(self):
+        """结束子进程及其进程组"""
+        if self.process.is_alive():
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def receive(self):
+        """接收一条结果，超出限制时结束子进程并抛出 PdfSandboxError"""
+        remaining = self.deadline - time.monotonic()
+        try:
+            if remaining <= 0 or not self.conn.poll(remaining):
+                raise PdfSandboxError('timeout', seconds=f"{self.timeout:g}")
+            try:
+                kind, payload = self.conn.recv()
+            except EOFError:
+                self.process.join()
+                raise PdfSandboxError('crash', exitcode=self.process.exitcode)
+            if kind == 'memory':
+                raise PdfSandboxError('memory', memory_mb=app.config['PDF_SANDBOX_MEMORY_MB'])
+        except PdfSandboxError as e:
+            pdf_sandbox_stats.record_failure(self.pdf_path, e)
+            self.stop()
+            raise
+        if kind == 'error':
+            self.stop()
+            raise RuntimeError(payload)
+        return kind, payload
+
+
+def run_pdf_sandboxes(jobs, skip_non_table_pages=None, backend_name=None):
+    """在沙箱中提取并解析多个PDF（同时运行的子进程数不超过 PDF_PARALLEL_WORKERS）
+    
+    jobs 为 {键: PDF路径}，返回 {键: (逐页文本, 解析中间结果, 错误信息, 各阶段耗时)}，
+    超出限制的PDF返回空结果和错误信息，不影响其他PDF。
+    """
+    waiting = list(jobs.items())
+    running = {}  # conn -> (键, PdfSandbox)
+    results = {}
+    max_running = max(1, app.config['PDF_PARALLEL_WORKERS'])
+    while waiting or running:
+        while waiting and len(running) < max_running:
+            key, pdf_path = waiting.pop(0)
+            sandbox = PdfSandbox(pdf_path, skip_non_table_pages, backend_name)
+            running[sandbox.conn] = (key, sandbox)
+        timeout = max(0, min(sandbox.deadline for key, sandbox in running.values()) - time.monotonic())
+        ready = set(wait_connections(list(running), timeout))
+        for conn in list(running):
+            key, sandbox = running[conn]
+            if conn not in ready and time.monotonic() < sandbox.deadline:
+                continue
+            del running[conn]
+            try:
+                kind, result = sandbox.receive()
+                sandbox.stop()
+                results[key] = result
+            except PdfSandboxError as e:
+                # 保留异常对象，接口据此返回翻译后的信息和422
+                results[key] = ([], tokenize_quotation_pages([], skip_non_table_pages), e, {})
+            except RuntimeError as e:
+                results[key] = ([], tokenize_quotation_pages([], skip_non_table_pages), str(e), {})
+    return results
+
+
+def extract_and_tokenize_pdfs(jobs, skip_non_table_pages=None, backend_name=None):
+    """提取并解析多个PDF，返回 {键: (逐页文本, 解析中间结果, 错误信息)}
+    
+    启用沙箱时每个PDF在受限的子进程中运行，否则使用共享进程池。
+    """
+    if pdf_sandbox_enabled():
+        return {key: result[:3] for key, result in
+                run_pdf_sandboxes(jobs, skip_non_table_pages, backend_name).items()}
+    pool = get_pdf_process_pool()
+    futures = {key: pool.submit(extract_and_tokenize_pdf, pdf_path, skip_non_table_pages, backend_name)
+               for key, pdf_path in jobs.items()}
+    results = {}
+    for key, future in futures.items():
+        try:
+            results[key] = future.result()
+        except BrokenProcessPool as e:
+            print(f"批量解析进程池失败，改为串行解析: {e}")
+            reset_pdf_process_pool()
+            results[key] = extract_and_tokenize_pdf(jobs[key], skip_non_table_pages, backend_name)
+    return results
+
+
+def iter_pdf_pages_sandboxed(pdf_path, backend_name=None):
+    """与 iter_pdf_pages 相同，启用沙箱时在受限的子进程中逐页提取，超出限制时抛出 PdfSandboxError"""
+    if not pdf_sandbox_enabled():
+        yield from iter_pdf_pages(pdf_path, backend_name)
+        return
+    sandbox = PdfSandbox(pdf_path, backend_name=backend_name, stream=True)
+    try:
+        while True:
+            kind, page_text = sandbox.receive()
+            if kind == 'done':
+                break
+            yield page_text
+    finally:
+        # 正常结束或客户端断开连接时都结束子进程
+        sandbox.stop()
+
+
 @app.route('/')
 def index():
     """主页"""
@@ -1396,6 +3143,15 @@ def detect_user_language():
     session['auto_detected'] = True
     return 'zh'
 
+def save_quotation_upload(file, filename=None):
+    """保存上传的报价单PDF（默认使用上传时的文件名），返回 (filename, filepath, content_hash, document_id)
+    
+    文件按内容保存在上传文件存储中，相同内容只存一份，不同用户上传同名文件互不覆盖。
+    """
+    filename = filename or secure_filename(file.filename)
+    record = store_upload(file, filename)
+    return filename, record['path'], record['content_hash'], record['document_id']
+
 # 修改上传接口，返回比对结果
 @app.route('/upload_quotation', methods=['POST'])
 def upload_quotation():
@@ -1408,38 +3164,389 @@ def upload_quotation():
         return jsonify({'error': _('no_file_selected')}), 400
     
     if file and file.filename.endswith('.pdf'):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        timer = PipelineTimer()
+        with timer.stage('save'):
+            filename, filepath, content_hash, document_id = save_quotation_upload(file)
+        
+        # 同一文件重复上传时直接使用缓存的文本和解析结果，只重新生成SKU（SKU映射可能已变化）
+        extraction, tokens, cached = load_quotation_document(filepath, content_hash, timer)
+        if extraction.error is not None:
+            # 无法读取的PDF，或在沙箱中超时、内存超限
+            message, status = pdf_read_error(extraction.error)
+            return jsonify({'error': message}), status
+        with timer.stage('sku'):
+            products, provenance, compare_result, compare_message = resolve_quotation_document(tokens)
+            # 计算总价
+            total_price = calculate_products_total(products)
+        with timer.stage('enrich'):
+            pricing, unmatched = enrich_quotation_products(products)
+        with timer.stage('raw_text'):
+            raw_text = extraction.raw_text
+        timer.set_counts(page_count=extraction.page_count,
+                         line_count=tokens.get('line_count'),
+                         product_count=len(products))
         
-        # 先提取原始PDF文本（不添加页面分隔符）
-        raw_pdf_content = extract_pdf_content(filepath, add_page_markers=False)
+        result = {
+            'success': True,
+            'products': products,
+            'total_price': total_price,
+            'filename': filename,
+            'raw_text': raw_text,  # 返回原始PDF文本
+            'compare_result': compare_result,
+            'compare_message': compare_message,
+            'content_hash': content_hash,
+            'document_id': document_id,  # 用于 /get_pdf_text 和 /reparse_quotation_lines
+            'cached': cached,
+            'skipped_pages': tokens.get('skipped_pages', []),
+            'provenance': provenance,  # 与 products 一一对应的来源位置
+            'pricing': pricing,  # 与 products 一一对应的OCCW价格
+            'unmatched': unmatched
+        }
+        if is_debug_request():
+            # JSON序列化耗时只出现在 Server-Timing 响应头中
+            result['debug'] = {'timing': timer.as_dict()}
+        with timer.stage('serialize'):
+            response = jsonify(result)
+        quotation_pipeline_stats.record(timer)
+        response.headers['Server-Timing'] = timer.server_timing_header()
+        return response
+    
+    return jsonify({'error': _('upload_pdf_file')}), 400
+
+@app.route('/upload_quotation_stream', methods=['POST'])
+def upload_quotation_stream():
+    """上传报价单PDF - 逐页解析并以NDJSON流式返回结果
+    
+    每行一个JSON事件：start（文件信息）、page（该页文本统计、该页解析出的产品和累计总价，无产品表的页面标记为 skipped）、
+    done（最终总价和PDF合计金额比对结果）；出错时返回 error 事件。
+    产品按解析顺序返回，跨页的多行产品在后续页的事件中返回。
+    """
+    if 'file' not in request.files:
+        return jsonify({'error': _('no_file_selected')}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': _('no_file_selected')}), 400
+    
+    if not file.filename.endswith('.pdf'):
+        return jsonify({'error': _('upload_pdf_file')}), 400
+    
+    filename, filepath, content_hash, document_id = save_quotation_upload(file)
+    # 缓存命中时使用缓存的逐页文本和解析结果（与 /upload_quotation 相同，版本过旧时重新解析），跳过PDF提取
+    backend_name = pdf_backend_name()
+    cache_key = quotation_cache_key(content_hash, backend_name)
+    cached = load_cached_quotation(cache_key)
+    
+    def generate():
+        def event(data):
+            return json.dumps(data, ensure_ascii=False) + '\n'
         
-        # 再进行解析（使用带页面分隔符的版本）
-        pdf_content_for_parsing = extract_pdf_content(filepath, add_page_markers=True)
-        products, compare_result, compare_message = parse_quotation_pdf(pdf_content_for_parsing)
+        yield event({
+            'event': 'start',
+            'filename': filename,
+            'content_hash': content_hash,
+            'document_id': document_id,
+            'cached': cached is not None,
+            'page_count': cached[0].page_count if cached is not None else None
+        })
         
-        # 计算总价
-        total_price = 0
-        for p in products:
-            try:
-                qty = int(p['qty']) if str(p['qty']).isdigit() else 0
-                unit_price = float(p['unit_price']) if p['unit_price'] is not None else 0
-                total_price += qty * unit_price
-            except (ValueError, TypeError):
-                continue
+        pages = []
+        products = []
+        running_total = 0
+        
+        def page_event(page_num, page_text, lines, page_items, skipped=False):
+            nonlocal running_total
+            if skipped:
+                # 没有产品表的页面不解析
+                return event({
+                    'event': 'page',
+                    'page': page_num + 1,
+                    'chars': len(page_text),
+                    'lines': 0,
+                    'skipped': True,
+                    'products': [],
+                    'running_total': running_total
+                })
+            page_products = [resolve_quotation_item(item) for item in page_items]
+            products.extend(page_products)
+            running_total += calculate_products_total(page_products)
+            return event({
+                'event': 'page',
+                'page': page_num + 1,
+                'chars': len(page_text),
+                'lines': lines,
+                'skipped': False,
+                'products': page_products,
+                'provenance': [quotation_item_provenance(item) for item in page_items],
+                'running_total': running_total
+            })
         
-        return jsonify({
+        if cached is not None:
+            # 按产品最后一行所在的页返回，与逐页解析时产品出现的位置一致
+            extraction, tokens = cached
+            pages = extraction.pages
+            skipped_pages = tokens.get('skipped_pages', [])
+            skipped_page_set = set(skipped_pages)
+            page_items = {}
+            for item in tokens['items']:
+                page_items.setdefault(item['source']['end_page'], []).append(item)
+            for page_num, page_text in enumerate(pages):
+                if page_num + 1 in skipped_page_set:
+                    yield page_event(page_num, page_text, 0, [], skipped=True)
+                else:
+                    lines = len(render_marked_page(page_num, page_text).split('\n')) - 1
+                    yield page_event(page_num, page_text, lines, page_items.get(page_num + 1, []))
+        else:
+            tokenizer = QuotationTokenizer()
+            skip_non_table_pages = app.config['QUOTATION_SKIP_NON_TABLE_PAGES']
+            selector = QuotationPageSelector(skip_non_table_pages)
+            skipped_pages = []
+            
+            def parse_pages(decided):
+                for page_num, page_text, selected in decided:
+                    if not selected:
+                        skipped_pages.append(page_num + 1)
+                        yield page_event(page_num, page_text, 0, [], skipped=True)
+                        continue
+                    page_lines = render_marked_page(page_num, page_text).split('\n')[:-1]
+                    tokenizer.feed_lines(page_lines)
+                    yield page_event(page_num, page_text, len(page_lines), tokenizer.run())
+            
+            try:
+                for page_num, page_text in enumerate(iter_pdf_pages_sandboxed(filepath, backend_name)):
+                    pages.append(page_text)
+                    yield from parse_pages(selector.feed(page_num, page_text))
+                # 第一张表格页之前暂存的页面（一页表格页都没有时全部解析）
+                yield from parse_pages(selector.finish())
+                
+                # 文件末尾等待后续行的多行产品
+                remaining_items = tokenizer.run(final=True)
+                if remaining_items:
+                    yield page_event(len(pages) - 1, '', 0, remaining_items)
+            except Exception as e:
+                print(f"流式解析PDF失败: {e}")
+                yield event({'event': 'error', 'error': pdf_read_error(e)[0]})
+                return
+            
+            tokens = tokenizer.result()
+            tokens['skipped_pages'] = skipped_pages
+            tokens['page_filter'] = skip_non_table_pages
+            quotation_pdf_cache.put(cache_key, pages, tokens)
+        
+        compare_result, compare_message = compare_quotation_total(products, tokens['pdf_total'])
+        pricing, unmatched = enrich_quotation_products(products)
+        yield event({
+            'event': 'done',
+            'page_count': len(pages),
+            'product_count': len(products),
+            'skipped_pages': skipped_pages,
+            'total_price': running_total,
+            'pdf_total': tokens['pdf_total'],
+            'compare_result': compare_result,
+            'compare_message': compare_message,
+            'pricing': pricing,  # 与逐页返回的 products 按顺序一一对应
+            'unmatched': unmatched
+        })
+    
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 禁止反向代理缓冲，保证逐页到达
+    return response
+
+@app.route('/upload_quotations_batch', methods=['POST'])
+def upload_quotations_batch():
+    """批量上传报价单PDF - 多个文件在子进程中并行提取和解析
+    
+    返回每个文件的产品和比对结果，以及整批按SKU汇总的数量。
+    """
+    files = [f for f in request.files.getlist('files') if f and f.filename]
+    if not files:
+        return jsonify({'error': _('no_file_selected')}), 400
+    if len(files) > app.config['QUOTATION_BATCH_MAX_FILES']:
+        return jsonify({'error': _('batch_too_many_files').format(count=app.config['QUOTATION_BATCH_MAX_FILES'])}), 400
+    
+    results = [None] * len(files)
+    documents = {}  # content_hash -> {'tokens', 'cached', 'error'}，同一批次内相同文件只解析一次
+    pending = {}  # content_hash -> filepath，缓存未命中、需要提取和解析的文件
+    used_names = set()
+    backend_name = pdf_backend_name()
+    for index, file in enumerate(files):
+        if not file.filename.endswith('.pdf'):
+            results[index] = {'filename': file.filename, 'success': False, 'error': _('upload_pdf_file')}
+            continue
+        if getattr(file.stream, 'error', None) is not None:
+            # 接收时已拒绝（文件头不符或超过大小上限）
+            results[index] = {'filename': file.filename, 'success': False, 'error': file.stream.error}
+            continue
+        # 同一批次中文件名重复时加序号（直到不与其他文件重名），便于区分各文件的结果
+        name = secure_filename(file.filename)
+        number = index + 1
+        while name in used_names:
+            name = f"{os.path.splitext(secure_filename(file.filename))[0]}_{number}.pdf"
+            number += 1
+        filename, filepath, content_hash, document_id = save_quotation_upload(file, name)
+        used_names.add(filename)
+        results[index] = {'filename': filename, 'content_hash': content_hash, 'document_id': document_id}
+        if content_hash in documents or content_hash in pending:
+            continue
+        entry = quotation_pdf_cache.get(quotation_cache_key(content_hash, backend_name))
+        if entry is not None and is_current_quotation_tokens(entry['tokens']):
+            documents[content_hash] = {'tokens': entry['tokens'], 'cached': True, 'error': None}
+        else:
+            pending[content_hash] = filepath
+    
+    extracted = extract_and_tokenize_pdfs(pending, app.config['QUOTATION_SKIP_NON_TABLE_PAGES'], backend_name)
+    for content_hash, (pages, tokens, error) in extracted.items():
+        if error is None:
+            quotation_pdf_cache.put(quotation_cache_key(content_hash, backend_name), pages, tokens)
+        documents[content_hash] = {'tokens': tokens, 'cached': False, 'error': error}
+    
+    # SKU映射和价格在父进程中按最新数据生成，并按SKU汇总整批数量
+    rollup = {}
+    batch_total = 0
+    for result in results:
+        if 'content_hash' not in result:
+            continue
+        document = documents[result['content_hash']]
+        if document['error'] is not None:
+            result.update({'success': False, 'error': pdf_read_error(document['error'])[0]})
+            continue
+        products, provenance, compare_result, compare_message = resolve_quotation_document(document['tokens'])
+        total_price = calculate_products_total(products)
+        batch_total += total_price
+        pricing, unmatched = enrich_quotation_products(products)
+        result.update({
             'success': True,
+            'cached': document['cached'],
             'products': products,
+            'provenance': provenance,
+            'pricing': pricing,
+            'unmatched': unmatched,
             'total_price': total_price,
-            'filename': filename,
-            'raw_text': raw_pdf_content,  # 返回原始PDF文本
             'compare_result': compare_result,
-            'compare_message': compare_message
+            'compare_message': compare_message,
+            'skipped_pages': document['tokens'].get('skipped_pages', [])
+        })
+        for product in products:
+            summary = rollup.setdefault(product['sku'], {'sku': product['sku'], 'qty': 0, 'lines': 0, 'files': []})
+            summary['qty'] += int(product['qty']) if str(product['qty']).isdigit() else 0
+            summary['lines'] += 1
+            if result['filename'] not in summary['files']:
+                summary['files'].append(result['filename'])
+    
+    return jsonify({
+        'success': True,
+        'files': results,
+        'file_count': len(results),
+        'failed_count': sum(1 for r in results if not r.get('success')),
+        'total_price': batch_total,
+        'rollup': [rollup[sku] for sku in sorted(rollup)]
+    })
+
+@app.route('/reparse_quotation_lines', methods=['POST'])
+def reparse_quotation_lines():
+    """修正报价单中的一行或几行原始文本后局部重新解析，无需重新上传和解析整个PDF
+    
+    请求JSON: document_id（上传接口或上一次修正返回）、page（页码，从1开始）、start_line、end_line
+    （页内行号，从0开始、不计空行，与 provenance 一致，end_line 默认等于 start_line）、
+    lines（替换后的文本行，为空时删除这些行）。
+    修正后的文档以新的 document_id 保存，原文档不变，可继续基于新的 document_id 修正。
+    """
+    data = request.get_json(silent=True) or {}
+    document_id = data.get('document_id')
+    if not document_id:
+        return jsonify({'error': _('missing_document_id')}), 400
+    # document_id 同时用作解析缓存的文件名，只接受十六进制 id
+    if not is_valid_document_id(document_id):
+        return jsonify({'error': _('quotation_document_expired')}), 404
+    
+    document = load_stored_quotation(document_id)
+    if document is None:
+        return jsonify({'error': _('quotation_document_expired')}), 404
+    extraction, tokens = document
+    if extraction.error is not None:
+        message, status = pdf_read_error(extraction.error)
+        return jsonify({'error': message}), status
+    
+    pages = extraction.pages
+    try:
+        page_num = int(data.get('page'))
+        start_line = int(data.get('start_line'))
+        end_line = int(data.get('end_line', start_line))
+    except (TypeError, ValueError):
+        return jsonify({'error': _('reparse_position_must_be_integer')}), 400
+    if not 1 <= page_num <= len(pages):
+        return jsonify({'error': _('page_out_of_range').format(max_page=len(pages))}), 400
+    page_line_count = len(quotation_page_lines(page_num - 1, pages[page_num - 1]))
+    if not 0 <= start_line <= end_line < page_line_count:
+        return jsonify({'error': _('line_out_of_range').format(max_line=page_line_count - 1)}), 400
+    
+    new_lines = data.get('lines')
+    if new_lines is None:
+        new_lines = str(data.get('text', '')).split('\n') if data.get('text') else []
+    if not isinstance(new_lines, list) or not all(isinstance(line, str) for line in new_lines):
+        return jsonify({'error': _('lines_must_be_string_list')}), 400
+    
+    try:
+        new_pages, new_tokens, reparsed_pages = retokenize_quotation_lines(
+            pages, tokens, page_num, start_line, end_line, new_lines)
+        edit = json.dumps([document_id, page_num, start_line, end_line, new_lines], ensure_ascii=False)
+        new_document_id = hashlib.sha256(edit.encode('utf-8')).hexdigest()
+        quotation_pdf_cache.put(new_document_id, new_pages, new_tokens)
+        
+        products, provenance, compare_result, compare_message = resolve_quotation_document(new_tokens)
+        pricing, unmatched = enrich_quotation_products(products)
+        return jsonify({
+            'success': True,
+            'document_id': new_document_id,
+            'products': products,
+            'provenance': provenance,
+            'pricing': pricing,
+            'unmatched': unmatched,
+            'total_price': calculate_products_total(products),
+            'compare_result': compare_result,
+            'compare_message': compare_message,
+            'reparsed_pages': reparsed_pages,
+            'skipped_pages': new_tokens.get('skipped_pages', []),
+            'raw_text': PdfExtraction(new_pages).raw_text
+        })
+    except Exception as e:
+        print(f"局部重新解析报价单失败: {e}")
+        return jsonify({'error': f'{_("read_pdf_failed")}: {str(e)}'}), 500
+
+@app.route('/get_pipeline_stats', methods=['GET'])
+@admin_required
+def get_pipeline_stats():
+    """获取报价单上传处理各阶段耗时统计，PDF解析缓存和SKU生成缓存的命中情况，以及沙箱限制触发情况"""
+    try:
+        return jsonify({
+            'success': True,
+            'pipeline': quotation_pipeline_stats.snapshot(),
+            'cache': quotation_pdf_cache.stats(),
+            'sku_cache': sku_cache_stats(),
+            'sandbox': pdf_sandbox_stats.snapshot()
         })
-    
-    return jsonify({'error': _('upload_pdf_file')}), 400
+    except Exception as e:
+        return jsonify({'error': f'{_("get_stats_failed")}: {str(e)}'}), 500
+
+@app.route('/get_upload_store_stats', methods=['GET'])
+@admin_required
+def get_upload_store_stats():
+    """获取上传文件存储的文件数、引用数和占用空间"""
+    try:
+        return jsonify({'success': True, 'stats': upload_store.stats()})
+    except Exception as e:
+        return jsonify({'error': f'{_("get_stats_failed")}: {str(e)}'}), 500
+
+@app.route('/cleanup_upload_store', methods=['POST'])
+@admin_required
+def cleanup_upload_store():
+    """立即清理过期的上传文件"""
+    try:
+        result = upload_store.reap()
+        return jsonify({'success': True, 'result': result, 'stats': upload_store.stats()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/upload_prices', methods=['POST'])
 def upload_prices():
@@ -1533,28 +3640,24 @@ def upload_occw_prices():
                 }), 400
             
             # 7. 更新价格数据
+            # 在新字典中生成完整的价格表后一次替换，其他线程不会读到清空或填充到一半的价格表
             global occw_prices
             original_count = len(occw_prices)
             added_count = 0
             updated_count = 0
-            
-
-            
-            if clear_existing:
-                occw_prices.clear()
-
+            new_prices = {} if clear_existing else dict(occw_prices)
             
             # 处理转换后的数据
             for item in transformed_data:
                 sku = item['SKU']
                 
-                if clear_existing or sku not in occw_prices:
+                if clear_existing or sku not in new_prices:
                     added_count += 1
                 else:
                     updated_count += 1
                 
                 # 保存完整的产品信息
-                occw_prices[sku] = {
+                new_prices[sku] = {
                     'product_name': item['product_name'],
                     'door_variant': item['door_variant'],
                     'box_variant': item['box_variant'],
@@ -1563,6 +3666,7 @@ def upload_occw_prices():
                     'updated_at': datetime.now().isoformat()
                 }
             
+            occw_prices = new_prices
             final_count = len(occw_prices)
 
             
@@ -1614,41 +3718,101 @@ def upload_occw_prices():
 
 @app.route('/get_occw_skus', methods=['GET'])
 def get_occw_skus():
-    """获取OCCW SKU列表（用于下拉选择），支持按userCode过滤"""
+    """获取OCCW SKU列表（用于下拉选择），支持按userCode过滤和自动补全
+    
+    q: 自动补全查询（不区分大小写，结果按相关度排序）；
+    filter_user_code: 包含指定userCode的SKU（按SKU排序）；
+    limit、offset: 分页，不指定 limit 时返回全部匹配结果。
+    """
     try:
+        query = request.args.get('q', '').strip()
         filter_user_code = request.args.get('filter_user_code')
         filter_manuf_code = request.args.get('filter_manuf_code')  # 保留兼容性
+        try:
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = request.args.get('limit')
+            limit = max(0, int(limit)) if limit else None
+        except ValueError:
+            return jsonify({'error': _('limit_offset_must_be_integer')}), 400
         
-        if filter_user_code:
-            # 过滤包含指定userCode的SKU
-            filtered_skus = []
-            for sku in occw_prices.keys():
-                if filter_user_code in sku:
-                    filtered_skus.append(sku)
-            filtered_skus.sort()
-            return jsonify({
-                'success': True,
-                'skus': filtered_skus
-            })
-        elif filter_manuf_code:
-            # 兼容旧版本，按manufCode过滤
-            filtered_skus = []
-            for sku in occw_prices.keys():
-                if filter_manuf_code in sku:
-                    filtered_skus.append(sku)
-            filtered_skus.sort()
-            return jsonify({
-                'success': True,
-                'skus': filtered_skus
-            })
+        index = get_occw_sku_index()
+        if query:
+            skus, total = index.search(query, offset, limit)
         else:
-            # 返回所有SKU
-            sku_list = list(occw_prices.keys())
-            sku_list.sort()
-            return jsonify({
-                'success': True,
-                'skus': sku_list
-            })
+            if filter_user_code or filter_manuf_code:
+                # 过滤包含指定userCode（兼容旧版本的manufCode）的SKU
+                matched = index.contains(filter_user_code or filter_manuf_code)
+            else:
+                # 返回所有SKU
+                matched = index.skus
+            total = len(matched)
+            skus = matched[offset:None if limit is None else offset + limit]
+        return jsonify({
+            'success': True,
+            'skus': skus,
+            'total': total,
+            'offset': offset,
+            'has_more': offset + len(skus) < total
+        })
+    except Exception as e:
+        return jsonify({'error': f'{_("get_sku_list_failed")}: {str(e)}'}), 500
+
+SKU_SUGGESTION_MAX_QUERIES = 500
+SKU_SUGGESTION_MAX_LIMIT = 20
+SKU_SUGGESTION_MAX_RELATED = 50
+
+
+@app.route('/suggest_occw_skus', methods=['POST'])
+def suggest_occw_skus():
+    """为一批未匹配的SKU推荐相近的OCCW SKU（容错拼写）
+    
+    JSON: {"items": [...], "limit": 5, "related_limit": 0}，items 中每一项为SKU字符串或 {"sku", "user_code"}；
+    SKU为空或为"找不到产品"时改用 user_code 查询。每个候选包含编辑距离 distance 和相似度 score。
+    related_limit 大于0时每项另返回 related：按 user_code 自动补全的前 related_limit 个SKU
+    （与 /get_occw_skus?q=user_code 相同），下拉框不必再逐行请求。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('items')
+        if not isinstance(items, list):
+            return jsonify({'error': _('suggest_items_invalid')}), 400
+        if len(items) > SKU_SUGGESTION_MAX_QUERIES:
+            return jsonify({'error': _('too_many_sku_queries').format(count=SKU_SUGGESTION_MAX_QUERIES)}), 400
+        try:
+            limit = min(SKU_SUGGESTION_MAX_LIMIT, max(1, int(data.get('limit', 5))))
+            related_limit = min(SKU_SUGGESTION_MAX_RELATED, max(0, int(data.get('related_limit', 0))))
+        except (TypeError, ValueError):
+            return jsonify({'error': _('limit_must_be_integer')}), 400
+        
+        # 先校验全部查询：None、数字等不是SKU，不能当作 'None'、'123' 查询
+        queries = []
+        for item in items:
+            if isinstance(item, str):
+                sku, user_code = item.strip(), ''
+            elif isinstance(item, dict) and all(isinstance(item.get(key) or '', str) for key in ('sku', 'user_code')):
+                sku = (item.get('sku') or '').strip()
+                user_code = (item.get('user_code') or '').strip()
+            else:
+                return jsonify({'error': _('suggest_items_invalid')}), 400
+            queries.append((sku, user_code))
+        
+        index = get_occw_sku_similarity_index()
+        sku_index = get_occw_sku_index() if related_limit else None
+        suggestions = {}
+        related = {}
+        results = []
+        for sku, user_code in queries:
+            query = user_code if not sku or sku == '找不到产品' else sku
+            if query not in suggestions:
+                suggestions[query] = index.similar(query, limit)
+            result = {'sku': sku, 'query': query, 'candidates': suggestions[query]}
+            if sku_index is not None:
+                if user_code not in related:
+                    related[user_code] = (sku_index.search(user_code, 0, related_limit)[0] if user_code
+                                          else sku_index.skus[:related_limit])
+                result['related'] = related[user_code]
+            results.append(result)
+        return jsonify({'success': True, 'results': results})
     except Exception as e:
         return jsonify({'error': f'{_("get_sku_list_failed")}: {str(e)}'}), 500
 
@@ -1712,24 +3876,7 @@ def get_occw_price():
             return jsonify({'error': _('missing_sku_param')}), 400
         
         # 首先检查是否有映射关系
-        mapped_sku = sku_mappings.get(sku, sku)
-        price_data = occw_prices.get(mapped_sku, 0.0)
-        
-        # 处理新旧数据格式兼容性
-        if isinstance(price_data, dict):
-            # 新格式：完整产品信息
-            price = price_data.get('unit_price', 0.0)
-            product_info = {
-                'product_name': price_data.get('product_name', ''),
-                'door_variant': price_data.get('door_variant', ''),
-                'box_variant': price_data.get('box_variant', ''),
-                'category': price_data.get('category', ''),
-                'updated_at': price_data.get('updated_at', '')
-            }
-        else:
-            # 旧格式：只有价格
-            price = price_data
-            product_info = {}
+        mapped_sku, price, product_info = occw_price_info(sku)
         
         return jsonify({
             'success': True,
@@ -1813,6 +3960,69 @@ def clear_all_sku_mappings():
     except Exception as e:
         return jsonify({'error': f'{_("clear_mapping_failed")}: {str(e)}'}), 500
 
+@app.route('/get_sku_rules', methods=['GET'])
+@admin_required
+def get_sku_rules():
+    """获取当前生效的SKU生成规则（data/sku_rules.json 的 pdf_parsing_rules）"""
+    try:
+        rules = []
+        if os.path.exists('data/sku_rules.json'):
+            with open('data/sku_rules.json', 'r', encoding='utf-8') as f:
+                rules = json.load(f).get('pdf_parsing_rules', {}).get('rules', [])
+        return jsonify({
+            'success': True,
+            'rules': rules,
+            'active_rules': [rule.id for rule in sku_rule_set.rules],
+            'version': sku_rule_set.version,
+            'source': sku_rule_set.source
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/save_sku_rules', methods=['POST'])
+@admin_required
+def save_sku_rules():
+    """保存SKU生成规则：先编译校验，保存到 data/sku_rules.json 后立即生效"""
+    global sku_rule_set
+    data = request.get_json(silent=True) or {}
+    rules = data.get('rules')
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        return jsonify({'error': _('sku_rules_must_be_list')}), 400
+    try:
+        compiled = SkuRuleSet(rules, version=sku_rule_set.version + 1, source='data/sku_rules.json')
+    except SkuRuleError as e:
+        return jsonify({'error': _('sku_rule_invalid').format(error=e.translated())}), 400
+    except Exception as e:
+        return jsonify({'error': _('sku_rule_invalid').format(error=str(e))}), 400
+    try:
+        config = {}
+        if os.path.exists('data/sku_rules.json'):
+            with open('data/sku_rules.json', 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        config.setdefault('pdf_parsing_rules', {})['rules'] = rules
+        config['last_updated'] = datetime.now().strftime('%Y-%m-%d')
+        temp_path = f"data/sku_rules.json.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(config, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, 'data/sku_rules.json')
+        sku_rule_set = compiled
+        return jsonify({'success': True, 'version': sku_rule_set.version})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/reload_sku_rules', methods=['POST'])
+@admin_required
+def reload_sku_rules():
+    """重新加载 data/sku_rules.json 中的SKU生成规则（手动编辑文件后使用），规则无效时保留当前规则"""
+    success, error = load_sku_rules()
+    if not success:
+        return jsonify({'error': _('sku_rule_reload_failed').format(error=error)}), 400
+    return jsonify({
+        'success': True,
+        'version': sku_rule_set.version,
+        'active_rules': [rule.id for rule in sku_rule_set.rules]
+    })
+
 @app.route('/export_sku_mappings', methods=['GET'])
 @admin_required
 def export_sku_mappings():
@@ -1833,6 +4043,61 @@ def sku_mappings_page():
     """SKU映射管理页面"""
     return render_template('sku_mappings.html')
 
+def occw_sku_exists(sku):
+    """SKU（或其映射后的SKU）是否在OCCW价格表中"""
+    return sku in occw_prices or sku_mappings.get(sku, sku) in occw_prices
+
+def apply_occw_export_defaults(export_username, export_sales_person):
+    """用户登录功能被禁用且没有提供用户名和销售人员时使用默认值"""
+    user_login_enabled = system_settings.get('user_login_enabled', True)
+    if not user_login_enabled:
+        if not export_username:
+            export_username = 'Public User'
+        if not export_sales_person:
+            export_sales_person = get_default_sales_person()
+    return export_username, export_sales_person
+
+def write_occw_worksheet(worksheet, rows, export_date, export_username, export_sales_person):
+    """按OCCW格式写入一个工作表 - 新5列格式（移除单价列），rows 为 [(SKU, 数量)]"""
+    # 设置标题行 - 新5列格式（移除单价列）
+    headers = ['订单日期', '客户', '销售人员', '订单行/产品', '订单行/数量']
+    for col, header in enumerate(headers):
+        worksheet.write(0, col, header)
+    
+    # 写入数据
+    for row, (sku, qty) in enumerate(rows, 1):
+        # 第一行包含日期、客户、销售人员信息，其他行为空
+        if row == 1:
+            worksheet.write(row, 0, export_date)  # 订单日期
+            worksheet.write(row, 1, export_username)  # 客户
+            worksheet.write(row, 2, export_sales_person)  # 销售人员
+        else:
+            worksheet.write(row, 0, '')
+            worksheet.write(row, 1, '')
+            worksheet.write(row, 2, '')
+        
+        # 产品信息
+        worksheet.write(row, 3, sku)  # 订单行/产品 (SKU)
+        worksheet.write(row, 4, qty)  # 订单行/数量
+
+def build_occw_workbook(rows, export_date, export_username, export_sales_person):
+    """生成OCCW格式的Excel文件，返回 BytesIO"""
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output)
+    write_occw_worksheet(workbook.add_worksheet(), rows, export_date, export_username, export_sales_person)
+    workbook.close()
+    output.seek(0)
+    return output
+
+def send_occw_workbook(output, export_username, export_date):
+    """返回OCCW Excel文件，文件名：用户名_日期_quote.xlsx"""
+    return send_file(
+        output,
+        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        as_attachment=True,
+        download_name=f"{export_username}_{export_date}_quote.xlsx"
+    )
+
 @app.route('/export/occw_excel')
 def export_occw_excel():
     """导出OCCW格式的Excel文件 - 新5列格式（移除单价列）"""
@@ -1843,57 +4108,15 @@ def export_occw_excel():
         export_sales_person = request.args.get('export_sales_person')
         
         # 检查用户登录功能是否被禁用，如果被禁用且没有提供用户名和销售人员，使用默认值
-        user_login_enabled = system_settings.get('user_login_enabled', True)
-        if not user_login_enabled:
-            if not export_username:
-                export_username = 'Public User'
-            if not export_sales_person:
-                export_sales_person = get_default_sales_person()
+        export_username, export_sales_person = apply_occw_export_defaults(export_username, export_sales_person)
         
         if not occw_data:
             return jsonify({'error': _('No data provided')}), 400
         
         occw_data = json.loads(occw_data)
-        
-        # 创建Excel文件
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output)
-        worksheet = workbook.add_worksheet()
-        
-        # 设置标题行 - 新5列格式（移除单价列）
-        headers = ['订单日期', '客户', '销售人员', '订单行/产品', '订单行/数量']
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header)
-        
-        # 写入数据
-        for row, item in enumerate(occw_data, 1):
-            # 第一行包含日期、客户、销售人员信息
-            if row == 1:
-                worksheet.write(row, 0, export_date)  # 订单日期
-                worksheet.write(row, 1, export_username)  # 客户
-                worksheet.write(row, 2, export_sales_person)  # 销售人员
-            else:
-                # 其他行为空
-                worksheet.write(row, 0, '')
-                worksheet.write(row, 1, '')
-                worksheet.write(row, 2, '')
-            
-            # 产品信息
-            worksheet.write(row, 3, item['occw_sku'])  # 订单行/产品 (SKU)
-            worksheet.write(row, 4, item['qty'])  # 订单行/数量
-        
-        workbook.close()
-        output.seek(0)
-        
-        # 生成文件名：用户名_日期_quote.xlsx
-        filename = f"{export_username}_{export_date}_quote.xlsx"
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        rows = [(item['occw_sku'], item['qty']) for item in occw_data]
+        output = build_occw_workbook(rows, export_date, export_username, export_sales_person)
+        return send_occw_workbook(output, export_username, export_date)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1916,64 +4139,82 @@ def export_manual_excel():
             export_sales_person = request.args.get('export_sales_person')
         
         # 检查用户登录功能是否被禁用，如果被禁用且没有提供用户名和销售人员，使用默认值
-        user_login_enabled = system_settings.get('user_login_enabled', True)
-        if not user_login_enabled:
-            if not export_username:
-                export_username = 'Public User'
-            if not export_sales_person:
-                export_sales_person = get_default_sales_person()
+        export_username, export_sales_person = apply_occw_export_defaults(export_username, export_sales_person)
         
         if not manual_data:
             return jsonify({'error': _('No data provided')}), 400
         
         manual_data = json.loads(manual_data)
-        
-        # 创建Excel文件
-        output = BytesIO()
-        workbook = xlsxwriter.Workbook(output)
-        worksheet = workbook.add_worksheet()
-        
-        # 设置标题行 - 新5列格式（移除单价列）
-        headers = ['订单日期', '客户', '销售人员', '订单行/产品', '订单行/数量']
-        for col, header in enumerate(headers):
-            worksheet.write(0, col, header)
-        
-        # 写入数据
-        for row, item in enumerate(manual_data, 1):
-            # 第一行包含日期、客户、销售人员信息，其他行为空
-            if row == 1:
-                worksheet.write(row, 0, export_date)  # 订单日期
-                worksheet.write(row, 1, export_username)  # 客户
-                worksheet.write(row, 2, export_sales_person)  # 销售人员
-            else:
-                # 其他行的日期、客户、销售人员列为空
-                worksheet.write(row, 0, '')  # 订单日期
-                worksheet.write(row, 1, '')  # 客户
-                worksheet.write(row, 2, '')  # 销售人员
-            
-            # 产品信息（每行都有完整数据）
-            worksheet.write(row, 3, item['sku'])  # 订单行/产品 (SKU)
-            worksheet.write(row, 4, item['qty'])  # 订单行/数量
-        
-        workbook.close()
-        output.seek(0)
-        
-        # 生成文件名：用户名_日期_quote.xlsx
-        filename = f"{export_username}_{export_date}_quote.xlsx"
-        
-        # 统一使用send_file返回，确保文件格式正确
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
+        rows = [(item['sku'], item['qty']) for item in manual_data]
+        output = build_occw_workbook(rows, export_date, export_username, export_sales_person)
+        return send_occw_workbook(output, export_username, export_date)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/export/occw_excel_from_pdf', methods=['POST'])
+def export_occw_excel_from_pdf():
+    """报价单PDF一步转换为OCCW格式Excel - 在服务器端解析、生成SKU（含SKU映射）并直接返回xlsx
+    
+    表单参数：file（报价单PDF）或 document_id（上传接口返回）、export_date（默认今天）、
+    export_username、export_sales_person，以及可选的 sku_overrides（JSON，{产品下标: 用户选择的SKU}，
+    下标从0开始；序号在不同页和分组中会重复，不能作为键）。
+    产品数据不再经过浏览器和URL，没有URL长度限制。
+    """
+    try:
+        export_date = request.form.get('export_date') or datetime.now().strftime('%Y-%m-%d')
+        export_username, export_sales_person = apply_occw_export_defaults(
+            request.form.get('export_username'), request.form.get('export_sales_person'))
+        try:
+            sku_overrides = json.loads(request.form.get('sku_overrides') or '{}')
+        except ValueError:
+            return jsonify({'error': _('sku_overrides_invalid')}), 400
+        if not isinstance(sku_overrides, dict):
+            return jsonify({'error': _('sku_overrides_invalid')}), 400
+        
+        file = request.files.get('file')
+        if file and file.filename:
+            if not file.filename.endswith('.pdf'):
+                return jsonify({'error': _('upload_pdf_file')}), 400
+            filename, filepath, content_hash, document_id = save_quotation_upload(file)
+            extraction, tokens, cached = load_quotation_document(filepath, content_hash)
+        else:
+            document_id = request.form.get('document_id')
+            if not document_id:
+                return jsonify({'error': _('no_file_selected')}), 400
+            # document_id 同时用作解析缓存的文件名，只接受十六进制 id
+            if not is_valid_document_id(document_id):
+                return jsonify({'error': _('file_not_exists')}), 404
+            document = load_stored_quotation(document_id)
+            if document is None:
+                return jsonify({'error': _('file_not_exists')}), 404
+            extraction, tokens = document
+        if extraction.error is not None:
+            message, status = pdf_read_error(extraction.error)
+            return jsonify({'error': message}), status
+        
+        products, compare_result, compare_message = resolve_quotation_tokens(tokens)
+        if not products:
+            return jsonify({'error': _('No data provided')}), 400
+        rows = []
+        unmatched_count = 0
+        for index, product in enumerate(products):
+            sku = sku_overrides.get(str(index)) or product['sku']
+            if not occw_sku_exists(sku):
+                unmatched_count += 1
+            rows.append((sku, product['qty']))
+        
+        output = build_occw_workbook(rows, export_date, export_username, export_sales_person)
+        response = send_occw_workbook(output, export_username, export_date)
+        response.headers['X-Document-Id'] = document_id
+        response.headers['X-Product-Count'] = str(len(products))
+        response.headers['X-Unmatched-SKU-Count'] = str(unmatched_count)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/export/<format>')
 def export_quotation(format):
-    """导出报价单"""
+    """导出报价单（在内存中生成文件直接返回，不写入 uploads 目录）"""
     products = request.args.get('products', '[]')
     products = json.loads(products)
     
@@ -1982,37 +4223,36 @@ def export_quotation(format):
         df['总价'] = df['qty'].astype(int) * df['unit_price'].astype(float)
         
         filename = f'quotation_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        output = BytesIO()
         
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
             df.to_excel(writer, sheet_name='报价单', index=False)
+        output.seek(0)
         
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        return send_file(output, as_attachment=True, download_name=filename)
     
     elif format == 'csv':
         df = pd.DataFrame(products)
         df['总价'] = df['qty'].astype(int) * df['unit_price'].astype(float)
         
         filename = f'quotation_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        output = BytesIO(df.to_csv(index=False).encode('utf-8-sig'))
         
-        df.to_csv(filepath, index=False, encoding='utf-8-sig')
-        
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        return send_file(output, as_attachment=True, download_name=filename, mimetype='text/csv')
     
     elif format == 'pdf':
         df = pd.DataFrame(products)
         df['总价'] = df['qty'].astype(int) * df['unit_price'].astype(float)
         
         filename = f'quotation_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        output = BytesIO()
         
-        doc = SimpleDocTemplate(filepath, pagesize=letter)
+        doc = SimpleDocTemplate(output, pagesize=letter)
         elements = []
         
         # 创建表格数据
         table_data = [['序号', 'SKU', '数量', '花色', '单价', '总价']]
-        for _, row in df.iterrows():
+        for index, row in df.iterrows():
             table_data.append([
                 row['seq_num'],
                 row['sku'],
@@ -2036,8 +4276,9 @@ def export_quotation(format):
         
         elements.append(table)
         doc.build(elements)
+        output.seek(0)
         
-        return send_file(filepath, as_attachment=True, download_name=filename)
+        return send_file(output, as_attachment=True, download_name=filename)
     
     return jsonify({'error': _('unsupported_export_format')}), 400
 
@@ -3525,21 +5766,56 @@ def view_converted_data():
 
 @app.route('/get_pdf_text')
 def get_pdf_text():
-    """获取PDF识别的原始文本"""
-    filename = request.args.get('filename')
-    if not filename:
-        return jsonify({'error': _('no_filename_specified')}), 400
-    
-    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    if not os.path.exists(filepath):
-        return jsonify({'error': _('file_not_exists')}), 404
+    """获取PDF识别的原始文本（按上传接口返回的 document_id，或旧版本的文件名）
     
+    文本来自报价单PDF解析缓存（按文件内容哈希），上传时已经提取过的文件不再运行PyPDF2。
+    可选参数 page 或 start_page/end_page（从1开始，含end_page）只返回指定页的文本。
+    """
     try:
+        document_id = request.args.get('document_id')
+        if document_id:
+            document = load_stored_quotation(document_id)
+            if document is None:
+                return jsonify({'error': _('file_not_exists')}), 404
+            extraction, tokens = document
+        else:
+            # 兼容旧版本：按文件名读取 uploads 目录中的文件
+            filename = request.args.get('filename')
+            if not filename:
+                return jsonify({'error': _('no_filename_specified')}), 400
+            
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename))
+            if not os.path.exists(filepath):
+                return jsonify({'error': _('file_not_exists')}), 404
+            
+            with open(filepath, 'rb') as f:
+                content_hash = hashlib.sha256(f.read()).hexdigest()
+            extraction, tokens, cached = load_quotation_document(filepath, content_hash)
+        
+        if extraction.error is not None:
+            message, status = pdf_read_error(extraction.error)
+            return jsonify({'error': message}), status
+        
+        page_count = extraction.page_count
+        try:
+            start_page = int(request.args.get('page') or request.args.get('start_page') or 1)
+            end_page = int(request.args.get('page') or request.args.get('end_page') or page_count)
+        except ValueError:
+            return jsonify({'error': _('page_must_be_integer')}), 400
+        if page_count and not 1 <= start_page <= end_page <= page_count:
+            return jsonify({'error': _('page_out_of_range').format(max_page=page_count)}), 400
+        
         # 返回原始PDF文本（不添加页面分隔符）
-        pdf_content = extract_pdf_content(filepath, add_page_markers=False)
+        if start_page == 1 and end_page == page_count:
+            text = extraction.raw_text
+        else:
+            text = PdfExtraction(extraction.pages[start_page - 1:end_page]).raw_text
         return jsonify({
             'success': True,
-            'text': pdf_content
+            'text': text,
+            'page_count': page_count,
+            'start_page': start_page,
+            'end_page': end_page
         })
     except Exception as e:
         return jsonify({'error': f'{_("read_pdf_failed")}: {str(e)}'}), 500
@@ -3548,30 +5824,9 @@ def get_pdf_text():
 def get_product_categories():
     """获取产品类别列表"""
     try:
-        categories = set()
-        for sku, price_data in occw_prices.items():
-            if isinstance(price_data, dict) and 'category' in price_data:
-                category = price_data['category'].strip()
-                if category:  # 确保类别不为空
-                    categories.add(category)
-        
-        # 如果没有从数据中提取到类别，则返回默认类别作为后备
-        if not categories:
-            default_categories = [
-                "Assm.组合件",
-                "Door", 
-                "BOX",
-                "ENDING PANEL",
-                "MOLDING", 
-                "TOE KICK",
-                "FILLER",
-                "HARDWARE"
-            ]
-            categories = set(default_categories)
-        
         return jsonify({
             'success': True,
-            'categories': sorted(list(categories))
+            'categories': get_occw_catalog().categories
         })
     except Exception as e:
         return jsonify({'error': f'{_("get_categories_failed")}: {str(e)}'}), 500
@@ -3584,67 +5839,23 @@ def get_products_by_category():
         if not category:
             return jsonify({'error': _('missing_category_param')}), 400
         
-        products = set()
-        box_variants = set()
-        door_variants = set()
-        
-        # 从OCCW价格表中提取结构化数据
-        for sku, price_data in occw_prices.items():
-            if not isinstance(price_data, dict):
-                continue  # 跳过旧格式数据
-            
-            # 获取产品信息
-            product_category = price_data.get('category', '').strip()
-            product_name = price_data.get('product_name', '').strip()
-            door_variant = price_data.get('door_variant', '').strip()
-            box_variant = price_data.get('box_variant', '').strip()
-            
-            # 只处理匹配类别的产品
-            if product_category == category:
-                if product_name:
-                    products.add(product_name)
-                if door_variant:
-                    door_variants.add(door_variant)
-                if box_variant:
-                    box_variants.add(box_variant)
-        
-        # 如果请求的类别在价格表中没有数据，提供默认选项
-        if not products and not door_variants and not box_variants:
-            # 根据类别提供默认的变体选项
-            if category in ["Door", "Assm.组合件", "BOX", "ENDING PANEL", "MOLDING", "TOE KICK", "FILLER"]:
-                door_variants = {'BSS', 'GSS', 'MNW', 'MWM', 'PGW', 'SSW', 'WSS'}
-            
-            if category in ["Assm.组合件", "BOX"]:
-                box_variants = {'PLY', 'PB'}
-            
-            # 为某些类别提供默认产品选项
-            if category == "ENDING PANEL":
-                products = {'PANEL-24', 'PANEL-36', 'PANEL-48'}
-            elif category == "MOLDING":
-                products = {'CROWN-M', 'LIGHT-RAIL', 'SCRIBE-M'}
-            elif category == "TOE KICK":
-                products = {'TOE-4.5', 'TOE-6', 'TOE-8'}
-            elif category == "FILLER":
-                products = {'FILLER-3', 'FILLER-6', 'FILLER-9'}
-        
-        # 根据类别调整返回的变体选项
-        if category == "Door":
-            # 门板产品不需要柜身变体
-            box_variants = set()
-        elif category == "HARDWARE":
-            # 五金件不需要变体
-            door_variants = set()
-            box_variants = set()
-        elif category in ["ENDING PANEL", "MOLDING", "TOE KICK", "FILLER"]:
-            # 配件只需要门板变体
-            box_variants = set()
-        
-        return jsonify({
-            'success': True,
-            'products': sorted(list(products)),
-            'box_variants': sorted(list(box_variants)),
-            'door_variants': sorted(list(door_variants))
-        })
+        options = get_occw_catalog().options.get(category) or occw_category_options(category, set(), set(), set())
+        return jsonify({'success': True, **options})
+    except Exception as e:
+        return jsonify({'error': f'{_("get_products_failed")}: {str(e)}'}), 500
+
+@app.route('/get_occw_catalog', methods=['GET'])
+def get_occw_catalog_document():
+    """手动报价用的完整产品目录（类别、各类别的选项和 类别→产品→柜身变体→门板变体→[SKU, 单价] 树）
+    
+    按价格表版本生成一次；ETag 为内容的哈希，客户端带 If-None-Match 请求且未变化时返回304。
+    """
+    try:
+        catalog = get_occw_catalog()
+        response = Response(catalog.body, mimetype='application/json')
+        response.set_etag(catalog.etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': f'{_("get_products_failed")}: {str(e)}'}), 500
 
@@ -3659,60 +5870,491 @@ def search_sku_price():
         
         # 根据产品信息生成可能的SKU
         possible_skus = generate_possible_skus(category, product, box_variant, door_variant)
-
-        print(f"category: {category}, product: {product}, box_variant: {box_variant}, door_variant: {door_variant}, possible_skus: {possible_skus}")
         
         # 在OCCW价格表中查找匹配的SKU和价格
-        found_sku = None
+        found_sku, match_type, candidates = resolve_occw_product_sku(
+            category, product, box_variant, door_variant, possible_skus)
         found_price = 0.0
-        
-        # 精确匹配
-        for sku in possible_skus:
-            if sku in occw_prices:
-                found_sku = sku
-                # 处理新旧数据格式兼容性
-                price_data = occw_prices[sku]
-                if isinstance(price_data, dict):
-                    found_price = price_data.get('unit_price', 0)
-                else:
-                    found_price = price_data
-                break
-        
-        # 如果没有找到精确匹配，尝试模糊匹配
-        if not found_sku and product:
-            for sku in occw_prices.keys():
-                # 检查产品名是否在SKU中
-                if product in sku:
-                    # 进一步检查门板变体（如果指定了的话）
-                    if door_variant and door_variant in sku:
-                        found_sku = sku
-                        # 处理新旧数据格式兼容性
-                        price_data = occw_prices[sku]
-                        if isinstance(price_data, dict):
-                            found_price = price_data.get('unit_price', 0)
-                        else:
-                            found_price = price_data
-                        break
-                    elif not door_variant:
-                        found_sku = sku
-                        # 处理新旧数据格式兼容性
-                        price_data = occw_prices[sku]
-                        if isinstance(price_data, dict):
-                            found_price = price_data.get('unit_price', 0)
-                        else:
-                            found_price = price_data
-                        break
+        price_data = occw_prices.get(found_sku) if found_sku is not None else None
+        if price_data is None:
+            # 没有找到，或价格表在查找之后被替换
+            found_sku, match_type, candidates = None, None, []
+        else:
+            # 处理新旧数据格式兼容性
+            found_price = price_data.get('unit_price', 0) if isinstance(price_data, dict) else price_data
         
         return jsonify({
             'success': True,
             'sku': found_sku,
             'price': found_price,
             'found': found_sku is not None,
+            'match_type': match_type,
+            'candidates': candidates,
             'possible_skus': possible_skus  # 调试信息
         })
     except Exception as e:
         return jsonify({'error': f'{_("search_sku_failed")}: {str(e)}'}), 500
 
+class OCCWPriceIndex:
+    """OCCW价格表的二级索引，按价格表版本构建
+    
+    skus 为按SKU排序的列表；fields 中每个字段的大写值对应SKU集合，用于精确过滤；
+    upper 保存每个SKU大写后的 SKU、产品名称、类别、门板变体、柜身变体，用于包含匹配；
+    products 以 (类别, 产品名称, 柜身变体, 门板变体)（去掉首尾空格，与产品下拉选项一致）为键，
+    对应按SKU排序的SKU列表，手动报价按产品信息查找SKU时直接命中。
+    prices 为构建索引时价格表的快照，按同一版本生成的数据（如产品目录）都从快照读取。
+    """
+    FIELDS = ('product_name', 'category', 'door_variant', 'box_variant')
+    PRODUCT_KEY = ('category', 'product_name', 'box_variant', 'door_variant')
+
+    def __init__(self, prices, version):
+        self.version = version
+        self.prices = prices = dict(prices)
+        self.skus = sorted(prices)
+        self.position = {sku: index for index, sku in enumerate(self.skus)}
+        self.fields = {field: {} for field in self.FIELDS}
+        self.upper = {}
+        self.products = {}
+        for sku in self.skus:
+            price_data = prices[sku]
+            if isinstance(price_data, dict):
+                values = tuple(price_data.get(field, '').upper() for field in self.FIELDS)
+                key = tuple(price_data.get(field, '').strip() for field in self.PRODUCT_KEY)
+                self.products.setdefault(key, []).append(sku)
+            else:
+                values = ('',) * len(self.FIELDS)
+            self.upper[sku] = (sku.upper(),) + values
+            for field, value in zip(self.FIELDS, values):
+                self.fields[field].setdefault(value, set()).add(sku)
+
+    def query(self, exact=None, sku_contains='', any_contains=''):
+        """返回按SKU排序的匹配SKU列表
+        
+        exact 为 {字段: 大写值}，先对各字段的SKU集合求交集（从最小的集合开始），
+        再只对交集中的SKU做包含匹配；没有精确条件时直接使用预先排好序的SKU列表。
+        """
+        exact = {field: value for field, value in (exact or {}).items() if value}
+        if exact:
+            sets = sorted((self.fields[field].get(value, set()) for field, value in exact.items()), key=len)
+            candidates = set(sets[0]).intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+        else:
+            candidates = self.skus
+        if sku_contains or any_contains:
+            upper = self.upper
+            candidates = [sku for sku in candidates
+                          if (not sku_contains or sku_contains in upper[sku][0]) and
+                          (not any_contains or any(any_contains in value for value in upper[sku]))]
+        if exact:
+            return sorted(candidates, key=self.position.__getitem__)
+        return candidates
+
+
+occw_price_index = None
+_occw_price_index_lock = threading.Lock()
+
+
+def get_occw_price_index():
+    """获取当前版本价格表的索引，价格表加载或修改后首次调用时重建"""
+    global occw_price_index
+    with _occw_price_index_lock:
+        if occw_price_index is None or occw_price_index.version != occw_prices_version:
+            # 先读版本号再读价格表（价格表先替换、后增加版本号）
+            version = occw_prices_version
+            occw_price_index = OCCWPriceIndex(occw_prices, version)
+        return occw_price_index
+
+
+class OCCWSkuAutocompleteIndex:
+    """OCCW SKU自动补全索引，按价格表版本构建（SKU不区分大小写匹配）
+    
+    前缀树按大写SKU的字典序插入，遍历顺序即排序结果，每个节点记录其下的SKU数，前缀匹配只遍历需要的部分；
+    n-gram 索引（1至3个字符）用于中间匹配：取查询中各n-gram对应SKU集合的交集，再确认包含关系。
+    """
+    NGRAM = 3
+
+    def __init__(self, skus, version):
+        self.version = version
+        self.skus = sorted(skus)
+        self.upper = {sku: sku.upper() for sku in self.skus}
+        # 前缀树节点: [子节点 {字符: 节点}, 在此结束的SKU列表, 子树中的SKU数]
+        self.trie = [{}, [], 0]
+        self.ngrams = {}
+        for sku in sorted(self.skus, key=lambda sku: (self.upper[sku], sku)):
+            upper = self.upper[sku]
+            node = self.trie
+            node[2] += 1
+            for char in upper:
+                node = node[0].setdefault(char, [{}, [], 0])
+                node[2] += 1
+            node[1].append(sku)
+            for size in range(1, self.NGRAM + 1):
+                for start in range(len(upper) - size + 1):
+                    self.ngrams.setdefault(upper[start:start + size], set()).add(sku)
+
+    def _prefix_node(self, prefix):
+        node = self.trie
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node
+
+    @staticmethod
+    def _iter_node(node):
+        """按字典序遍历节点下的SKU"""
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node[1]
+            stack.extend(reversed(list(node[0].values())))
+
+    def candidates(self, upper_query):
+        """可能包含查询字符串的SKU（查询中所有n-gram都出现），需要再确认包含关系"""
+        size = min(self.NGRAM, len(upper_query))
+        grams = {upper_query[start:start + size] for start in range(len(upper_query) - size + 1)}
+        sets = sorted((self.ngrams.get(gram, set()) for gram in grams), key=len)
+        if not sets[0]:
+            return set()
+        return sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+
+    def contains(self, text):
+        """包含 text 的SKU（区分大小写，与原 filter_user_code 过滤一致），按SKU排序"""
+        return sorted(sku for sku in self.candidates(text.upper()) if text in sku)
+
+    def search(self, query, offset=0, limit=None):
+        """不区分大小写搜索，返回 (当前页SKU列表, 匹配总数)
+        
+        排序：完全相同、以查询开头（字典序）、在 - 等分隔符之后匹配、其他位置匹配；
+        中间匹配的按匹配位置、长度、SKU排序。
+        """
+        upper_query = query.upper()
+        prefix_node = self._prefix_node(upper_query)
+        prefix_count = prefix_node[2] if prefix_node is not None else 0
+        infix = []
+        for sku in self.candidates(upper_query):
+            position = self.upper[sku].find(upper_query)
+            if position > 0:
+                boundary = not self.upper[sku][position - 1].isalnum()
+                infix.append((not boundary, position, len(sku), sku))
+        total = prefix_count + len(infix)
+        end = total if limit is None else min(total, offset + limit)
+        results = []
+        if offset < prefix_count:
+            for index, sku in enumerate(self._iter_node(prefix_node)):
+                if index >= end:
+                    break
+                if index >= offset:
+                    results.append(sku)
+        if end > prefix_count:
+            ranked = heapq.nsmallest(end - prefix_count, infix)
+            results.extend(item[3] for item in ranked[max(0, offset - prefix_count):])
+        return results, total
+
+
+occw_sku_index = None
+_occw_sku_index_lock = threading.Lock()
+
+
+def get_occw_sku_index():
+    """获取当前版本价格表的SKU自动补全索引，价格表加载或修改后首次调用时重建"""
+    global occw_sku_index
+    with _occw_sku_index_lock:
+        if occw_sku_index is None or occw_sku_index.version != occw_prices_version:
+            version = occw_prices_version
+            occw_sku_index = OCCWSkuAutocompleteIndex(occw_prices.keys(), version)
+        return occw_sku_index
+
+
+def edit_distance_matcher(pattern):
+    """返回计算 pattern 与其他字符串编辑距离（Levenshtein）的函数
+    
+    使用位并行算法（Myers/Hyyrö）：pattern 的每个字符对应整数中的一位，每比较一个字符只需常数次位运算，
+    同一个查询与多个候选SKU比较时字符位图只计算一次。
+    """
+    length = len(pattern)
+    if not length:
+        return len
+    peq = {}
+    for index, char in enumerate(pattern):
+        peq[char] = peq.get(char, 0) | (1 << index)
+    mask = (1 << length) - 1
+    last = 1 << (length - 1)
+
+    def distance(text):
+        pv, mv, score = mask, 0, length
+        for char in text:
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & mask)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = mh | (~(xv | ph) & mask)
+            mv = ph & xv
+        return score
+
+    return distance
+
+
+class OCCWSkuSimilarityIndex:
+    """OCCW SKU相似度索引，按价格表版本构建，用于为未匹配的SKU推荐相近的SKU（不区分大小写）
+    
+    每个SKU拆成首尾补位的3-gram，按 IDF 加权计算与查询的余弦相似度。查询时从最少见的n-gram开始统计
+    各SKU共有的n-gram数，已有候选后跳过出现次数超过 MAX_POSTING 的常见n-gram（如门板颜色）的倒排列表；
+    共有数最多的 CANDIDATES 个SKU计算完整的相似度，相似度最高的一批再计算编辑距离，
+    按 (编辑距离, 相似度, SKU) 排序。
+    """
+    NGRAM = 3
+    MAX_POSTING = 500
+    CANDIDATES = 50
+
+    def __init__(self, skus, version):
+        self.version = version
+        self.skus = sorted(skus)
+        self.upper = [sku.upper() for sku in self.skus]
+        self.grams = [frozenset(self._grams(upper)) for upper in self.upper]
+        postings = {}
+        for sku_id, grams in enumerate(self.grams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(sku_id)
+        count = len(self.skus)
+        self.postings = postings
+        self.weights = {gram: math.log((count + 1) / len(ids)) + 1 for gram, ids in postings.items()}
+        self.unseen_weight = math.log(count + 1) + 1
+        norms = [0.0] * count
+        for gram, ids in postings.items():
+            square = self.weights[gram] ** 2
+            for sku_id in ids:
+                norms[sku_id] += square
+        self.norms = [math.sqrt(norm) for norm in norms]
+
+    @classmethod
+    def _grams(cls, upper):
+        padded = '^' * (cls.NGRAM - 1) + upper + '$'
+        return [padded[start:start + cls.NGRAM] for start in range(len(padded) - cls.NGRAM + 1)]
+
+    def similar(self, query, limit=5):
+        """返回与 query 最相近的SKU [{'sku', 'distance', 'score'}]，distance 为编辑距离，score 为余弦相似度"""
+        upper_query = query.strip().upper()
+        if not upper_query or not self.skus:
+            return []
+        query_grams = set(self._grams(upper_query))
+        # 价格表中没有的n-gram按最少见的权重计入查询向量的长度
+        query_norm = math.sqrt(sum(self.weights.get(gram, self.unseen_weight) ** 2 for gram in query_grams))
+        squares = {gram: self.weights[gram] ** 2 for gram in query_grams if gram in self.postings}
+        counts = Counter()
+        for index, gram in enumerate(sorted(squares, key=lambda gram: len(self.postings[gram]))):
+            ids = self.postings[gram]
+            if index > self.NGRAM and len(ids) > self.MAX_POSTING:
+                break
+            counts.update(ids)
+        if not counts:
+            return []
+        # 按共有的少见n-gram数取候选，再计算完整的余弦相似度
+        query_keys = squares.keys()
+        sku_grams = self.grams
+        norms = self.norms
+        scored = heapq.nlargest(limit * 2, (
+            (sum(squares[gram] for gram in query_keys & sku_grams[sku_id]) / (query_norm * norms[sku_id]), sku_id)
+            for sku_id, _ in counts.most_common(self.CANDIDATES)))
+        distance = edit_distance_matcher(upper_query)
+        ranked = sorted((distance(self.upper[sku_id]), -score, self.skus[sku_id]) for score, sku_id in scored)
+        return [{'sku': sku, 'distance': sku_distance, 'score': round(-score, 4)}
+                for sku_distance, score, sku in ranked[:limit]]
+
+
+occw_sku_similarity_index = None
+_occw_sku_similarity_index_lock = threading.Lock()
+
+
+def get_occw_sku_similarity_index():
+    """获取当前版本价格表的SKU相似度索引，价格表加载或修改后首次调用时重建"""
+    global occw_sku_similarity_index
+    with _occw_sku_similarity_index_lock:
+        if occw_sku_similarity_index is None or occw_sku_similarity_index.version != occw_prices_version:
+            version = occw_prices_version
+            occw_sku_similarity_index = OCCWSkuSimilarityIndex(occw_prices.keys(), version)
+        return occw_sku_similarity_index
+
+
+SKU_SEARCH_CANDIDATE_LIMIT = 10
+
+
+def resolve_occw_product_sku(category, product, box_variant, door_variant, possible_skus):
+    """按手动报价选择的产品信息查找OCCW SKU，返回 (SKU或None, 匹配方式, 候选SKU列表)
+    
+    1. product：结构化字段 (类别, 产品名称, 柜身变体, 门板变体) 完全一致，多个SKU时优先 possible_skus 中的；
+    2. exact：按 generate_possible_skus 生成的SKU格式在价格表中查找；
+    3. fuzzy：SKU包含产品名称（指定门板变体时还需包含门板变体），用n-gram索引取候选，
+       按类别、产品名称、柜身变体是否一致及匹配位置、长度、SKU排序，最多返回 SKU_SEARCH_CANDIDATE_LIMIT 个。
+    
+    索引可能在价格表上传替换之前构建，索引中已不在价格表中的SKU视为不存在。
+    """
+    price_index = get_occw_price_index()
+    prices = occw_prices
+    skus = price_index.products.get((category.strip(), product.strip(), box_variant.strip(), door_variant.strip()))
+    skus = [sku for sku in skus or [] if sku in prices]
+    if skus:
+        preferred = [sku for sku in possible_skus if sku in skus]
+        return (preferred or skus)[0], 'product', skus[:SKU_SEARCH_CANDIDATE_LIMIT]
+
+    for sku in possible_skus:
+        if sku in prices:
+            return sku, 'exact', [sku]
+
+    if not product:
+        return None, None, []
+    ranked = []
+    for sku in get_occw_sku_index().contains(product):
+        if door_variant and door_variant not in sku:
+            continue
+        price_data = prices.get(sku)
+        if price_data is None:
+            continue
+        fields = price_data if isinstance(price_data, dict) else {}
+        ranked.append((fields.get('category', '').strip() != category,
+                       fields.get('product_name', '').strip() != product,
+                       bool(box_variant) and fields.get('box_variant', '').strip() != box_variant,
+                       sku.find(product), len(sku), sku))
+    candidates = [item[-1] for item in heapq.nsmallest(SKU_SEARCH_CANDIDATE_LIMIT, ranked)]
+    if not candidates:
+        return None, None, []
+    return candidates[0], 'fuzzy', candidates
+
+
+# 价格表中没有任何类别时使用的默认类别
+DEFAULT_PRODUCT_CATEGORIES = [
+    "Assm.组合件",
+    "Door", 
+    "BOX",
+    "ENDING PANEL",
+    "MOLDING", 
+    "TOE KICK",
+    "FILLER",
+    "HARDWARE"
+]
+
+
+def occw_category_options(category, products, box_variants, door_variants):
+    """按类别整理手动报价的产品、柜身变体和门板变体选项（排序后的列表）"""
+    # 如果请求的类别在价格表中没有数据，提供默认选项
+    if not products and not door_variants and not box_variants:
+        # 根据类别提供默认的变体选项
+        if category in ["Door", "Assm.组合件", "BOX", "ENDING PANEL", "MOLDING", "TOE KICK", "FILLER"]:
+            door_variants = {'BSS', 'GSS', 'MNW', 'MWM', 'PGW', 'SSW', 'WSS'}
+        
+        if category in ["Assm.组合件", "BOX"]:
+            box_variants = {'PLY', 'PB'}
+        
+        # 为某些类别提供默认产品选项
+        if category == "ENDING PANEL":
+            products = {'PANEL-24', 'PANEL-36', 'PANEL-48'}
+        elif category == "MOLDING":
+            products = {'CROWN-M', 'LIGHT-RAIL', 'SCRIBE-M'}
+        elif category == "TOE KICK":
+            products = {'TOE-4.5', 'TOE-6', 'TOE-8'}
+        elif category == "FILLER":
+            products = {'FILLER-3', 'FILLER-6', 'FILLER-9'}
+    
+    # 根据类别调整返回的变体选项
+    if category == "Door":
+        # 门板产品不需要柜身变体
+        box_variants = set()
+    elif category == "HARDWARE":
+        # 五金件不需要变体
+        door_variants = set()
+        box_variants = set()
+    elif category in ["ENDING PANEL", "MOLDING", "TOE KICK", "FILLER"]:
+        # 配件只需要门板变体
+        box_variants = set()
+    
+    return {
+        'products': sorted(products),
+        'box_variants': sorted(box_variants),
+        'door_variants': sorted(door_variants)
+    }
+
+
+class OCCWCatalog:
+    """手动报价用的产品目录，由价格表索引按版本生成
+    
+    categories、options 即 /get_product_categories、/get_products_by_category 的结果；
+    tree 为 类别→产品→柜身变体→门板变体→[SKU, 单价]，同一组产品信息有多个SKU时取
+    resolve_occw_product_sku 会返回的那个，页面选中的组合在树中时无需再请求 /search_sku_price。
+    etag 为目录内容的哈希，也作为文档中的 version；body 为序列化后的目录文档。
+    价格从索引的价格表快照读取，目录内容、ETag 与索引版本一致。
+    """
+
+    def __init__(self, price_index):
+        self.version = price_index.version
+        prices = price_index.prices
+        variants = {}
+        tree = {}
+        for (category, product, box_variant, door_variant), skus in price_index.products.items():
+            if not category:
+                continue
+            category_variants = variants.setdefault(category, (set(), set(), set()))
+            for values, value in zip(category_variants, (product, box_variant, door_variant)):
+                if value:
+                    values.add(value)
+            if not product:
+                continue
+            possible_skus = generate_possible_skus(category, product, box_variant, door_variant)
+            sku = ([candidate for candidate in possible_skus if candidate in skus] or skus)[0]
+            tree.setdefault(category, {}).setdefault(product, {}).setdefault(box_variant, {})[door_variant] = [
+                sku, prices[sku].get('unit_price', 0)]
+        self.categories = sorted(variants) or sorted(DEFAULT_PRODUCT_CATEGORIES)
+        self.options = {category: occw_category_options(category, *variants.get(category, (set(), set(), set())))
+                        for category in self.categories}
+        document = {'categories': self.categories, 'options': self.options, 'tree': tree}
+        content = json.dumps(document, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        self.etag = hashlib.sha256(content.encode('utf-8')).hexdigest()[:32]
+        document['version'] = self.etag
+        self.body = json.dumps(document, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+occw_catalog = None
+_occw_catalog_lock = threading.Lock()
+
+
+def get_occw_catalog():
+    """获取当前版本价格表的产品目录，价格表加载或修改后首次调用时重建"""
+    global occw_catalog
+    price_index = get_occw_price_index()
+    with _occw_catalog_lock:
+        if occw_catalog is None or occw_catalog.version != price_index.version:
+            occw_catalog = OCCWCatalog(price_index)
+        return occw_catalog
+
+
+def occw_price_table_row(sku, price_data):
+    """价格表中的一行，兼容新旧数据格式"""
+    if isinstance(price_data, dict):
+        # 新格式：完整产品信息
+        return {
+            'sku': sku,
+            'product_name': price_data.get('product_name', ''),
+            'door_variant': price_data.get('door_variant', ''),
+            'box_variant': price_data.get('box_variant', ''),
+            'category': price_data.get('category', '').upper(),  # 保持与过滤逻辑一致
+            'price': price_data.get('unit_price', 0)
+        }
+    # 旧格式：只有价格
+    return {
+        'sku': sku,
+        'product_name': '',
+        'door_variant': '',
+        'box_variant': '',
+        'category': '',
+        'price': price_data
+    }
+
+
 @app.route('/get_occw_price_table', methods=['GET'])
 @admin_required
 def get_occw_price_table():
@@ -3726,87 +6368,30 @@ def get_occw_price_table():
         door_variant = request.args.get('door_variant', '').strip()
         box_variant = request.args.get('box_variant', '').strip()
         category = request.args.get('category', '').strip()
+        product_name = request.args.get('product_name', '').strip()
         
         # 兼容老版本的通用搜索
         search = request.args.get('search', '').strip()
         
-        # 获取所有价格数据
-        all_prices = []
-        for sku, price_data in occw_prices.items():
-            # 应用过滤条件
-            should_include = True
-            
-            if isinstance(price_data, dict):
-                product_data = {
-                    'sku': sku.upper(),
-                    'product_name': price_data.get('product_name', '').upper(),
-                    'category': price_data.get('category', '').upper(),
-                    'door_variant': price_data.get('door_variant', '').upper(),
-                    'box_variant': price_data.get('box_variant', '').upper()
-                }
-            else:
-                product_data = {
-                    'sku': sku.upper(),
-                    'product_name': '',
-                    'category': '',
-                    'door_variant': '',
-                    'box_variant': ''
-                }
-            
-            # SKU搜索过滤
-            if search_sku and search_sku.upper() not in product_data['sku']:
-                should_include = False
-            
-
-            # 门板变体过滤
-            if door_variant and door_variant.upper() != product_data['door_variant']:
-                should_include = False
-            
-            # 柜身变体过滤
-            if box_variant and box_variant.upper() != product_data['box_variant']:
-                should_include = False
-            
-            # 类别过滤
-            if category and category.upper() != product_data['category']:
-                should_include = False
-            
-            # 兼容通用搜索（在所有字段中搜索）
-            if search and not any(search.upper() in field for field in product_data.values()):
-                should_include = False
-            
-            if not should_include:
-                continue
-            
-            # 处理新旧数据格式兼容性
-            if isinstance(price_data, dict):
-                # 新格式：完整产品信息
-                all_prices.append({
-                    'sku': sku,
-                    'product_name': price_data.get('product_name', ''),
-                    'door_variant': price_data.get('door_variant', ''),
-                    'box_variant': price_data.get('box_variant', ''),
-                    'category': price_data.get('category', '').upper(),  # 保持与过滤逻辑一致
-                    'price': price_data.get('unit_price', 0)
-                })
-            else:
-                # 旧格式：只有价格
-                all_prices.append({
-                    'sku': sku,
-                    'product_name': '',
-                    'door_variant': '',
-                    'box_variant': '',
-                    'category': '',
-                    'price': price_data
-                })
-        
-        # 排序
-        all_prices.sort(key=lambda x: x['sku'])
+        # 精确条件通过索引求交集，包含匹配只检查交集中的SKU，结果已按SKU排序
+        matched_skus = get_occw_price_index().query(
+            exact={
+                'door_variant': door_variant.upper(),
+                'box_variant': box_variant.upper(),
+                'category': category.upper(),
+                'product_name': product_name.upper()
+            },
+            sku_contains=search_sku.upper(),
+            any_contains=search.upper()
+        )
         
-        # 分页
-        total = len(all_prices)
+        # 分页，只生成当前页的数据
+        total = len(matched_skus)
         start = (page - 1) * per_page
         end = start + per_page
-        paginated_prices = all_prices[start:end]
+        prices = occw_prices  # 价格表上传时整体替换，本次请求使用同一个字典
+        paginated_prices = [occw_price_table_row(sku, prices[sku]) for sku in matched_skus[start:end]
+                            if sku in prices]
         
         return jsonify({
             'success': True,
@@ -3873,10 +6458,10 @@ def upload_sales_data():
             response.headers['Content-Type'] = 'application/json'
             return response
         
-        # 保存文件
+        # 保存文件（按内容保存在上传文件存储中）
         filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
+        record = store_upload(file, filename)
+        filepath = record['path']
         
         # 读取Excel文件
         df = pd.read_excel(filepath)
@@ -4061,13 +6646,14 @@ def export_sales_analysis():
         
         # 生成Excel报告
         filename = f'sales_analysis_{time_period}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        filepath = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4().hex}_{filename}")
         
         export_sales_analysis_to_excel(data, filepath, time_period)
+        record = upload_store.put_file(filepath, filename)
         
         return jsonify({
             'success': True,
-            'download_url': f'/download/{filename}'
+            'download_url': f'/download/{record["document_id"]}'
         })
         
     except Exception as e:
@@ -4075,10 +6661,13 @@ def export_sales_analysis():
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    """下载文件"""
+    """下载文件（按上传文件存储中的 document_id，或旧版本 uploads 目录中的文件名）"""
     try:
+        record = upload_store.get(filename)
+        if record is not None:
+            return send_file(record['path'], as_attachment=True, download_name=record['filename'])
         return send_file(
-            os.path.join(app.config['UPLOAD_FOLDER'], filename),
+            os.path.join(app.config['UPLOAD_FOLDER'], secure_filename(filename)),
             as_attachment=True,
             download_name=filename
         )
@@ -5053,6 +7642,7 @@ for directory in ['uploads', 'data']:
 load_standard_prices()
 load_occw_prices()
 load_sku_mappings()
+load_sku_rules()
 
 
 def preprocess_customer_type_data(df):
@@ -5146,6 +7736,7 @@ if __name__ == '__main__':
     load_standard_prices()
     load_occw_prices()
     load_sku_mappings()
+    load_sku_rules()
     load_system_settings()
     load_users()
     load_quotations()
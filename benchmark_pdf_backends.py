@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF文本提取后端对比测试工具
+用所有可用的提取后端（或指定的后端）处理同一批报价单PDF，统计提取耗时、吞吐量和内存占用，
+并检查 parse_quotation_pdf 的结果是否与默认后端（PyPDF2）完全一致。
+每个后端在单独的子进程中运行，内存占用为该进程提取前后最大常驻内存的增量。
+需要在项目根目录运行，以便加载 data/ 中的SKU映射和价格数据。
+"""
+
+import os
+import glob
+import time
+import resource
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from generate_sample_quotations import generate_corpus
+
+
+def run_backend(backend_name, pdf_paths, repeat=3):
+    """在子进程中用一个后端提取并解析所有PDF，返回耗时、页数、内存增量和每个文件的解析结果"""
+    import app
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    seconds = 0.0
+    pages = 0
+    outputs = {}
+    errors = {}
+    with app.app.test_request_context():
+        for path in pdf_paths:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                extraction = app.extract_pdf_pages(path, parallel=False, backend_name=backend_name)
+                elapsed = time.perf_counter() - start
+                if best is None or elapsed < best:
+                    best = elapsed
+            seconds += best
+            pages += extraction.page_count
+            if extraction.error is not None:
+                errors[path] = extraction.error
+                continue
+            outputs[path] = app.parse_quotation_pdf(extraction.marked_text)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux下 ru_maxrss 的单位是KB
+    return {'backend': backend_name, 'seconds': seconds, 'pages': pages,
+            'memory_mb': (rss_after - rss_before) / 1024, 'outputs': outputs, 'errors': errors}
+
+
+def run_comparison(pdf_paths, backend_names, repeat=3):
+    """依次在新的子进程中运行各后端，以默认后端的解析结果为基准比对"""
+    import app
+
+    names = [app.DEFAULT_PDF_BACKEND] + [name for name in backend_names if name != app.DEFAULT_PDF_BACKEND]
+    results = []
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            results.append(pool.submit(run_backend, name, pdf_paths, repeat).result())
+    reference = results[0]['outputs']
+    for result in results:
+        result['identical'] = sum(1 for path, output in result['outputs'].items() if output == reference.get(path))
+        result['different'] = [os.path.basename(path) for path, output in result['outputs'].items()
+                               if output != reference.get(path)]
+    return results
+
+
+def print_report(results, file_count):
+    """打印各后端的耗时、吞吐量、内存增量和结果一致性"""
+    print(f"文件: {file_count}  基准后端: {results[0]['backend']}")
+    print(f"{'后端':<10}{'耗时(秒)':>12}{'页/秒':>10}{'内存(MB)':>12}{'结果一致':>10}{'失败':>6}")
+    for result in results:
+        pages_per_sec = result['pages'] / result['seconds'] if result['seconds'] else 0
+        print(f"{result['backend']:<10}{result['seconds']:>12.4f}{pages_per_sec:>10.1f}"
+              f"{result['memory_mb']:>12.1f}{result['identical']:>7}/{file_count:<3}{len(result['errors']):>5}")
+    for result in results:
+        if result['different']:
+            print(f"{result['backend']} 解析结果不同: {', '.join(result['different'])}")
+        for path, error in result['errors'].items():
+            print(f"{result['backend']} 提取失败: {os.path.basename(path)}: {error}")
+
+
+def main():
+    import app
+
+    parser = argparse.ArgumentParser(description='PDF文本提取后端对比测试')
+    parser.add_argument('--corpus', help='已有PDF目录（不指定时生成合成报价单）')
+    parser.add_argument('--backends', nargs='+', help=f'要测试的后端（默认所有可用后端：{", ".join(app.available_pdf_backends())}）')
+    parser.add_argument('--count', type=int, default=3, help='生成的PDF数量')
+    parser.add_argument('--pages', type=int, default=20, help='每个PDF的页数')
+    parser.add_argument('--lines', type=int, default=40, help='每页的产品行数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个文件重复提取次数（取最快一次）')
+
+    args = parser.parse_args()
+
+    backend_names = args.backends or app.available_pdf_backends()
+    for name in backend_names:
+        if name not in app.PDF_EXTRACTION_BACKENDS:
+            parser.error(f'未知的后端: {name}（可选: {", ".join(app.PDF_EXTRACTION_BACKENDS)}）')
+        if not app.PDF_EXTRACTION_BACKENDS[name].is_available():
+            parser.error(f'后端 {name} 的依赖模块 {app.PDF_EXTRACTION_BACKENDS[name].module} 没有安装')
+
+    if args.corpus:
+        pdf_paths = sorted(glob.glob(os.path.join(args.corpus, '*.pdf')))
+        if not pdf_paths:
+            parser.error(f'目录中没有PDF文件: {args.corpus}')
+        print_report(run_comparison(pdf_paths, backend_names, args.repeat), len(pdf_paths))
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            corpus = generate_corpus(corpus_dir, args.count, args.pages, args.lines)
+            pdf_paths = [path for path, _ in corpus]
+            print_report(run_comparison(pdf_paths, backend_names, args.repeat), len(pdf_paths))
+
+
+if __name__ == '__main__':
+    main()
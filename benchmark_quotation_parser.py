@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报价单解析性能测试工具
+对合成（或指定目录中的）报价单PDF分别统计PDF文本提取、行解析和SKU生成三个阶段的吞吐量（页/秒、行/秒）。
+--compare-rev 指定git版本（如优化前的提交）时，对同一批PDF提取的文本分别用该版本和当前版本的
+parse_quotation_pdf 解析，比较两者的吞吐量（行/秒）并检查解析结果是否一致。
+需要在项目根目录运行，以便加载 data/ 中的SKU映射和价格数据。
+"""
+
+import io
+import os
+import re
+import sys
+import glob
+import time
+import types
+import tempfile
+import argparse
+import subprocess
+from contextlib import redirect_stdout
+
+from generate_sample_quotations import generate_corpus
+
+
+def run_benchmark(pdf_paths, repeat=3):
+    """对每个PDF重复执行各阶段，返回按阶段汇总的最佳耗时及页数、行数、产品数"""
+    import app
+
+    totals = {'extract': 0.0, 'parse': 0.0, 'sku': 0.0}
+    pages = lines = products = matched = 0
+    with app.app.test_request_context():
+        for path in pdf_paths:
+            best = {'extract': None, 'parse': None, 'sku': None}
+            for _ in range(repeat):
+                start = time.perf_counter()
+                extraction = app.extract_pdf_pages(path, parallel=False)
+                marked_text = extraction.marked_text
+                extracted = time.perf_counter()
+                tokens = app.tokenize_quotation_pdf(marked_text)
+                parsed = time.perf_counter()
+                result = app.resolve_quotation_tokens(tokens)
+                resolved = time.perf_counter()
+                for stage, seconds in (('extract', extracted - start),
+                                       ('parse', parsed - extracted),
+                                       ('sku', resolved - parsed)):
+                    if best[stage] is None or seconds < best[stage]:
+                        best[stage] = seconds
+            for stage in totals:
+                totals[stage] += best[stage]
+            pages += extraction.page_count
+            lines += marked_text.count('\n') + 1
+            products += len(result[0])
+            matched += 1 if result[1] else 0
+    return totals, {'files': len(pdf_paths), 'pages': pages, 'lines': lines, 'products': products, 'matched': matched}
+
+
+def load_app_revision(rev):
+    """从git中读取指定版本的 app.py，作为单独的模块加载（数据文件与当前版本相同）"""
+    source = subprocess.run(['git', 'show', f'{rev}:app.py'], capture_output=True, text=True, check=True).stdout
+    module = types.ModuleType('app_' + re.sub(r'\W', '_', rev))
+    module.__file__ = os.path.abspath('app.py')
+    sys.modules[module.__name__] = module
+    with redirect_stdout(io.StringIO()):
+        exec(compile(source, f'{rev}:app.py', 'exec'), module.__dict__)
+    return module
+
+
+def run_comparison(pdf_paths, baseline, repeat=3):
+    """对同一批PDF文本分别用 baseline 和当前版本的 parse_quotation_pdf 解析，返回 (各自最佳耗时之和, 行数, 结果不一致的文件数)
+    
+    两个版本的调试输出都被丢弃；当前版本每次解析前清空SKU生成缓存，与没有缓存的旧版本条件相同。
+    """
+    import app
+
+    totals = {'baseline': 0.0, 'current': 0.0}
+    lines = mismatched = 0
+    for path in pdf_paths:
+        with app.app.test_request_context():
+            marked_text = app.extract_pdf_pages(path, parallel=False).marked_text
+        lines += marked_text.count('\n') + 1
+        results = {}
+        for name, module in (('baseline', baseline), ('current', app)):
+            best = None
+            with module.app.test_request_context(), redirect_stdout(io.StringIO()):
+                for _ in range(repeat):
+                    if module is app:
+                        app._generate_final_sku_cached.cache_clear()
+                    start = time.perf_counter()
+                    results[name] = module.parse_quotation_pdf(marked_text)
+                    seconds = time.perf_counter() - start
+                    best = seconds if best is None else min(best, seconds)
+            totals[name] += best
+        mismatched += results['baseline'] != results['current']
+    return totals, lines, mismatched
+
+
+def print_comparison(rev, totals, lines, mismatched, files):
+    """打印两个版本的行解析吞吐量"""
+    print(f"文件: {files}  行数: {lines}  解析结果不一致的文件: {mismatched}")
+    print(f"{'版本':<16}{'耗时(秒)':>12}{'行/秒':>14}")
+    for name, label in (('baseline', rev), ('current', '当前版本')):
+        seconds = totals[name]
+        print(f"{label:<16}{seconds:>12.4f}{(lines / seconds if seconds else 0):>14.0f}")
+    if totals['current']:
+        print(f"加速比: {totals['baseline'] / totals['current']:.2f}x")
+
+
+def print_report(totals, counts):
+    """打印各阶段吞吐量"""
+    print(f"文件: {counts['files']}  页数: {counts['pages']}  行数: {counts['lines']}  "
+          f"产品: {counts['products']}  合计金额比对通过: {counts['matched']}/{counts['files']}")
+    print(f"{'阶段':<10}{'耗时(秒)':>12}{'页/秒':>12}{'行/秒':>14}")
+    labels = {'extract': 'PDF提取', 'parse': '行解析', 'sku': 'SKU生成'}
+    for stage, seconds in totals.items():
+        pages_per_sec = counts['pages'] / seconds if seconds else 0
+        lines_per_sec = counts['lines'] / seconds if seconds else 0
+        print(f"{labels[stage]:<10}{seconds:>12.4f}{pages_per_sec:>12.1f}{lines_per_sec:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报价单解析性能测试')
+    parser.add_argument('--corpus', help='已有PDF目录（不指定时生成合成报价单）')
+    parser.add_argument('--count', type=int, default=3, help='生成的PDF数量')
+    parser.add_argument('--pages', type=int, default=20, help='每个PDF的页数')
+    parser.add_argument('--lines', type=int, default=40, help='每页的产品行数')
+    parser.add_argument('--repeat', type=int, default=3, help='每个文件重复次数（取最快一次）')
+    parser.add_argument('--compare-rev', help='与指定git版本的行解析比较吞吐量（如 da2e3bb）')
+
+    args = parser.parse_args()
+
+    def run(pdf_paths):
+        if args.compare_rev:
+            totals, lines, mismatched = run_comparison(pdf_paths, load_app_revision(args.compare_rev), args.repeat)
+            print_comparison(args.compare_rev, totals, lines, mismatched, len(pdf_paths))
+        else:
+            print_report(*run_benchmark(pdf_paths, args.repeat))
+
+    if args.corpus:
+        pdf_paths = sorted(glob.glob(os.path.join(args.corpus, '*.pdf')))
+        if not pdf_paths:
+            parser.error(f'目录中没有PDF文件: {args.corpus}')
+        run(pdf_paths)
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            corpus = generate_corpus(corpus_dir, args.count, args.pages, args.lines)
+            run([path for path, _ in corpus])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报价单批量转换工具
+不经过HTTP，直接把目录中的报价单PDF转换为OCCW订单Excel（每个PDF一个文件，或合并为一个工作簿），
+同时生成各文件总价和合计金额比对结果的CSV汇总，最后输出吞吐量。
+PDF提取、解析和SKU生成（含SKU映射）与网页上传使用相同的函数，在进程池中并行处理。
+需要在项目根目录运行，以便加载 data/ 中的SKU映射和价格数据。
+"""
+
+import os
+import re
+import csv
+import glob
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import xlsxwriter
+
+import app
+
+# 子进程中常驻的请求上下文（比对结果的提示文字需要翻译函数）
+_request_context = None
+
+
+def init_worker():
+    """进程池初始化：SKU映射和价格数据在导入 app 时已加载，这里只需建立请求上下文"""
+    global _request_context
+    _request_context = app.app.test_request_context()
+    _request_context.push()
+
+
+def convert_pdf(pdf_path, output_dir=None, export_date='', sales_person=''):
+    """提取、解析一个报价单PDF并生成SKU，指定 output_dir 时同时写出该PDF的OCCW Excel"""
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(pdf_path))[0]
+    result = {'file': os.path.basename(pdf_path), 'name': name, 'pages': 0, 'products': [],
+              'total_price': 0, 'pdf_total': None, 'compare_result': None, 'unmatched_skus': 0,
+              'output': '', 'error': ''}
+    try:
+        extraction = app.extract_pdf_pages(pdf_path, parallel=False)
+        result['pages'] = extraction.page_count
+        if extraction.error is not None:
+            raise RuntimeError(extraction.error)
+        tokens = app.tokenize_quotation_pages(extraction.pages)
+        products, compare_result, compare_message = app.resolve_quotation_tokens(tokens)
+        result.update({
+            'products': [(product['sku'], product['qty']) for product in products],
+            'total_price': app.calculate_products_total(products),
+            'pdf_total': tokens['pdf_total'],
+            'compare_result': compare_result,
+            'unmatched_skus': sum(1 for product in products if not app.occw_sku_exists(product['sku']))
+        })
+        if output_dir:
+            output_path = os.path.join(output_dir, f"{name}.xlsx")
+            workbook = xlsxwriter.Workbook(output_path)
+            app.write_occw_worksheet(workbook.add_worksheet(), result['products'], export_date, name, sales_person)
+            workbook.close()
+            result['output'] = output_path
+    except Exception as e:
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def convert_pdf_task(args):
+    return convert_pdf(*args)
+
+
+def unique_sheet_name(name, used):
+    """Excel工作表名最长31个字符且不能重复，也不能包含 []:*?/\\"""
+    base = re.sub(r'[\[\]:*?/\\]', '_', name)[:31] or 'Sheet'
+    sheet_name = base
+    index = 2
+    while sheet_name.lower() in used:
+        suffix = f"_{index}"
+        sheet_name = base[:31 - len(suffix)] + suffix
+        index += 1
+    used.add(sheet_name.lower())
+    return sheet_name
+
+
+def write_summary(results, summary_path):
+    """写出CSV汇总"""
+    with open(summary_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(['文件', '页数', '产品数', '解析总价', 'PDF合计金额', '比对结果', '未匹配SKU数', '输出文件', '耗时(秒)', '错误'])
+        for result in results:
+            compare = {True: '一致', False: '不一致', None: '未识别'}[result['compare_result']]
+            writer.writerow([
+                result['file'], result['pages'], len(result['products']), f"{result['total_price']:.2f}",
+                '' if result['pdf_total'] is None else f"{result['pdf_total']:.2f}",
+                '' if result['error'] else compare, result['unmatched_skus'], result['output'],
+                f"{result['seconds']:.3f}", result['error']
+            ])
+
+
+def convert_directory(input_dir, output_dir, combined=False, workers=None, export_date=None, sales_person=None):
+    """转换目录中的所有PDF，返回 (结果列表, 耗时秒数)"""
+    pdf_paths = sorted(glob.glob(os.path.join(input_dir, '*.pdf')))
+    os.makedirs(output_dir, exist_ok=True)
+    export_date = export_date or datetime.now().strftime('%Y-%m-%d')
+    if sales_person is None:
+        sales_person = app.get_default_sales_person()
+
+    start = time.perf_counter()
+    tasks = [(path, None if combined else output_dir, export_date, sales_person) for path in pdf_paths]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        results = list(pool.map(convert_pdf_task, tasks, chunksize=4))
+
+    if combined:
+        # 合并模式：每个PDF一个工作表
+        combined_path = os.path.join(output_dir, 'occw_quotes.xlsx')
+        workbook = xlsxwriter.Workbook(combined_path)
+        used_names = set()
+        for result in results:
+            if result['error']:
+                continue
+            worksheet = workbook.add_worksheet(unique_sheet_name(result['name'], used_names))
+            app.write_occw_worksheet(worksheet, result['products'], export_date, result['name'], sales_person)
+            result['output'] = combined_path
+        workbook.close()
+
+    write_summary(results, os.path.join(output_dir, 'summary.csv'))
+    return results, time.perf_counter() - start
+
+
+def print_report(results, seconds):
+    """打印转换结果和吞吐量"""
+    failed = [result for result in results if result['error']]
+    pages = sum(result['pages'] for result in results)
+    products = sum(len(result['products']) for result in results)
+    matched = sum(1 for result in results if result['compare_result'] is True)
+    for result in failed:
+        print(f"失败: {result['file']}: {result['error']}")
+    print(f"文件: {len(results)}  失败: {len(failed)}  合计金额比对通过: {matched}/{len(results) - len(failed)}")
+    print(f"页数: {pages}  产品: {products}  耗时: {seconds:.2f} 秒")
+    if seconds:
+        print(f"吞吐量: {len(results) / seconds:.1f} 文件/秒  {pages / seconds:.1f} 页/秒  {products / seconds:.0f} 产品/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='报价单PDF批量转换为OCCW订单Excel')
+    parser.add_argument('input_dir', help='报价单PDF所在目录')
+    parser.add_argument('output_dir', help='输出目录（Excel文件和 summary.csv）')
+    parser.add_argument('--combined', action='store_true', help='合并为一个工作簿（每个PDF一个工作表）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认CPU核数）')
+    parser.add_argument('--date', help='订单日期（默认今天）')
+    parser.add_argument('--sales-person', help='销售人员（默认系统设置中的默认销售人员）')
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.input_dir):
+        parser.error(f'目录不存在: {args.input_dir}')
+    if not glob.glob(os.path.join(args.input_dir, '*.pdf')):
+        parser.error(f'目录中没有PDF文件: {args.input_dir}')
+    results, seconds = convert_directory(args.input_dir, args.output_dir, args.combined,
+                                         args.workers, args.date, args.sales_person)
+    print_report(results, seconds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+报价单PDF样本生成工具
+按 parse_quotation_pdf 支持的版式生成合成报价单PDF，用于在没有客户PDF的情况下测试和评估解析性能。
+覆盖门板颜色行、带*号的序号、数字开头的Manuf. code（如3DB30）、多行产品（WF330 FOR）、
+页脚和 OPWM_1 Net Total 合计行。
+"""
+
+import os
+import random
+import argparse
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+
+DOOR_COLORS = ['WSS', 'BSS', 'GSS', 'MNW', 'PGW', 'SSW']
+# (Manuf. code, 描述)
+PRODUCT_CATALOG = [
+    ('B30', 'Base Cabinet'),
+    ('B36FH', 'Base Cabinet Full Height'),
+    ('W3030', 'Wall Cabinet'),
+    ('SB36', 'Sink Base Cabinet'),
+    ('3DB30', 'Drawer Base Cabinet'),
+    ('2DB24', 'Drawer Base Cabinet'),
+    ('B30-L', 'Door'),
+    ('W1530-R', 'Door'),
+    ('TK8', 'Toe Kick'),
+    ('CM8', 'Crown Molding'),
+    ('F3', 'Filler'),
+    ('BEP24', 'End Panel'),
+    ('HW-PULL', 'Hardware Pull'),
+    ('WSL3615', 'Assm. Shelf'),
+]
+TABLE_HEADER = 'Description Manuf. code # Qty User code'
+
+
+def format_product_line(manuf_code, seq_text, description, line_total, qty):
+    """单行产品：Manuf. code  序号  描述  行总价  数量+User code"""
+    return f"{manuf_code} {seq_text} {description} {line_total:,.2f} {qty}{manuf_code}"
+
+
+def format_multiline_product(seq_num, unit_price, qty):
+    """多行产品（如 WF330 FOR）：价格为单价，跨三行显示"""
+    return [
+        'WF330 FOR',
+        f"BASE{seq_num} Filler",
+        f"{unit_price:.2f} {qty}WF330 BASE",
+    ]
+
+
+def generate_quotation_pdf(path, pages=10, lines_per_page=30, seed=0):
+    """生成一个合成报价单PDF，返回 {'pages', 'products', 'lines', 'net_total'}"""
+    rnd = random.Random(seed)
+    pdf = canvas.Canvas(path, pagesize=letter)
+    width, height = letter
+    # 每页产品行 + 表头、门板颜色、页脚等固定行
+    leading = min(14, (height - 80) / (lines_per_page + 8))
+    font_size = max(5, leading - 2)
+
+    seq_num = 1
+    net_total = 0
+    product_count = 0
+    line_count = 0
+    door_color = rnd.choice(DOOR_COLORS)
+    for page_num in range(1, pages + 1):
+        rows = []
+        # 每隔几页切换门板颜色
+        if page_num == 1 or rnd.random() < 0.3:
+            door_color = rnd.choice(DOOR_COLORS)
+            rows.append(f"Style Shaker door color 1 {door_color}")
+            rows.append(f"door color 1 {door_color}")
+        # 表头与房间名称在同一行，由 extract_pdf_content 的强制分行处理
+        rows.append(f"Room {page_num} {TABLE_HEADER}")
+
+        written = 0
+        while written < lines_per_page:
+            qty = rnd.randint(1, 4)
+            unit_price = rnd.randint(20, 900)
+            if written + 3 <= lines_per_page and rnd.random() < 0.08:
+                rows.extend(format_multiline_product(seq_num, unit_price, qty))
+                written += 3
+            else:
+                manuf_code, description = rnd.choice(PRODUCT_CATALOG)
+                seq_text = f"*{seq_num}" if rnd.random() < 0.1 else str(seq_num)
+                rows.append(format_product_line(manuf_code, seq_text, description, unit_price * qty, qty))
+                written += 1
+            net_total += unit_price * qty
+            seq_num += 1
+            product_count += 1
+
+        if page_num == pages:
+            rows.append(f"OPWM_1 Net Total {net_total:,.2f}")
+        rows.append(f"Print date: 1 2025-01-01 Page {page_num} /")
+
+        pdf.setFont('Helvetica', font_size)
+        y = height - 40
+        for row in rows:
+            pdf.drawString(36, y, row)
+            y -= leading
+        line_count += len(rows)
+        pdf.showPage()
+    pdf.save()
+    return {'pages': pages, 'products': product_count, 'lines': line_count, 'net_total': net_total}
+
+
+def generate_corpus(output_dir, count=5, pages=10, lines_per_page=30, seed=0):
+    """在 output_dir 中生成 count 个报价单PDF，返回 [(路径, 统计信息)]"""
+    os.makedirs(output_dir, exist_ok=True)
+    corpus = []
+    for index in range(count):
+        path = os.path.join(output_dir, f"sample_quotation_{index + 1:03d}.pdf")
+        corpus.append((path, generate_quotation_pdf(path, pages, lines_per_page, seed + index)))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成报价单PDF样本')
+    parser.add_argument('output_dir', help='输出目录')
+    parser.add_argument('--count', type=int, default=5, help='生成的PDF数量')
+    parser.add_argument('--pages', type=int, default=10, help='每个PDF的页数')
+    parser.add_argument('--lines', type=int, default=30, help='每页的产品行数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+
+    args = parser.parse_args()
+
+    for path, info in generate_corpus(args.output_dir, args.count, args.pages, args.lines, args.seed):
+        print(f"{path}: {info['pages']} 页, {info['products']} 个产品, 合计 {info['net_total']:,.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,60 @@
 
 let sharedProductCounter = 1;
 
+// 产品目录（/get_occw_catalog）每个页面只加载一次，之后类别、产品选项和SKU价格直接在页面中查找
+let occwCatalogRequest = null;
+
+function loadOCCWCatalogShared() {
+    if (!occwCatalogRequest) {
+        occwCatalogRequest = $.ajax({
+            url: '/get_occw_catalog',
+            type: 'GET',
+            dataType: 'json'
+        });
+        occwCatalogRequest.fail(function() {
+            // 加载失败时下次重新请求
+            occwCatalogRequest = null;
+        });
+    }
+    return occwCatalogRequest;
+}
+
+function catalogResponseShared(catalog, url, data) {
+    // 用产品目录生成与服务器接口相同的结果，目录中没有时返回null
+    if (url === '/get_product_categories') {
+        return { success: true, categories: catalog.categories };
+    }
+    if (url === '/get_products_by_category') {
+        const options = catalog.options[data.category];
+        return options ? Object.assign({ success: true }, options) : null;
+    }
+    if (url === '/search_sku_price') {
+        const products = catalog.tree[data.category] || {};
+        const boxVariants = products[data.product] || {};
+        const doorVariants = boxVariants[data.box_variant || ''] || {};
+        const entry = doorVariants[data.door_variant || ''];
+        return entry ? { success: true, sku: entry[0], price: entry[1], found: true, match_type: 'product' } : null;
+    }
+    return null;
+}
+
+function catalogRequestShared(url, data) {
+    // 先用产品目录回答，目录加载失败或没有对应数据时再请求服务器
+    const deferred = $.Deferred();
+    const requestServer = function() {
+        $.ajax({ url: url, type: 'GET', data: data }).done(deferred.resolve).fail(deferred.reject);
+    };
+    loadOCCWCatalogShared().done(function(catalog) {
+        const response = catalogResponseShared(catalog, url, data || {});
+        if (response) {
+            deferred.resolve(response);
+        } else {
+            requestServer();
+        }
+    }).fail(requestServer);
+    return deferred.promise();
+}
+
 function addNewProductShared(containerId, tableBodyId, counterId) {
     // 通用的新增产品行函数
     const tbody = document.getElementById(tableBodyId);
@@ -57,23 +111,18 @@ function addNewProductShared(containerId, tableBodyId, counterId) {
 
 function loadProductCategoriesShared(rowNum) {
     // 加载产品类别
-    $.ajax({
-        url: '/get_product_categories',
-        type: 'GET',
-        success: function(response) {
-            if (response.success) {
-                const select = document.getElementById(`category-${rowNum}`);
-                response.categories.forEach(category => {
-                    const option = document.createElement('option');
-                    option.value = category;
-                    option.textContent = category;
-                    select.appendChild(option);
-                });
-            }
-        },
-        error: function() {
-            showAlert(window.translations.load_product_category_failed, 'warning');
+    catalogRequestShared('/get_product_categories').done(function(response) {
+        if (response.success) {
+            const select = document.getElementById(`category-${rowNum}`);
+            response.categories.forEach(category => {
+                const option = document.createElement('option');
+                option.value = category;
+                option.textContent = category;
+                select.appendChild(option);
+            });
         }
+    }).fail(function() {
+        showAlert(window.translations.load_product_category_failed, 'warning');
     });
 }
 
@@ -87,75 +136,69 @@ function onCategoryChangeShared(rowNum) {
 
 function loadProductsShared(rowNum, category) {
     // 根据类别加载产品列表
-    $.ajax({
-        url: '/get_products_by_category',
-        type: 'GET',
-        data: { category: category },
-        success: function(response) {
-            if (response.success) {
-                const productSelect = document.getElementById(`product-${rowNum}`);
-                const boxVariantSelect = document.getElementById(`box-variant-${rowNum}`);
-                const doorVariantSelect = document.getElementById(`door-variant-${rowNum}`);
-                
-                // 填充产品选择
-                productSelect.innerHTML = '<option value="">' + window.translations.select_product + '</option>';
-                response.products.forEach(product => {
-                    const option = document.createElement('option');
-                    option.value = product;
-                    option.textContent = product;
-                    productSelect.appendChild(option);
-                });
-                productSelect.disabled = false;
-                
-                // 填充柜身变体选择，确保PLY在第一位
-                boxVariantSelect.innerHTML = '<option value="">' + window.translations.select_box_variant + '</option>';
-                
-                // 先添加PLY选项（如果存在）
-                if (response.box_variants.includes('PLY')) {
-                    const plyOption = document.createElement('option');
-                    plyOption.value = 'PLY';
-                    plyOption.textContent = 'PLY';
-                    boxVariantSelect.appendChild(plyOption);
-                }
-                
-                // 添加其他变体选项
-                response.box_variants.forEach(variant => {
-                    if (variant !== 'PLY') {
-                        const option = document.createElement('option');
-                        option.value = variant;
-                        option.textContent = variant;
-                        boxVariantSelect.appendChild(option);
-                    }
-                });
-                
-                // 填充门板变体选择
-                doorVariantSelect.innerHTML = '<option value="">' + window.translations.select_door_variant + '</option>';
-                response.door_variants.forEach(variant => {
+    catalogRequestShared('/get_products_by_category', { category: category }).done(function(response) {
+        if (response.success) {
+            const productSelect = document.getElementById(`product-${rowNum}`);
+            const boxVariantSelect = document.getElementById(`box-variant-${rowNum}`);
+            const doorVariantSelect = document.getElementById(`door-variant-${rowNum}`);
+            
+            // 填充产品选择
+            productSelect.innerHTML = '<option value="">' + window.translations.select_product + '</option>';
+            response.products.forEach(product => {
+                const option = document.createElement('option');
+                option.value = product;
+                option.textContent = product;
+                productSelect.appendChild(option);
+            });
+            productSelect.disabled = false;
+            
+            // 填充柜身变体选择，确保PLY在第一位
+            boxVariantSelect.innerHTML = '<option value="">' + window.translations.select_box_variant + '</option>';
+            
+            // 先添加PLY选项（如果存在）
+            if (response.box_variants.includes('PLY')) {
+                const plyOption = document.createElement('option');
+                plyOption.value = 'PLY';
+                plyOption.textContent = 'PLY';
+                boxVariantSelect.appendChild(plyOption);
+            }
+            
+            // 添加其他变体选项
+            response.box_variants.forEach(variant => {
+                if (variant !== 'PLY') {
                     const option = document.createElement('option');
                     option.value = variant;
                     option.textContent = variant;
-                    doorVariantSelect.appendChild(option);
-                });
-                
-                // 根据类别启用/禁用变体选择
-                if (category === 'BOX') {
-                    boxVariantSelect.disabled = false;
-                    doorVariantSelect.disabled = false;
-                } else if (category === 'Door' || category === 'ENDING PANEL' || category === 'MOLDING' || category === 'TOE KICK' || category === 'FILLER') {
-                    boxVariantSelect.disabled = true;
-                    doorVariantSelect.disabled = false;
-                } else if (category === 'Assm.组合件') {
-                    boxVariantSelect.disabled = false;
-                    doorVariantSelect.disabled = false;
-                } else if (category === 'HARDWARE') {
-                    boxVariantSelect.disabled = true;
-                    doorVariantSelect.disabled = true;
+                    boxVariantSelect.appendChild(option);
                 }
+            });
+            
+            // 填充门板变体选择
+            doorVariantSelect.innerHTML = '<option value="">' + window.translations.select_door_variant + '</option>';
+            response.door_variants.forEach(variant => {
+                const option = document.createElement('option');
+                option.value = variant;
+                option.textContent = variant;
+                doorVariantSelect.appendChild(option);
+            });
+            
+            // 根据类别启用/禁用变体选择
+            if (category === 'BOX') {
+                boxVariantSelect.disabled = false;
+                doorVariantSelect.disabled = false;
+            } else if (category === 'Door' || category === 'ENDING PANEL' || category === 'MOLDING' || category === 'TOE KICK' || category === 'FILLER') {
+                boxVariantSelect.disabled = true;
+                doorVariantSelect.disabled = false;
+            } else if (category === 'Assm.组合件') {
+                boxVariantSelect.disabled = false;
+                doorVariantSelect.disabled = false;
+            } else if (category === 'HARDWARE') {
+                boxVariantSelect.disabled = true;
+                doorVariantSelect.disabled = true;
             }
-        },
-        error: function() {
-            showAlert(window.translations.load_product_list_failed, 'warning');
         }
+    }).fail(function() {
+        showAlert(window.translations.load_product_list_failed, 'warning');
     });
 }
 
@@ -180,39 +223,33 @@ function searchSkuAndPriceShared(rowNum) {
         return;
     }
     
-    $.ajax({
-        url: '/search_sku_price',
-        type: 'GET',
-        data: {
-            category: category,
-            product: product,
-            box_variant: boxVariant,
-            door_variant: doorVariant
-        },
-        success: function(response) {
-            if (response.success) {
-                const skuElement = document.getElementById(`sku-${rowNum}`);
-                const priceElement = document.getElementById(`price-${rowNum}`);
-                
-                if (response.found) {
-                    skuElement.textContent = response.sku;
-                    skuElement.className = 'badge bg-success';
-                    priceElement.textContent = `$${response.price.toFixed(2)}`;
-                } else {
-                    skuElement.textContent = window.translations.not_found;
-                    skuElement.className = 'badge bg-danger';
-                    priceElement.textContent = '$0.00';
-                }
-                
-                // 调用页面特定的更新函数
-                if (typeof updateProductTotalShared === 'function') {
-                    updateProductTotalShared(rowNum);
-                }
+    catalogRequestShared('/search_sku_price', {
+        category: category,
+        product: product,
+        box_variant: boxVariant,
+        door_variant: doorVariant
+    }).done(function(response) {
+        if (response.success) {
+            const skuElement = document.getElementById(`sku-${rowNum}`);
+            const priceElement = document.getElementById(`price-${rowNum}`);
+            
+            if (response.found) {
+                skuElement.textContent = response.sku;
+                skuElement.className = 'badge bg-success';
+                priceElement.textContent = `$${response.price.toFixed(2)}`;
+            } else {
+                skuElement.textContent = window.translations.not_found;
+                skuElement.className = 'badge bg-danger';
+                priceElement.textContent = '$0.00';
+            }
+            
+            // 调用页面特定的更新函数
+            if (typeof updateProductTotalShared === 'function') {
+                updateProductTotalShared(rowNum);
             }
-        },
-        error: function() {
-            showAlert(window.translations.search_sku_failed, 'warning');
         }
+    }).fail(function() {
+        showAlert(window.translations.search_sku_failed, 'warning');
     });
 }
 
@@ -254,109 +291,103 @@ function loadProductsByCategoryUniversal(category, rowNum, options = {}) {
     
     const prefix = elementPrefix ? `${elementPrefix}-` : '';
     
-    $.ajax({
-        url: '/get_products_by_category',
-        type: 'GET',
-        data: { category: category },
-        success: function(response) {
-            if (response.success) {
-                const productSelect = document.getElementById(`${prefix}product-${rowNum}`);
-                const boxVariantSelect = document.getElementById(`${prefix}box-variant-${rowNum}`);
-                const doorVariantSelect = document.getElementById(`${prefix}door-variant-${rowNum}`);
+    catalogRequestShared('/get_products_by_category', { category: category }).done(function(response) {
+        if (response.success) {
+            const productSelect = document.getElementById(`${prefix}product-${rowNum}`);
+            const boxVariantSelect = document.getElementById(`${prefix}box-variant-${rowNum}`);
+            const doorVariantSelect = document.getElementById(`${prefix}door-variant-${rowNum}`);
+            
+            if (!productSelect || !boxVariantSelect || !doorVariantSelect) {
+                console.error('Required elements not found for row:', rowNum);
+                return;
+            }
+            
+            // 填充产品选择
+            productSelect.innerHTML = '<option value="">' + window.translations.select_product + '</option>';
+            response.products.forEach(product => {
+                const option = document.createElement('option');
+                option.value = product;
+                option.textContent = product;
                 
-                if (!productSelect || !boxVariantSelect || !doorVariantSelect) {
-                    console.error('Required elements not found for row:', rowNum);
-                    return;
+                // 如果设置了保存值模式，设置选中状态
+                if (setValues && savedValues && savedValues.product === product) {
+                    option.selected = true;
                 }
                 
-                // 填充产品选择
-                productSelect.innerHTML = '<option value="">' + window.translations.select_product + '</option>';
-                response.products.forEach(product => {
-                    const option = document.createElement('option');
-                    option.value = product;
-                    option.textContent = product;
-                    
-                    // 如果设置了保存值模式，设置选中状态
-                    if (setValues && savedValues && savedValues.product === product) {
-                        option.selected = true;
-                    }
-                    
-                    productSelect.appendChild(option);
-                });
-                productSelect.disabled = false;
+                productSelect.appendChild(option);
+            });
+            productSelect.disabled = false;
+            
+            // 填充柜身变体选择，确保PLY在第一位
+            boxVariantSelect.innerHTML = '<option value="">' + window.translations.select_box_variant + '</option>';
+            
+            // 先添加PLY选项（如果存在）
+            if (response.box_variants.includes('PLY')) {
+                const plyOption = document.createElement('option');
+                plyOption.value = 'PLY';
+                plyOption.textContent = 'PLY';
                 
-                // 填充柜身变体选择，确保PLY在第一位
-                boxVariantSelect.innerHTML = '<option value="">' + window.translations.select_box_variant + '</option>';
-                
-                // 先添加PLY选项（如果存在）
-                if (response.box_variants.includes('PLY')) {
-                    const plyOption = document.createElement('option');
-                    plyOption.value = 'PLY';
-                    plyOption.textContent = 'PLY';
-                    
-                    if (setValues && savedValues && savedValues.box_variant === 'PLY') {
-                        plyOption.selected = true;
-                    }
-                    
-                    boxVariantSelect.appendChild(plyOption);
+                if (setValues && savedValues && savedValues.box_variant === 'PLY') {
+                    plyOption.selected = true;
                 }
                 
-                // 添加其他变体选项
-                response.box_variants.forEach(variant => {
-                    if (variant !== 'PLY') {
-                        const option = document.createElement('option');
-                        option.value = variant;
-                        option.textContent = variant;
-                        
-                        if (setValues && savedValues && savedValues.box_variant === variant) {
-                            option.selected = true;
-                        }
-                        
-                        boxVariantSelect.appendChild(option);
-                    }
-                });
-                
-                // 填充门板变体选择
-                doorVariantSelect.innerHTML = '<option value="">' + window.translations.select_door_variant + '</option>';
-                response.door_variants.forEach(variant => {
+                boxVariantSelect.appendChild(plyOption);
+            }
+            
+            // 添加其他变体选项
+            response.box_variants.forEach(variant => {
+                if (variant !== 'PLY') {
                     const option = document.createElement('option');
                     option.value = variant;
                     option.textContent = variant;
                     
-                    if (setValues && savedValues && savedValues.door_variant === variant) {
+                    if (setValues && savedValues && savedValues.box_variant === variant) {
                         option.selected = true;
                     }
                     
-                    doorVariantSelect.appendChild(option);
-                });
-                
-                // 根据类别启用/禁用变体选择
-                if (category === 'BOX') {
-                    boxVariantSelect.disabled = false;
-                    doorVariantSelect.disabled = true;
-                } else if (category === 'Door' || category === 'ENDING PANEL' || category === 'MOLDING' || category === 'TOE KICK' || category === 'FILLER') {
-                    boxVariantSelect.disabled = true;
-                    doorVariantSelect.disabled = false;
-                } else if (category === 'Assm.组合件') {
-                    boxVariantSelect.disabled = false;
-                    doorVariantSelect.disabled = false;
-                } else if (category === 'HARDWARE') {
-                    boxVariantSelect.disabled = true;
-                    doorVariantSelect.disabled = true;
+                    boxVariantSelect.appendChild(option);
                 }
+            });
+            
+            // 填充门板变体选择
+            doorVariantSelect.innerHTML = '<option value="">' + window.translations.select_door_variant + '</option>';
+            response.door_variants.forEach(variant => {
+                const option = document.createElement('option');
+                option.value = variant;
+                option.textContent = variant;
                 
-                // 如果有回调函数，调用它
-                if (callback && typeof callback === 'function') {
-                    callback(response);
+                if (setValues && savedValues && savedValues.door_variant === variant) {
+                    option.selected = true;
                 }
+                
+                doorVariantSelect.appendChild(option);
+            });
+            
+            // 根据类别启用/禁用变体选择
+            if (category === 'BOX') {
+                boxVariantSelect.disabled = false;
+                doorVariantSelect.disabled = true;
+            } else if (category === 'Door' || category === 'ENDING PANEL' || category === 'MOLDING' || category === 'TOE KICK' || category === 'FILLER') {
+                boxVariantSelect.disabled = true;
+                doorVariantSelect.disabled = false;
+            } else if (category === 'Assm.组合件') {
+                boxVariantSelect.disabled = false;
+                doorVariantSelect.disabled = false;
+            } else if (category === 'HARDWARE') {
+                boxVariantSelect.disabled = true;
+                doorVariantSelect.disabled = true;
             }
-        },
-        error: function() {
-            showAlert('[[ t("load_product_list_failed") ]]', 'warning');
+            
+            // 如果有回调函数，调用它
             if (callback && typeof callback === 'function') {
-                callback(null);
+                callback(response);
             }
         }
+    }).fail(function() {
+        showAlert('[[ t("load_product_list_failed") ]]', 'warning');
+        if (callback && typeof callback === 'function') {
+            callback(null);
+        }
     });
 }
 
@@ -377,42 +408,37 @@ function loadProductCategoriesUniversal(rowNum, options = {}) {
     
     const prefix = elementPrefix ? `${elementPrefix}-` : '';
     
-    $.ajax({
-        url: '/get_product_categories',
-        type: 'GET',
-        success: function(response) {
-            if (response.success) {
-                const select = document.getElementById(`${prefix}category-${rowNum}`);
-                if (!select) {
-                    console.error('Category select element not found for row:', rowNum);
-                    return;
-                }
-                
-                response.categories.forEach(category => {
-                    const option = document.createElement('option');
-                    option.value = category;
-                    option.textContent = category;
-                    
-                    // 如果设置了保存值模式，设置选中状态
-                    if (savedValues && savedValues.category === category) {
-                        option.selected = true;
-                    }
-                    
-                    select.appendChild(option);
-                });
+    catalogRequestShared('/get_product_categories').done(function(response) {
+        if (response.success) {
+            const select = document.getElementById(`${prefix}category-${rowNum}`);
+            if (!select) {
+                console.error('Category select element not found for row:', rowNum);
+                return;
+            }
+            
+            response.categories.forEach(category => {
+                const option = document.createElement('option');
+                option.value = category;
+                option.textContent = category;
                 
-                // 如果有回调函数，调用它
-                if (callback && typeof callback === 'function') {
-                    callback(response);
+                // 如果设置了保存值模式，设置选中状态
+                if (savedValues && savedValues.category === category) {
+                    option.selected = true;
                 }
-            }
-        },
-        error: function() {
-            showAlert('[[ t("load_product_category_failed") ]]', 'warning');
+                
+                select.appendChild(option);
+            });
+            
+            // 如果有回调函数，调用它
             if (callback && typeof callback === 'function') {
-                callback(null);
+                callback(response);
             }
         }
+    }).fail(function() {
+        showAlert('[[ t("load_product_category_failed") ]]', 'warning');
+        if (callback && typeof callback === 'function') {
+            callback(null);
+        }
     });
 }
 
@@ -428,43 +454,37 @@ function searchSkuAndPriceUniversal(rowNum, elementPrefix = '') {
         return;
     }
     
-    $.ajax({
-        url: '/search_sku_price',
-        type: 'GET',
-        data: {
-            category: category,
-            product: product,
-            box_variant: boxVariant,
-            door_variant: doorVariant
-        },
-        success: function(response) {
-            if (response.success) {
-                const skuElement = document.getElementById(`${prefix}sku-${rowNum}`);
-                const priceElement = document.getElementById(`${prefix}price-${rowNum}`);
-                
-                if (response.found) {
-                    skuElement.textContent = response.sku;
-                    skuElement.className = 'badge bg-success';
-                    priceElement.textContent = `$${response.price.toFixed(2)}`;
-                } else {
-                    skuElement.textContent = window.translations.not_found;
-                    skuElement.className = 'badge bg-danger';
-                    priceElement.textContent = '$0.00';
-                }
-                
-                // 调用更新总计函数（如果存在）
-                if (typeof updateManualTotal === 'function') {
-                    updateManualTotal();
-                } else if (typeof updateTotal === 'function') {
-                    updateTotal();
-                } else if (typeof updateProductTotalShared === 'function') {
-                    updateProductTotalShared(rowNum);
-                }
+    catalogRequestShared('/search_sku_price', {
+        category: category,
+        product: product,
+        box_variant: boxVariant,
+        door_variant: doorVariant
+    }).done(function(response) {
+        if (response.success) {
+            const skuElement = document.getElementById(`${prefix}sku-${rowNum}`);
+            const priceElement = document.getElementById(`${prefix}price-${rowNum}`);
+            
+            if (response.found) {
+                skuElement.textContent = response.sku;
+                skuElement.className = 'badge bg-success';
+                priceElement.textContent = `$${response.price.toFixed(2)}`;
+            } else {
+                skuElement.textContent = window.translations.not_found;
+                skuElement.className = 'badge bg-danger';
+                priceElement.textContent = '$0.00';
+            }
+            
+            // 调用更新总计函数（如果存在）
+            if (typeof updateManualTotal === 'function') {
+                updateManualTotal();
+            } else if (typeof updateTotal === 'function') {
+                updateTotal();
+            } else if (typeof updateProductTotalShared === 'function') {
+                updateProductTotalShared(rowNum);
             }
-        },
-        error: function() {
-            showAlert(window.translations.search_sku_failed, 'warning');
         }
+    }).fail(function() {
+        showAlert(window.translations.search_sku_failed, 'warning');
     });
 }
 
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共设置
+app 使用相对路径读取 data/ 中的价格和映射数据，需要在项目根目录导入。
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture
+def request_context():
+    """解析和翻译函数需要的请求上下文"""
+    with app_module.app.test_request_context():
+        yield
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    with client.session_transaction() as session:
+        session[app_module.ADMIN_SESSION_KEY] = True
+    return client
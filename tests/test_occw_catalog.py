@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""/get_occw_catalog：目录树与 /search_sku_price 的结果一致，目录内容和 ETag 按同一个价格表快照生成"""
+
+import app
+
+
+def test_catalog_tree_matches_search_sku_price(client):
+    response = client.get('/get_occw_catalog')
+    document = response.get_json()
+    assert response.status_code == 200
+    assert document['version'] == response.headers['ETag'].strip('"')
+    assert client.get('/get_occw_catalog', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+    checked = 0
+    for category, products in document['tree'].items():
+        for product, boxes in products.items():
+            for box_variant, doors in boxes.items():
+                for door_variant, (sku, price) in doors.items():
+                    result = client.get('/search_sku_price', query_string={
+                        'category': category, 'product': product, 'box_variant': box_variant,
+                        'door_variant': door_variant}).get_json()
+                    assert (result['sku'], result['price']) == (sku, price)
+                    checked += 1
+    assert checked
+
+
+def test_catalog_uses_price_index_snapshot(monkeypatch):
+    prices = {'PLY-B30-BOX': {'product_name': 'B30', 'category': 'BOX', 'box_variant': 'PLY', 'door_variant': '',
+                              'unit_price': 80}}
+    monkeypatch.setattr(app, 'occw_prices', prices)
+    app.bump_occw_prices_version()
+    try:
+        index = app.get_occw_price_index()
+        # 价格表已替换但版本号还未增加：目录仍按索引的快照生成，不会读到已删除的SKU
+        monkeypatch.setattr(app, 'occw_prices', {})
+        catalog = app.get_occw_catalog()
+        assert catalog.version == index.version
+        assert catalog.options['BOX']
+        assert '"PLY-B30-BOX",80' in catalog.body
+    finally:
+        app.bump_occw_prices_version()
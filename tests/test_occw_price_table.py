@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""/get_occw_price_table 的索引查询结果与逐条过滤价格表的结果一致"""
+
+import io
+import random
+
+import pytest
+
+import app
+
+FIELDS = ('product_name', 'category', 'door_variant', 'box_variant')
+
+
+def brute_force_skus(prices, search_sku='', door_variant='', box_variant='', category='', product_name='',
+                     search=''):
+    """索引化之前的逐条过滤（按SKU排序）"""
+    matched = []
+    for sku, price_data in prices.items():
+        values = {'sku': sku.upper()}
+        for field in FIELDS:
+            values[field] = price_data.get(field, '').upper() if isinstance(price_data, dict) else ''
+        if search_sku and search_sku.upper() not in values['sku']:
+            continue
+        if door_variant and door_variant.upper() != values['door_variant']:
+            continue
+        if box_variant and box_variant.upper() != values['box_variant']:
+            continue
+        if category and category.upper() != values['category']:
+            continue
+        if product_name and product_name.upper() != values['product_name']:
+            continue
+        if search and not any(search.upper() in value for value in values.values()):
+            continue
+        matched.append(sku)
+    return sorted(matched)
+
+
+def random_queries(prices, count, seed=1):
+    rnd = random.Random(seed)
+    skus = list(prices)
+    options = {field: sorted({data.get(field, '') for data in prices.values() if isinstance(data, dict)})
+               for field in FIELDS}
+    for _ in range(count):
+        query = {}
+        for field in ('category', 'door_variant', 'box_variant', 'product_name'):
+            if options[field] and rnd.random() < 0.3:
+                value = rnd.choice(options[field])
+                query[field] = value.lower() if rnd.random() < 0.5 else value
+        if rnd.random() < 0.3:
+            query['search_sku'] = rnd.choice(skus)[:rnd.randint(1, 4)].lower()
+        if rnd.random() < 0.2:
+            query['search'] = rnd.choice(['box', 'door', 'W', 'ply', 'x'])
+        yield query
+
+
+def test_price_table_matches_brute_force(admin_client):
+    assert app.occw_prices
+    for query in random_queries(app.occw_prices, 400):
+        expected = brute_force_skus(app.occw_prices, **query)
+        per_page = random.Random(str(query)).choice([10, 50, 100])
+        page = random.Random(str(query)).randint(1, 3)
+        response = admin_client.get('/get_occw_price_table',
+                                    query_string=dict(query, page=page, per_page=per_page))
+        result = response.get_json()
+        assert response.status_code == 200
+        assert result['total'] == len(expected), query
+        start = (page - 1) * per_page
+        assert [row['sku'] for row in result['data']] == expected[start:start + per_page], query
+
+
+@pytest.fixture
+def prices(monkeypatch):
+    """替换为小价格表（含旧格式行），结束后使版本号失效，索引按原价格表重建"""
+    prices = {
+        'W3030-WSS': {'product_name': 'W3030', 'category': 'Assm.组合件', 'door_variant': 'WSS',
+                      'box_variant': 'PLY', 'unit_price': 100},
+        'PLY-B30-BOX': {'product_name': 'B30', 'category': 'BOX', 'box_variant': 'PLY', 'unit_price': 80},
+        'OLD-SKU': 12.5,
+    }
+    monkeypatch.setattr(app, 'occw_prices', prices)
+    app.bump_occw_prices_version()
+    yield prices
+    app.bump_occw_prices_version()
+
+
+def test_price_index_handles_legacy_rows_and_rebuilds(prices):
+    index = app.get_occw_price_index()
+    assert index.query() == sorted(prices)
+    for query in random_queries(prices, 50):
+        exact = {field: query.get(field, '').upper() for field in FIELDS}
+        assert index.query(exact, query.get('search_sku', '').upper(), query.get('search', '').upper()) == \
+            brute_force_skus(prices, **query), query
+
+    prices['PLY-B36-BOX'] = {'product_name': 'B36', 'category': 'BOX', 'box_variant': 'PLY', 'unit_price': 90}
+    app.bump_occw_prices_version()
+    assert app.get_occw_price_index().query({'category': 'BOX'}) == ['PLY-B30-BOX', 'PLY-B36-BOX']
+
+
+def test_upload_replaces_price_table_in_one_step(admin_client, prices, monkeypatch):
+    """上传价格表时不修改原字典：上传前构建的索引仍与原价格表一致，新索引按新价格表重建"""
+    rows = [{'SKU': 'PLY-B42-BOX', 'product_name': 'B42', 'door_variant': '', 'box_variant': 'PLY',
+             'category': 'BOX', 'unit_price': 120}]
+    monkeypatch.setattr(app.OCCWPriceTransformer, 'transform_excel_file', lambda self, path: (rows, []))
+    monkeypatch.setattr(app, 'save_occw_prices', lambda: app.bump_occw_prices_version() or True)
+    old_prices = prices
+    old_snapshot = dict(prices)
+    old_index = app.get_occw_price_index()
+
+    for mode, expected in (('append', sorted(old_snapshot) + ['PLY-B42-BOX']), ('create', ['PLY-B42-BOX'])):
+        response = admin_client.post('/upload_occw_prices', data={
+            'file': (io.BytesIO(b'PK\x03\x04' + b'\0' * 64), 'prices.xlsx'), 'import_mode': mode},
+            content_type='multipart/form-data')
+        assert response.status_code == 200, response.get_json()
+        assert old_prices == old_snapshot
+        assert all(sku in old_prices for sku in old_index.query())
+        assert app.get_occw_price_index().query() == sorted(expected)
+        assert app.occw_prices is not old_prices
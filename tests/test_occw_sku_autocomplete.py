@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""/get_occw_skus 的自动补全和过滤结果与逐个检查全部SKU的结果一致"""
+
+import random
+
+import pytest
+
+import app
+
+
+def brute_force_search(skus, query):
+    """以查询开头的按大写SKU字典序排在前面，其余按（非分隔符之后匹配、匹配位置、长度、SKU）排序"""
+    upper_query = query.upper()
+    prefix = sorted((sku for sku in skus if sku.upper().startswith(upper_query)), key=lambda sku: (sku.upper(), sku))
+    infix = []
+    for sku in skus:
+        position = sku.upper().find(upper_query)
+        if position > 0:
+            boundary = not sku.upper()[position - 1].isalnum()
+            infix.append((not boundary, position, len(sku), sku))
+    return prefix + [item[3] for item in sorted(infix)]
+
+
+def random_fragments(skus, count, seed=2):
+    rnd = random.Random(seed)
+    for _ in range(count):
+        sku = rnd.choice(skus)
+        start = rnd.randint(0, len(sku) - 1)
+        fragment = sku[start:start + rnd.randint(1, 5)]
+        yield fragment.lower() if rnd.random() < 0.2 else fragment
+
+
+def test_autocomplete_matches_brute_force(client):
+    skus = sorted(app.occw_prices)
+    assert skus
+    for query in random_fragments(skus, 300):
+        expected = brute_force_search(skus, query)
+        full = client.get('/get_occw_skus', query_string={'q': query}).get_json()
+        assert full['skus'] == expected, query
+        assert full['total'] == len(expected)
+
+        # 分页：前几页和最后一页
+        for offset in sorted({0, 7, 14, max(0, len(expected) - 3)}):
+            page = client.get('/get_occw_skus', query_string={'q': query, 'limit': 7, 'offset': offset}).get_json()
+            assert page['skus'] == expected[offset:offset + 7], (query, offset)
+            assert page['has_more'] == (offset + 7 < len(expected))
+
+
+def test_filter_user_code_matches_brute_force(client):
+    skus = sorted(app.occw_prices)
+    for fragment in random_fragments(skus, 100, seed=3):
+        result = client.get('/get_occw_skus', query_string={'filter_user_code': fragment}).get_json()
+        assert result['skus'] == [sku for sku in skus if fragment in sku], fragment
+    assert client.get('/get_occw_skus').get_json()['skus'] == skus
+
+
+@pytest.mark.parametrize('query_string', [{'limit': 'x'}, {'offset': '1.5'}])
+def test_invalid_paging_is_rejected(client, query_string):
+    response = client.get('/get_occw_skus', query_string=query_string)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == app._('limit_offset_must_be_integer')
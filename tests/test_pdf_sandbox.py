@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""PDF沙箱超出限制时返回可翻译的错误和422"""
+
+import os
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import app
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='PDF沙箱依赖 fork')
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = str(tmp_path / 'quotation.pdf')
+    pdf = canvas.Canvas(path)
+    pdf.drawString(72, 720, 'B30 1 Base Cabinet 120.00 1B30')
+    pdf.save()
+    return path
+
+
+def test_sandbox_timeout_is_translated_422(request_context, pdf_path, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'PDF_SANDBOX_TIMEOUT', 0)
+    pages, tokens, error, stages = app.run_pdf_sandboxes({'a': pdf_path})['a']
+    assert pages == []
+    assert isinstance(error, app.PdfSandboxError)
+    assert error.limit == 'timeout'
+    message, status = app.pdf_read_error(error)
+    assert status == 422
+    assert message == f"{app._('read_pdf_failed')}: {app._('pdf_sandbox_timeout').format(seconds='0')}"
+
+
+def test_sandbox_success_and_other_errors(request_context, pdf_path):
+    pages, tokens, error, stages = app.run_pdf_sandboxes({'a': pdf_path})['a']
+    assert error is None
+    assert 'B30' in pages[0]
+    assert app.pdf_read_error('EOF marker not found')[1] == 500
+
+
+def test_sandbox_does_not_wait_for_parent_pool_lock(request_context, pdf_path):
+    """fork 时父进程其他线程持有进程池锁，子进程不能因此死锁"""
+    with app._pdf_process_pool_lock:
+        sandbox = app.PdfSandbox(pdf_path)
+        try:
+            sandbox.process.join(10)
+            assert sandbox.process.exitcode == 0
+        finally:
+            sandbox.stop()
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""局部重新解析（retokenize_quotation_lines）与整份重新解析结果一致，以及 /reparse_quotation_lines 的参数校验"""
+
+import json
+import random
+
+import pytest
+
+import app
+
+HEADER = 'Description Manuf. code # Qty User code'
+SAMPLE_LINES = [
+    'door color 1 BSS', 'Style Shaker door color 1 GSS', 'WF330 FOR', 'BASE9 Filler', '12.00 2WF330 BASE',
+    'B30 77 Base Cabinet 120.00 2B30', 'OPWM_1 Net Total 1,234.00', 'garbage text', '3DB30 5 Drawer 99.00 13DB30',
+    HEADER, 'Print date: 1 2025-01-01 Page 3 /',
+]
+
+# document_id 只能是十六进制字符串
+REPARSE_DOCUMENT_ID = 'a1' * 32
+INVALID_DOCUMENT_ID = 'b2' * 32
+
+
+def make_pages(seed, page_count=6):
+    """合成逐页文本：封面页、产品页（含门板颜色行、在页尾断开的多行产品）和条款页"""
+    rnd = random.Random(seed)
+    pages = ['Quotation\nCustomer: Sample Kitchen\nPrepared by: Sales']
+    seq_num = 1
+    for page_num in range(1, page_count + 1):
+        rows = []
+        if page_num == 1 or rnd.random() < 0.4:
+            color = rnd.choice(['WSS', 'BSS', 'GSS', 'MNW'])
+            rows += [f'Style Shaker door color 1 {color}', f'door color 1 {color}']
+        rows.append(f'Room {page_num} {HEADER}')
+        for _ in range(rnd.randint(3, 8)):
+            code = rnd.choice(['B30', 'W3030', 'SB36', '3DB30', 'TK8'])
+            qty = rnd.randint(1, 4)
+            rows.append(f'{code} {seq_num} Cabinet {qty * 100:.2f} {qty}{code}')
+            seq_num += 1
+        if rnd.random() < 0.3:
+            rows += ['WF330 FOR', f'BASE{seq_num} Filler']
+            seq_num += 1
+            pages.append('\n'.join(rows))
+            rows = ['45.00 2WF330 BASE']
+        rows.append(f'Print date: 1 2025-01-01 Page {page_num} /')
+        pages.append('\n'.join(rows))
+    pages.append('Terms and conditions\nAll sales are final')
+    return pages
+
+
+def normalized(tokens):
+    return json.loads(json.dumps(tokens))
+
+
+def without_page_filter(tokens):
+    return {key: value for key, value in normalized(tokens).items() if key not in ('skipped_pages', 'page_filter', 'line_count')}
+
+
+def test_page_filter_keeps_product_pages_without_header():
+    """续表页不重复表头：续表页上的单行和多行产品都不能丢"""
+    pages = [
+        'Quotation\nCustomer: Sample Kitchen',
+        f'door color 1 WSS\n{HEADER}\nB30 1 Base Cabinet 120.00 1B30',
+        'WF330 FOR\nBASE2 Filler\n45.00 2WF330 BASE\nW3030 3 Wall Cabinet 200.00 2W3030\nPrint date: 1 2025-01-01 Page 3 /',
+        'Drawing\nElevation A',
+        'Terms and conditions\nAll sales are final',
+    ]
+    tokens = app.tokenize_quotation_pages(pages, True)
+    assert tokens['skipped_pages'] == [1, 5]
+    assert [item['source']['page'] for item in tokens['items']] == [2, 3, 3]
+    assert without_page_filter(tokens) == without_page_filter(app.tokenize_quotation_pages(pages, False))
+
+
+def test_page_filter_matches_full_parse():
+    rnd = random.Random(1)
+    for seed in range(40):
+        pages = make_pages(seed)
+        for _ in range(3):
+            pages.insert(rnd.randrange(len(pages) + 1), rnd.choice(['Drawing\nElevation A', '', 'WF330 FOR']))
+        assert without_page_filter(app.tokenize_quotation_pages(pages, True)) == \
+            without_page_filter(app.tokenize_quotation_pages(pages, False))
+
+
+@pytest.mark.parametrize('skip_non_table_pages', [True, False])
+def test_incremental_reparse_matches_full_reparse(request_context, skip_non_table_pages):
+    rnd = random.Random(0)
+    for seed in range(40):
+        pages = make_pages(seed)
+        tokens = app.tokenize_quotation_pages(pages, skip_non_table_pages)
+        for _ in range(4):
+            page_num = rnd.randrange(len(pages)) + 1
+            lines = app.quotation_page_lines(page_num - 1, pages[page_num - 1])
+            if not lines:
+                continue
+            start_line = rnd.randrange(len(lines))
+            end_line = min(len(lines) - 1, start_line + rnd.randrange(3))
+            new_lines = [rnd.choice(SAMPLE_LINES) for _ in range(rnd.randrange(4))]
+            pages, tokens, _reparsed = app.retokenize_quotation_lines(
+                pages, tokens, page_num, start_line, end_line, new_lines)
+            assert normalized(tokens) == normalized(app.tokenize_quotation_pages(pages, skip_non_table_pages))
+
+
+def test_reparse_route_returns_new_document(client, request_context):
+    pages = make_pages(1)
+    app.quotation_pdf_cache.put(REPARSE_DOCUMENT_ID, pages, app.tokenize_quotation_pages(pages))
+    response = client.post('/reparse_quotation_lines', json={
+        'document_id': REPARSE_DOCUMENT_ID, 'page': 2, 'start_line': 3,
+        'lines': ['B30 999 Base Cabinet 100.00 2B30']})
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['document_id'] != REPARSE_DOCUMENT_ID
+    assert any(product['seq_num'] == '999' for product in data['products'])
+
+
+@pytest.mark.parametrize('payload, status, key', [
+    ({}, 400, 'missing_document_id'),
+    ({'document_id': 'c3' * 32}, 404, 'quotation_document_expired'),
+    ({'document_id': '../' + INVALID_DOCUMENT_ID}, 404, 'quotation_document_expired'),
+    ({'document_id': ['x']}, 404, 'quotation_document_expired'),
+    ({'document_id': INVALID_DOCUMENT_ID, 'page': 'a', 'start_line': 0}, 400, 'reparse_position_must_be_integer'),
+    ({'document_id': INVALID_DOCUMENT_ID, 'page': 99, 'start_line': 0}, 400, 'page_out_of_range'),
+    ({'document_id': INVALID_DOCUMENT_ID, 'page': 2, 'start_line': 500}, 400, 'line_out_of_range'),
+    ({'document_id': INVALID_DOCUMENT_ID, 'page': 2, 'start_line': 0, 'lines': 'x'}, 400, 'lines_must_be_string_list'),
+])
+def test_reparse_route_rejects_invalid_requests(client, request_context, payload, status, key):
+    pages = make_pages(2)
+    app.quotation_pdf_cache.put(INVALID_DOCUMENT_ID, pages, app.tokenize_quotation_pages(pages))
+    response = client.post('/reparse_quotation_lines', json=payload)
+    assert response.status_code == status
+    assert response.get_json()['error'].startswith(app._(key).split('{')[0])
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""/search_sku_price：按产品信息直接命中的SKU与价格表字段一致，模糊匹配的候选有上限且排序确定"""
+
+import random
+
+import app
+
+
+def product_fields(price_data):
+    fields = price_data if isinstance(price_data, dict) else {}
+    return tuple(fields.get(field, '').strip() for field in ('category', 'product_name', 'box_variant', 'door_variant'))
+
+
+def search(client, category, product, box_variant='', door_variant=''):
+    response = client.get('/search_sku_price', query_string={
+        'category': category, 'product': product, 'box_variant': box_variant, 'door_variant': door_variant})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_product_match_uses_stored_fields(client):
+    products = sorted({product_fields(data) for data in app.occw_prices.values() if isinstance(data, dict)})
+    assert products
+    for key in random.Random(4).sample(products, min(300, len(products))):
+        result = search(client, *key)
+        assert result['match_type'] == 'product', key
+        assert product_fields(app.occw_prices[result['sku']]) == key
+        assert result['candidates'] == sorted(result['candidates'])
+        assert all(product_fields(app.occw_prices[sku]) == key for sku in result['candidates'])
+        assert len(result['candidates']) <= app.SKU_SEARCH_CANDIDATE_LIMIT
+        preferred = [sku for sku in result['possible_skus'] if sku in result['candidates']]
+        if preferred:
+            assert result['sku'] == preferred[0]
+
+
+def test_fuzzy_match_is_bounded_and_ranked(client):
+    skus = sorted(app.occw_prices)
+    rnd = random.Random(5)
+    checked = 0
+    for _ in range(200):
+        sku = rnd.choice(skus)
+        start = rnd.randint(0, max(0, len(sku) - 3))
+        product = sku[start:start + rnd.randint(2, 4)]
+        # 柜身变体 NONE 不在价格表中，按产品信息不会直接命中
+        result = search(client, 'BOX', product, 'NONE')
+        if result['match_type'] != 'fuzzy':
+            continue
+        checked += 1
+        expected = sorted(
+            (product_fields(app.occw_prices[candidate])[0] != 'BOX',
+             product_fields(app.occw_prices[candidate])[1] != product,
+             True, candidate.find(product), len(candidate), candidate)
+            for candidate in skus if product in candidate)
+        expected = [item[-1] for item in expected[:app.SKU_SEARCH_CANDIDATE_LIMIT]]
+        assert result['candidates'] == expected, product
+        assert result['sku'] == expected[0]
+        assert search(client, 'BOX', product, 'NONE') == result
+    assert checked
+
+
+def test_unknown_product_is_not_found(client):
+    result = search(client, 'BOX', 'NO-SUCH-PRODUCT-XYZ')
+    assert result['found'] is False
+    assert result['sku'] is None
+    assert result['candidates'] == []
+
+
+def test_stale_index_does_not_raise(client, monkeypatch):
+    """价格表已替换、索引还未按新版本重建时，已删除的SKU视为不存在"""
+    prices = {
+        'PLY-B30-BOX': {'product_name': 'B30', 'category': 'BOX', 'box_variant': 'PLY', 'door_variant': '',
+                        'unit_price': 80},
+        'PLY-B30X-BOX': {'product_name': 'B30X', 'category': 'BOX', 'box_variant': 'PLY', 'door_variant': '',
+                         'unit_price': 85},
+    }
+    monkeypatch.setattr(app, 'occw_prices', prices)
+    app.bump_occw_prices_version()
+    try:
+        app.get_occw_price_index()
+        app.get_occw_sku_index()
+        # 不增加版本号，模拟替换价格表和增加版本号之间的请求
+        monkeypatch.setattr(app, 'occw_prices', {'PLY-B30X-BOX': prices['PLY-B30X-BOX']})
+        product = search(client, 'BOX', 'B30', 'PLY')
+        assert product['match_type'] == 'fuzzy'
+        assert product['candidates'] == ['PLY-B30X-BOX']
+        assert search(client, 'BOX', 'B30', 'MISSING')['candidates'] == ['PLY-B30X-BOX']
+        monkeypatch.setattr(app, 'occw_prices', {})
+        assert search(client, 'BOX', 'B30', 'PLY')['found'] is False
+    finally:
+        app.bump_occw_prices_version()
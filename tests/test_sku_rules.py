@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""SKU生成规则：默认规则与原来的 if/elif 实现结果一致，以及规则校验"""
+
+import random
+
+import pytest
+
+import app
+
+
+def legacy_generate_sku(user_code, description, door_color):
+    """规则化之前的 generate_sku"""
+    description_upper = description.upper()
+    door_color = door_color or 'N/A'
+    processed_user_code = user_code.replace('-L', '').replace('-R', '')
+    if 'CABINET' in description_upper or 'BOX' in description_upper:
+        return f"PLY-{processed_user_code}-BOX"
+    elif 'DOOR' in description_upper:
+        return f"{door_color}-{processed_user_code}-DOOR"
+    elif 'HARDWARE' in description_upper or 'HW' in description_upper:
+        return f"HW-{user_code}"
+    elif 'MOLDING' in description_upper:
+        return f"{door_color}-{user_code}"
+    elif 'TOE KICK' in description_upper:
+        return f"{door_color}-{user_code}"
+    elif 'FILLER' in description_upper:
+        return f"{door_color}-{user_code}"
+    elif 'ENDING PANEL' in description_upper or 'END PANEL' in description_upper:
+        return f"{door_color}-{user_code}"
+    elif 'ASSM' in description_upper or 'ASSEMBLY' in description_upper:
+        return f"{processed_user_code}-PLY-{door_color}"
+    else:
+        return "找不到产品"
+
+
+def test_default_rules_match_legacy_generate_sku():
+    rule_set = app.SkuRuleSet(app.DEFAULT_PDF_SKU_RULES)
+    rnd = random.Random(1)
+    words = ['Cabinet', 'box', 'Door', 'hardware', 'hw', 'Molding', 'toe kick', 'Toe  Kick', 'filler',
+             'ending panel', 'end panel', 'Assm.', 'assembly', 'Base', 'Wall', 'x', '*', ' ', 'é']
+    codes = ['B30', 'B30-L', 'W3030-R', '3DB30', 'HW-PULL', 'B-LR-R']
+    for _ in range(20000):
+        description = ''.join(rnd.choice(words) + rnd.choice(['', ' ']) for _ in range(rnd.randrange(5)))
+        user_code = rnd.choice(codes)
+        door_color = rnd.choice([None, 'WSS', 'BSS'])
+        assert rule_set.generate(user_code, description, door_color) == \
+            legacy_generate_sku(user_code, description, door_color), (user_code, description, door_color)
+
+
+def test_data_rules_match_default_rules():
+    """data/sku_rules.json 中的规则与内置默认规则顺序一致"""
+    assert [rule.id for rule in app.sku_rule_set.rules] == [rule['id'] for rule in app.DEFAULT_PDF_SKU_RULES]
+
+
+def test_disabled_rule_is_skipped():
+    rules = [
+        {'id': 'door_rule', 'keywords': ['DOOR'], 'format': '{door_color}-{processed_user_code}-DOOR',
+         'enabled': False},
+        {'id': 'default_rule', 'pattern': '*', 'format': '{user_code}'},
+    ]
+    rule_set = app.SkuRuleSet(rules)
+    assert rule_set.generate('B30-L', 'Door', 'WSS') == 'B30-L'
+    assert [rule.id for rule in rule_set.rules] == ['default_rule']
+
+
+@pytest.mark.parametrize('rule, key', [
+    ({'id': 'r', 'keywords': 'DOOR', 'format': '{user_code}'}, 'sku_rule_keywords_invalid'),
+    ({'id': 'r', 'keywords': ['DOOR', 1], 'format': '{user_code}'}, 'sku_rule_keywords_invalid'),
+    ({'id': 'r', 'pattern': ['DOOR'], 'format': '{user_code}'}, 'sku_rule_pattern_invalid'),
+    ({'id': 'r', 'keywords': ['DOOR']}, 'sku_rule_missing_format'),
+    ({'id': 'r', 'keywords': ['DOOR'], 'format': '{color}'}, 'sku_rule_unknown_field'),
+])
+def test_invalid_rules_are_rejected(request_context, rule, key):
+    with pytest.raises(app.SkuRuleError) as error:
+        app.SkuRuleSet([rule])
+    assert error.value.key == key
+    assert error.value.translated() == app._(key).format(**error.value.params)
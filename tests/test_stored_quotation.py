@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""按 document_id 读取报价单：只接受十六进制 id，磁盘缓存中格式不对的条目视为不存在"""
+
+import json
+
+import pytest
+
+import app
+
+DOCUMENT_ID = 'ab' * 32
+
+
+@pytest.fixture
+def disk_cache(tmp_path, monkeypatch):
+    """使用临时磁盘目录的解析缓存，缓存目录外放一个可以被路径穿越读到的 JSON 文件"""
+    cache_dir = tmp_path / 'cache'
+    cache = app.QuotationPdfCache(disk_dir=str(cache_dir))
+    monkeypatch.setattr(app, 'quotation_pdf_cache', cache)
+    (tmp_path / 'outside.json').write_text(json.dumps({'pages': ['secret'], 'tokens': {}}), encoding='utf-8')
+    return cache_dir
+
+
+@pytest.mark.parametrize('document_id', ['../outside', '..%2Foutside', 'AB' * 32, 'ab' * 10, 'ab' * 33])
+def test_get_pdf_text_rejects_invalid_document_id(client, disk_cache, document_id):
+    response = client.get('/get_pdf_text', query_string={'document_id': document_id})
+    assert response.status_code == 404
+    assert response.get_json()['error'] == app._('file_not_exists')
+
+
+@pytest.mark.parametrize('entry', [{'tokens': {}}, {'pages': 'text', 'tokens': {}}, {'pages': [1], 'tokens': {}},
+                                   {'pages': ['text']}, ['text']])
+def test_malformed_cache_entry_is_not_found(client, disk_cache, entry):
+    (disk_cache / f'{DOCUMENT_ID}.json').write_text(json.dumps(entry), encoding='utf-8')
+    response = client.get('/get_pdf_text', query_string={'document_id': DOCUMENT_ID})
+    assert response.status_code == 404
+
+
+def test_cached_document_is_read_from_disk(client, disk_cache):
+    pages = ['Quotation', 'B30 1 Base Cabinet 120.00 1B30']
+    (disk_cache / f'{DOCUMENT_ID}.json').write_text(json.dumps({'pages': pages, 'tokens': {}}), encoding='utf-8')
+    result = client.get('/get_pdf_text', query_string={'document_id': DOCUMENT_ID, 'page': 2}).get_json()
+    assert result['text'] == app.PdfExtraction(pages[1:]).raw_text
+    assert result['page_count'] == 2
+
+
+@pytest.mark.parametrize('document_id', ['../outside', 'ab' * 10])
+def test_export_rejects_invalid_document_id(client, disk_cache, document_id):
+    response = client.post('/export/occw_excel_from_pdf', data={'document_id': document_id})
+    assert response.status_code == 404
+    assert response.get_json()['error'] == app._('file_not_exists')
+
+
+def test_export_applies_sku_overrides_by_product_index(client, disk_cache, monkeypatch):
+    """不同分组的序号重复时，SKU修改只作用于对应下标的产品"""
+    pages = ['Description Manuf. code # Qty User code\nB30 1 Base Cabinet 120.00 1B30\nW3030 2 Wall Cabinet 80.00 1W3030',
+             'Description Manuf. code # Qty User code\nB30 1 Base Cabinet 120.00 1B30']
+    (disk_cache / f'{DOCUMENT_ID}.json').write_text(json.dumps({'pages': pages, 'tokens': {}}), encoding='utf-8')
+    exported = []
+    build_occw_workbook = app.build_occw_workbook
+    
+    def capture_rows(rows, *args):
+        exported.extend(rows)
+        return build_occw_workbook(rows, *args)
+    
+    monkeypatch.setattr(app, 'build_occw_workbook', capture_rows)
+    response = client.post('/export/occw_excel_from_pdf', data={
+        'document_id': DOCUMENT_ID, 'sku_overrides': json.dumps({'1': 'BSS-B30'})})
+    assert response.status_code == 200
+    # 产品按序号排序：两个序号为1的 B30 在前
+    assert [sku for sku, qty in exported] == ['PLY-B30-BOX', 'BSS-B30', 'PLY-W3030-BOX']
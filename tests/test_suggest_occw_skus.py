@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""相似SKU推荐：位并行编辑距离与动态规划结果一致，单个拼写错误的召回率，以及 /suggest_occw_skus 的参数校验"""
+
+import random
+
+import pytest
+
+import app
+
+ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-'
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def with_typo(rnd, sku):
+    """替换、删除或插入一个字符"""
+    chars = list(sku)
+    position = rnd.randrange(len(chars))
+    operation = rnd.randrange(3)
+    if operation == 0:
+        chars[position] = rnd.choice(ALPHABET)
+    elif operation == 1:
+        del chars[position]
+    else:
+        chars.insert(position, rnd.choice(ALPHABET))
+    return ''.join(chars)
+
+
+def test_edit_distance_matcher_matches_dynamic_programming():
+    rnd = random.Random(1)
+    for _ in range(5000):
+        # 小字母表使距离分布更广，长度超过64时检查多字位的情况
+        a = ''.join(rnd.choice(ALPHABET[:6]) for _ in range(rnd.randint(0, 80)))
+        b = ''.join(rnd.choice(ALPHABET[:6]) for _ in range(rnd.randint(0, 80)))
+        assert app.edit_distance_matcher(a)(b) == levenshtein(a, b), (a, b)
+
+
+def test_single_typo_recall():
+    skus = sorted(app.occw_prices)
+    index = app.get_occw_sku_similarity_index()
+    rnd = random.Random(6)
+    sample = rnd.sample(skus, min(500, len(skus)))
+    found = 0
+    for sku in sample:
+        query = with_typo(rnd, sku)
+        candidates = index.similar(query, 5)
+        assert candidates and candidates[0]['distance'] <= 1, query
+        assert [candidate['distance'] for candidate in candidates] == \
+            [levenshtein(query.upper(), candidate['sku'].upper()) for candidate in candidates]
+        found += sku in [candidate['sku'] for candidate in candidates]
+    assert found / len(sample) >= 0.98
+
+
+def test_suggest_route_batches_candidates_and_related(client):
+    sku = sorted(app.occw_prices)[0]
+    response = client.post('/suggest_occw_skus', json={
+        'items': [sku[:-1], {'sku': '找不到产品', 'user_code': sku}, {'sku': None, 'user_code': ''}],
+        'limit': 3, 'related_limit': 10})
+    results = response.get_json()['results']
+    assert response.status_code == 200
+    assert [result['query'] for result in results] == [sku[:-1], sku, '']
+    assert results[1]['candidates'][0] == {'sku': sku, 'distance': 0, 'score': results[1]['candidates'][0]['score']}
+    assert results[2]['candidates'] == []
+    # related 与下拉框原来逐行请求的 /get_occw_skus 结果一致
+    for result, user_code in zip(results, ['', sku, '']):
+        expected = client.get('/get_occw_skus', query_string={'q': user_code, 'limit': 10}).get_json()['skus']
+        assert result['related'] == expected
+
+
+@pytest.mark.parametrize('payload, key', [
+    ({'items': 'B30'}, 'suggest_items_invalid'),
+    ({'items': [None]}, 'suggest_items_invalid'),
+    ({'items': [123]}, 'suggest_items_invalid'),
+    ({'items': [{'sku': 123}]}, 'suggest_items_invalid'),
+    ({'items': ['B30'] * (app.SKU_SUGGESTION_MAX_QUERIES + 1)}, 'too_many_sku_queries'),
+    ({'items': ['B30'], 'limit': 'x'}, 'limit_must_be_integer'),
+    ({'items': ['B30'], 'related_limit': 'x'}, 'limit_must_be_integer'),
+])
+def test_suggest_route_rejects_invalid_requests(client, payload, key):
+    response = client.post('/suggest_occw_skus', json=payload)
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith(app._(key).split('{')[0])
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""/upload_quotation_stream 与 /upload_quotation 解析结果一致，缓存的解析结果版本过旧时重新解析"""
+
+import io
+import json
+
+import pytest
+from reportlab.pdfgen import canvas
+
+import app
+
+HEADER = 'Description Manuf. code # Qty User code'
+PAGES = [
+    ['Quotation', 'Customer: Sample Kitchen'],
+    ['Style Shaker door color 1 WSS', 'door color 1 WSS', HEADER, 'B30 1 Base Cabinet 120.00 1B30'],
+    ['WF330 FOR', 'BASE2 Filler', '45.00 2WF330 BASE', 'W3030 3 Wall Cabinet 200.00 2W3030'],
+    ['Terms and conditions', 'All sales are final'],
+]
+
+
+@pytest.fixture
+def pdf_bytes():
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for lines in PAGES:
+        for index, line in enumerate(lines):
+            pdf.drawString(72, 720 - index * 20, line)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def isolated_storage(tmp_path, monkeypatch):
+    """上传文件和解析缓存都放在临时目录，不使用沙箱"""
+    monkeypatch.setattr(app, 'quotation_pdf_cache', app.QuotationPdfCache())
+    store = app.UploadStore(str(tmp_path / 'store'), ttl_seconds=3600, quota_bytes=100 * 1024 * 1024)
+    monkeypatch.setattr(app, 'upload_store', store)
+    monkeypatch.setitem(app.app.config, 'PDF_SANDBOX_ENABLED', False)
+
+
+def upload_stream(client, pdf_bytes):
+    response = client.post('/upload_quotation_stream', data={'file': (io.BytesIO(pdf_bytes), 'quotation.pdf')})
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    products = [product for event in events if event['event'] == 'page' for product in event['products']]
+    return events, products
+
+
+def test_stream_matches_upload(client, pdf_bytes, isolated_storage):
+    events, products = upload_stream(client, pdf_bytes)
+    assert events[0]['cached'] is False
+    result = client.post('/upload_quotation', data={'file': (io.BytesIO(pdf_bytes), 'quotation.pdf')}).get_json()
+    assert result['cached'] is True
+    assert products == result['products']
+    assert events[-1]['skipped_pages'] == result['skipped_pages'] == [1]
+    assert [product['seq_num'] for product in products] == ['1', '2', '3']
+    
+    # 缓存命中时逐页返回的事件与逐页解析时相同
+    cached_events, cached_products = upload_stream(client, pdf_bytes)
+    assert cached_events[0]['cached'] is True
+    assert cached_events[1:] == events[1:]
+
+
+def test_stream_reparses_stale_cached_tokens(client, pdf_bytes, isolated_storage):
+    upload_stream(client, pdf_bytes)
+    cache_key = app.quotation_cache_key(app.hashlib.sha256(pdf_bytes).hexdigest())
+    entry = app.quotation_pdf_cache.get(cache_key)
+    stale_tokens = dict(entry['tokens'], version=app.QUOTATION_TOKEN_VERSION - 1, items=[])
+    app.quotation_pdf_cache.put(cache_key, entry['pages'], stale_tokens)
+    
+    events, products = upload_stream(client, pdf_bytes)
+    assert events[0]['cached'] is True
+    assert [product['seq_num'] for product in products] == ['1', '2', '3']
+    assert app.quotation_pdf_cache.get(cache_key)['tokens']['version'] == app.QUOTATION_TOKEN_VERSION
@@ -75,6 +75,7 @@ TRANSLATIONS = {
         'basic_search': '基础搜索',
         'batch_import': '批量导入',
         'batch_management': '批量管理',
+        'batch_too_many_files': '一次最多上传 {count} 个文件',
         'box_variant': '柜身变体',
         'box_variant_col': '柜身变体',
         'box_variant_pattern': '柜身变体模式',
@@ -365,6 +366,7 @@ TRANSLATIONS = {
         'internal_reference_number': '内部参考号',
         'interval_conversion_rate': '区间转化率',
         'invalid_credentials': '用户名或密码错误',
+        'invalid_file_format': '文件格式不支持，请选择Excel文件(.xlsx或.xls)',
         'items_per_page': '每页显示',
         'json_editor': 'JSON编辑器',
         'json_editor_desc': '直接编辑JSON配置文件',
@@ -377,6 +379,10 @@ TRANSLATIONS = {
         'language_switch_function': '语言切换功能',
         'large_file_processing_patience': '大文件处理时请耐心等待，避免重复操作',
         'last_updated': '最后更新',
+        'limit_must_be_integer': 'limit 必须是整数',
+        'limit_offset_must_be_integer': 'limit、offset 必须是整数',
+        'line_out_of_range': '行号超出范围: 0-{max_line}',
+        'lines_must_be_string_list': 'lines 必须是字符串列表',
         'load_all_quotations_failed': '加载所有报价单失败',
         'load_current_settings': '加载当前设置',
         'load_failed_retry': '加载失败，请重试',
@@ -431,6 +437,7 @@ TRANSLATIONS = {
         'min_import_amount_desc': '只导入总计金额大于等于此值的数据（美元）',
         'min_import_amount_threshold': '最小导入金额阈值',
         'missing_category_param': '缺少category参数',
+        'missing_document_id': '缺少 document_id',
         'missing_original_sku': '缺少原始SKU参数',
         'missing_required_params': '缺少必要参数',
         'missing_sku_param': '缺少SKU参数',
@@ -520,6 +527,8 @@ TRANSLATIONS = {
         'other': '其他',
         'other_category': '其他',
         'other_hardware': '其他（归为HARDWARE）',
+        'page_must_be_integer': '页码必须是整数',
+        'page_out_of_range': '页码超出范围: 1-{max_page}',
         'parse_content': '解析内容',
         'parse_error_details': '解析错误详情',
         'parse_failed': '解析失败',
@@ -539,6 +548,9 @@ TRANSLATIONS = {
         'pdf_parsing_issues': 'PDF解析问题',
         'pdf_parsing_rules': 'PDF解析规则',
         'pdf_parsing_rules_desc': 'PDF解析时的SKU生成规则',
+        'pdf_sandbox_crash': 'PDF解析进程异常退出（退出码 {exitcode}）',
+        'pdf_sandbox_memory': 'PDF解析内存超出限制（{memory_mb} MB）',
+        'pdf_sandbox_timeout': 'PDF解析超时（超过 {seconds} 秒）',
         'pdf_text': 'PDF文本',
         'pdf_upload_parse_error_question': 'Q: PDF上传后无法解析或解析错误？',
         'people': '人',
@@ -606,6 +618,7 @@ TRANSLATIONS = {
         'quotation_deleted_success': '报价单删除成功',
         'quotation_detail': '报价单详情',
         'quotation_detail_subtitle': '查看报价单的详细信息',
+        'quotation_document_expired': '报价单不存在或已过期，请重新上传',
         'quotation_id': '报价单编号',
         'quotation_info': '报价单信息',
         'quotation_loaded_success': '报价单加载成功',
@@ -644,6 +657,7 @@ TRANSLATIONS = {
         'rendering_customer_type_trend_charts': '渲染客户类型趋势图表',
         'rendering_retail_wholesale_amount': '渲染零售vs批发金额对比图',
         'rendering_retail_wholesale_count': '渲染零售vs批发数量对比图',
+        'reparse_position_must_be_integer': 'page、start_line、end_line 必须是整数',
         'required_columns': '必需的5个列（按顺序）',
         'reset_default': '恢复默认',
         'reset_default_success': '已恢复默认配置',
@@ -754,11 +768,19 @@ TRANSLATIONS = {
 
         'sku_mappings_title': 'SKU映射管理',
         'sku_no_match_question': 'Q: SKU无法找到匹配项？',
+        'sku_overrides_invalid': 'sku_overrides 格式错误',
         'sku_rule_config': 'SKU生成规则配置',
+        'sku_rule_invalid': '规则无效: {error}',
+        'sku_rule_keywords_invalid': '规则 {rule_id} 的 keywords 必须是字符串列表',
+        'sku_rule_missing_format': '规则 {rule_id} 缺少 format',
+        'sku_rule_pattern_invalid': '规则 {rule_id} 的 pattern 必须是字符串',
+        'sku_rule_reload_failed': '规则无效，继续使用当前规则: {error}',
+        'sku_rule_unknown_field': '规则 {rule_id} 的 format 包含未知字段: {field}',
         'sku_rules_config': 'SKU规则配置',
         'sku_rules_customizable': 'SKU生成规则可以在\"配置\"页面进行自定义修改',
         'sku_rules_desc': '管理PDF解析、OCCW导入和手动创建的SKU生成规则',
         'sku_rules_management': 'SKU规则配置管理',
+        'sku_rules_must_be_list': 'rules 必须是规则对象列表',
         'sku_rules_save_success': 'SKU规则保存成功',
         'sku_search_assistant': 'SKU搜索助手',
         'smart_distinguish_codes': '智能区分以数字开头和字母开头的产品代码',
@@ -776,6 +798,7 @@ TRANSLATIONS = {
         'status_filter': '状态过滤',
         'status_filter_help': '选择要导入的订单状态类型',
         'success': '成功',
+        'suggest_items_invalid': 'items 必须是列表，每一项为SKU字符串或包含 sku、user_code 字符串的对象',
         'summary': '摘要',
         'support_batch_delete_and_modify': '支持批量删除和修改操作',
         'support_chinese_filename': '支持中文文件名',
@@ -801,6 +824,7 @@ TRANSLATIONS = {
         'toast_container': 'Toast 提示容器',
         'toast_system': 'Toast 提示系统',
         'today': '今天',
+        'too_many_sku_queries': '一次最多查询 {count} 个SKU',
         'tooltip_styles': '工具提示样式',
         'total': '总计',
         'total_2020': '2020合计',
@@ -827,10 +851,12 @@ TRANSLATIONS = {
         'updated_at': '更新时间',
         'upload': '上传',
         'upload_button': '上传价格表',
+        'upload_content_mismatch': '文件内容与扩展名不符: {filename}',
         'upload_excel_csv': '请上传Excel或CSV文件',
         'upload_failed': '文件上传失败',
         'upload_failed_retry': '上传失败，请重试',
         'upload_file_to_see_stats': '上传文件查看统计',
+        'upload_file_too_large': '文件过大: {filename}，单个文件最大 {max_mb} MB',
         'upload_occw_price_table': '上传OCCW价格表',
         'upload_occw_prices': '上传OCCW价格表',
         'upload_odoo_sales_data': '上传Odoo导出的销售数据',
@@ -840,6 +866,7 @@ TRANSLATIONS = {
         'upload_pdf_quote': '上传2020软件报价单PDF',
         'upload_pdf_title': '上传2020软件报价单PDF',
         'upload_prices_failed': '上传价格表失败',
+        'upload_request_too_large': '上传内容过大，最大 {max_mb} MB',
         'upload_sales_data_button': '上传销售数据',
         'upload_success': '文件上传成功',
         'use_show_raw_text': '3. 使用\"显示原始PDF文本\"按钮查看解析内容',
@@ -946,6 +973,7 @@ TRANSLATIONS = {
         'basic_search': 'Basic Search',
         'batch_import': 'Batch Import',
         'batch_management': 'Batch Management',
+        'batch_too_many_files': 'At most {count} files can be uploaded at once',
         'box_variant': 'Box Variant',
         'box_variant_col': 'Box Variant',
         'box_variant_pattern': 'Box Variant Pattern',
@@ -1233,6 +1261,7 @@ TRANSLATIONS = {
         'internal_reference_number': 'Internal reference number',
         'interval_conversion_rate': 'Interval conversion rate',
         'invalid_credentials': 'Invalid username or password',
+        'invalid_file_format': 'Unsupported file format, please select an Excel file (.xlsx or .xls)',
         'items_per_page': 'Items per page',
         'json_editor': 'JSON editor',
         'json_editor_desc': 'Directly edit JSON configuration file',
@@ -1245,6 +1274,10 @@ TRANSLATIONS = {
         'language_switch_function': 'Language switch function',
         'large_file_processing_patience': 'Please be patient when processing large files to avoid repeated actions',
         'last_updated': 'Last updated',
+        'limit_must_be_integer': 'limit must be an integer',
+        'limit_offset_must_be_integer': 'limit and offset must be integers',
+        'line_out_of_range': 'Line number out of range: 0-{max_line}',
+        'lines_must_be_string_list': 'lines must be a list of strings',
         'load_all_quotations_failed': 'Failed to load all quotations',
         'load_current_settings': 'Load current settings',
         'load_failed_retry': 'Load failed, please try again',
@@ -1299,6 +1332,7 @@ TRANSLATIONS = {
         'min_import_amount_desc': 'Only import data with total amount greater than or equal to this value (USD)',
         'min_import_amount_threshold': 'Minimum import amount threshold',
         'missing_category_param': 'Missing category parameter',
+        'missing_document_id': 'Missing document_id',
         'missing_original_sku': 'Missing original SKU parameter',
         'missing_required_params': 'Missing required parameters',
         'missing_sku_param': 'Missing SKU parameter',
@@ -1385,6 +1419,8 @@ TRANSLATIONS = {
         'other': 'Other',
         'other_category': 'Other',
         'other_hardware': 'Other (classified as HARDWARE)',
+        'page_must_be_integer': 'Page numbers must be integers',
+        'page_out_of_range': 'Page out of range: 1-{max_page}',
         'parse_content': 'Parse Content',
         'parse_error_details': 'Parse Error Details',
         'parse_failed': 'Parse Failed',
@@ -1404,6 +1440,9 @@ TRANSLATIONS = {
         'pdf_parsing_issues': 'PDF Parsing Issues',
         'pdf_parsing_rules': 'PDF Parsing Rules',
         'pdf_parsing_rules_desc': 'SKU generation rules during PDF parsing',
+        'pdf_sandbox_crash': 'The PDF parsing process exited abnormally (exit code {exitcode})',
+        'pdf_sandbox_memory': 'PDF parsing exceeded the memory limit ({memory_mb} MB)',
+        'pdf_sandbox_timeout': 'PDF parsing timed out (more than {seconds} seconds)',
         'pdf_text': 'PDF Text',
         'pdf_upload_parse_error_question': 'Q: Cannot parse or parse error after PDF upload?',
         'people': 'People',
@@ -1471,6 +1510,7 @@ TRANSLATIONS = {
         'quotation_deleted_success': 'Quotation deleted successfully',
         'quotation_detail': 'Quotation Details',
         'quotation_detail_subtitle': 'View detailed information of the quotation',
+        'quotation_document_expired': 'Quotation not found or expired, please upload it again',
         'quotation_id': 'Quotation ID',
         'quotation_info': 'Quotation Information',
         'quotation_loaded_success': 'Quotation loaded successfully',
@@ -1506,6 +1546,7 @@ TRANSLATIONS = {
         'rendering_customer_type_trend_charts': 'Rendering customer type trend charts',
         'rendering_retail_wholesale_amount': 'Rendering retail vs wholesale amount comparison chart',
         'rendering_retail_wholesale_count': 'Rendering retail vs wholesale count comparison chart',
+        'reparse_position_must_be_integer': 'page, start_line and end_line must be integers',
         'required_columns': 'Required 5 columns (in order)',
         'reset_default': 'Reset to default',
         'reset_default_success': 'Default configuration restored',
@@ -1614,11 +1655,19 @@ TRANSLATIONS = {
 
         'sku_mappings_title': 'SKU Mapping Management',
         'sku_no_match_question': 'Q: SKU not found a match?',
+        'sku_overrides_invalid': 'Invalid sku_overrides format',
         'sku_rule_config': 'SKU Generation Rule Configuration',
+        'sku_rule_invalid': 'Invalid rules: {error}',
+        'sku_rule_keywords_invalid': 'keywords of rule {rule_id} must be a list of strings',
+        'sku_rule_missing_format': 'Rule {rule_id} has no format',
+        'sku_rule_pattern_invalid': 'pattern of rule {rule_id} must be a string',
+        'sku_rule_reload_failed': 'Invalid rules, keeping the current rules: {error}',
+        'sku_rule_unknown_field': 'The format of rule {rule_id} contains an unknown field: {field}',
         'sku_rules_config': 'SKU Rules Configuration',
         'sku_rules_customizable': 'SKU generation rules can be customized on the "Configuration" page',
         'sku_rules_desc': 'Manage SKU generation rules for PDF parsing, OCCW import, and manual creation',
         'sku_rules_management': 'SKU Rules Configuration Management',
+        'sku_rules_must_be_list': 'rules must be a list of rule objects',
         'sku_rules_save_success': 'SKU rules saved successfully',
         'sku_search_assistant': 'SKU Search Assistant',
         'smart_distinguish_codes': 'Intelligently distinguish product codes starting with numbers or letters',
@@ -1636,6 +1685,7 @@ TRANSLATIONS = {
         'status_filter': 'Status Filter',
         'status_filter_help': 'Select order status types to import',
         'success': 'Success',
+        'suggest_items_invalid': 'items must be a list of SKU strings or objects with sku and user_code strings',
         'summary': 'Summary',
         'support_batch_delete_and_modify': 'Support batch delete and modify operations',
         'support_chinese_filename': 'Support Chinese filenames',
@@ -1661,6 +1711,7 @@ TRANSLATIONS = {
         'toast_container': 'Toast Notification Container',
         'toast_system': 'Toast Notification System',
         'today': 'Today',
+        'too_many_sku_queries': 'At most {count} SKUs can be queried at once',
         'tooltip_styles': 'Tooltip Styles',
         'total': 'Total',
         'total_2020': '2020 Total',
@@ -1687,10 +1738,12 @@ TRANSLATIONS = {
         'updated_at': 'Updated At',
         'upload': 'Upload',
         'upload_button': 'Upload Price Table',
+        'upload_content_mismatch': 'File content does not match its extension: {filename}',
         'upload_excel_csv': 'Please upload Excel or CSV file',
         'upload_failed': 'File upload failed',
         'upload_failed_retry': 'Upload failed, please try again',
         'upload_file_to_see_stats': 'Upload file to view statistics',
+        'upload_file_too_large': 'File too large: {filename}, the maximum per file is {max_mb} MB',
         'upload_occw_price_table': 'Upload OCCW Price Table',
         'upload_occw_prices': 'Upload OCCW Price Table',
         'upload_odoo_sales_data': 'Upload Odoo-exported sales data',
@@ -1700,6 +1753,7 @@ TRANSLATIONS = {
         'upload_pdf_quote': 'Upload 2020 Software Quotation PDF',
         'upload_pdf_title': 'Upload 2020 Software Quotation PDF',
         'upload_prices_failed': 'Upload price table failed',
+        'upload_request_too_large': 'Upload too large, the maximum is {max_mb} MB',
         'upload_sales_data_button': 'Upload Sales Data',
         'upload_success': 'File uploaded successfully',
         'use_show_raw_text': '3. Use "Show Original PDF Text" button to view parsed content',
@@ -1806,6 +1860,7 @@ TRANSLATIONS = {
         'basic_search': 'Recherche basique',
         'batch_import': 'Importation en lot',
         'batch_management': 'Gestion des lots',
+        'batch_too_many_files': 'Au plus {count} fichiers peuvent être téléversés à la fois',
         'box_variant': 'Variante de caisson',
         'box_variant_col': 'Variante de caisson',
         'box_variant_pattern': 'Modèle de variante de caisson',
@@ -2095,6 +2150,7 @@ TRANSLATIONS = {
         'internal_reference_number': 'Numéro de référence interne',
         'interval_conversion_rate': 'Taux de conversion par intervalle',
         'invalid_credentials': 'Nom d\'utilisateur ou mot de passe incorrect',
+        'invalid_file_format': 'Format de fichier non pris en charge, veuillez choisir un fichier Excel (.xlsx ou .xls)',
         'items_per_page': 'Éléments par page',
         'json_editor': 'Éditeur JSON',
         'json_editor_desc': 'Modifier directement le fichier de configuration JSON',
@@ -2107,6 +2163,10 @@ TRANSLATIONS = {
         'language_switch_function': 'Fonction de changement de langue',
         'large_file_processing_patience': 'Veuillez patienter lors du traitement de gros fichiers, évitez les actions répétées',
         'last_updated': 'Dernière mise à jour',
+        'limit_must_be_integer': 'limit doit être un entier',
+        'limit_offset_must_be_integer': 'limit et offset doivent être des entiers',
+        'line_out_of_range': 'Numéro de ligne hors limites : 0-{max_line}',
+        'lines_must_be_string_list': 'lines doit être une liste de chaînes',
         'load_all_quotations_failed': 'Échec du chargement de tous les devis',
         'load_current_settings': 'Charger les paramètres actuels',
         'load_failed_retry': 'Échec du chargement, veuillez réessayer',
@@ -2161,6 +2221,7 @@ TRANSLATIONS = {
         'min_import_amount_desc': 'Importer uniquement les données avec un montant total supérieur ou égal à cette valeur (en dollars)',
         'min_import_amount_threshold': 'Seuil minimum d\'importation',
         'missing_category_param': 'Paramètre category manquant',
+        'missing_document_id': 'document_id manquant',
         'missing_original_sku': 'Paramètre SKU original manquant',
         'missing_required_params': 'Paramètres requis manquants',
         'missing_sku_param': 'Paramètre SKU manquant',
@@ -2248,6 +2309,8 @@ TRANSLATIONS = {
         'other': 'Autre',
         'other_category': 'Autre',
         'other_hardware': 'Autre (classé dans HARDWARE)',
+        'page_must_be_integer': 'Les numéros de page doivent être des entiers',
+        'page_out_of_range': 'Page hors limites : 1-{max_page}',
         'parse_content': 'Analyser le contenu',
         'parse_error_details': 'Détails des erreurs d\'analyse',
         'parse_failed': 'Analyse échouée',
@@ -2267,6 +2330,9 @@ TRANSLATIONS = {
         'pdf_parsing_issues': 'Problèmes d\'analyse PDF',
         'pdf_parsing_rules': 'Règles d\'analyse PDF',
         'pdf_parsing_rules_desc': 'Règles de génération SKU lors de l\'analyse PDF',
+        'pdf_sandbox_crash': 'Le processus d\'analyse du PDF s\'est arrêté anormalement (code de sortie {exitcode})',
+        'pdf_sandbox_memory': 'L\'analyse du PDF a dépassé la limite de mémoire ({memory_mb} Mo)',
+        'pdf_sandbox_timeout': 'Délai d\'analyse du PDF dépassé (plus de {seconds} secondes)',
         'pdf_text': 'Texte PDF',
         'pdf_upload_parse_error_question': 'Q : Impossible d\'analyser ou erreur d\'analyse après téléchargement du PDF ?',
         'people': 'Personnes',
@@ -2334,6 +2400,7 @@ TRANSLATIONS = {
         'quotation_deleted_success': 'Suppression du devis réussie',
         'quotation_detail': 'Détails du devis',
         'quotation_detail_subtitle': 'Voir les détails du devis',
+        'quotation_document_expired': 'Devis introuvable ou expiré, veuillez le téléverser à nouveau',
         'quotation_id': 'Numéro de devis',
         'quotation_info': 'Informations sur le devis',
         'quotation_loaded_success': 'Chargement du devis réussi',
@@ -2370,6 +2437,7 @@ TRANSLATIONS = {
         'rendering_customer_type_trend_charts': 'Affichage des graphiques de tendance par type de client',
         'rendering_retail_wholesale_amount': 'Affichage du graphique comparatif des montants détail vs gros',
         'rendering_retail_wholesale_count': 'Affichage du graphique comparatif des quantités détail vs gros',
+        'reparse_position_must_be_integer': 'page, start_line et end_line doivent être des entiers',
         'required_columns': '5 colonnes requises (dans l\'ordre)',
         'reset_default': 'Réinitialiser par défaut',
         'reset_default_success': 'Configuration par défaut restaurée',
@@ -2479,11 +2547,19 @@ TRANSLATIONS = {
 
         'sku_mappings_title': 'Gestion des mappages SKU',
         'sku_no_match_question': 'Q : Aucun résultat correspondant trouvé pour le SKU ?',
+        'sku_overrides_invalid': 'Format de sku_overrides invalide',
         'sku_rule_config': 'Configuration des règles de génération SKU',
+        'sku_rule_invalid': 'Règles invalides : {error}',
+        'sku_rule_keywords_invalid': 'keywords de la règle {rule_id} doit être une liste de chaînes',
+        'sku_rule_missing_format': 'La règle {rule_id} n\'a pas de format',
+        'sku_rule_pattern_invalid': 'pattern de la règle {rule_id} doit être une chaîne',
+        'sku_rule_reload_failed': 'Règles invalides, les règles actuelles sont conservées : {error}',
+        'sku_rule_unknown_field': 'Le format de la règle {rule_id} contient un champ inconnu : {field}',
         'sku_rules_config': 'Configuration des règles SKU',
         'sku_rules_customizable': 'Les règles de génération SKU peuvent être personnalisées dans la page "Configuration"',
         'sku_rules_desc': 'Gestion des règles de génération SKU pour l\'analyse PDF, l\'import OCCW et la création manuelle',
         'sku_rules_management': 'Gestion de la configuration des règles SKU',
+        'sku_rules_must_be_list': 'rules doit être une liste d\'objets de règle',
         'sku_rules_save_success': 'Règles SKU enregistrées avec succès',
         'sku_search_assistant': 'Assistant de recherche SKU',
         'smart_distinguish_codes': 'Distinction intelligente entre codes produits commençant par un chiffre ou une lettre',
@@ -2501,6 +2577,7 @@ TRANSLATIONS = {
         'status_filter': 'Filtre de statut',
         'status_filter_help': 'Sélectionnez les types de statuts de commande à importer',
         'success': 'Succès',
+        'suggest_items_invalid': 'items doit être une liste de chaînes SKU ou d\'objets avec des chaînes sku et user_code',
         'summary': 'Résumé',
         'support_batch_delete_and_modify': 'Supporte les opérations de suppression et modification en lot',
         'support_chinese_filename': 'Support des noms de fichiers en chinois',
@@ -2526,6 +2603,7 @@ TRANSLATIONS = {
         'toast_container': 'Conteneur d\'alerte Toast',
         'toast_system': 'Système d\'alerte Toast',
         'today': 'Aujourd\'hui',
+        'too_many_sku_queries': 'Au plus {count} SKU peuvent être recherchés à la fois',
         'tooltip_styles': 'Styles des info-bulles',
         'total': 'Total',
         'total_2020': 'Total 2020',
@@ -2552,10 +2630,12 @@ TRANSLATIONS = {
         'updated_at': 'Mis à jour le',
         'upload': 'Téléverser',
         'upload_button': 'Téléverser la grille tarifaire',
+        'upload_content_mismatch': 'Le contenu du fichier ne correspond pas à son extension : {filename}',
         'upload_excel_csv': 'Veuillez téléverser un fichier Excel ou CSV',
         'upload_failed': 'Échec du téléversement du fichier',
         'upload_failed_retry': 'Échec du téléversement, veuillez réessayer',
         'upload_file_to_see_stats': 'Téléversez un fichier pour voir les statistiques',
+        'upload_file_too_large': 'Fichier trop volumineux : {filename}, le maximum par fichier est de {max_mb} Mo',
         'upload_occw_price_table': 'Téléverser la grille tarifaire OCCW',
         'upload_occw_prices': 'Téléverser la grille tarifaire OCCW',
         'upload_odoo_sales_data': 'Téléverser les données de vente exportées depuis Odoo',
@@ -2565,6 +2645,7 @@ TRANSLATIONS = {
         'upload_pdf_quote': 'Téléverser un devis PDF logiciel 2020',
         'upload_pdf_title': 'Téléverser un devis PDF logiciel 2020',
         'upload_prices_failed': 'Échec du téléversement de la grille tarifaire',
+        'upload_request_too_large': 'Envoi trop volumineux, le maximum est de {max_mb} Mo',
         'upload_sales_data_button': 'Téléverser les données de vente',
         'upload_success': 'Fichier téléversé avec succès',
         'use_show_raw_text': '3. Utilisez le bouton "Afficher le texte brut PDF" pour voir le contenu analysé',